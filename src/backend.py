@@ -0,0 +1,96 @@
+import inspect
+import traci
+from config import SIM_BACKEND
+
+try:
+    import libsumo
+except ImportError:
+    libsumo = None
+
+BACKENDS = ("traci", "libsumo")
+
+# Izuzeci koje mogu baciti oba backenda
+TRACI_ERRORS = (traci.TraCIException,)
+if libsumo is not None:
+    TRACI_ERRORS += (libsumo.TraCIException,)
+
+
+def available_backends():
+    """Vraća listu backenda koji se mogu koristiti u ovom okruženju"""
+    return [b for b in BACKENDS if b != "libsumo" or libsumo is not None]
+
+
+def start_simulation(args, backend=SIM_BACKEND, label="default"):
+    """Pokreće SUMO i vraća konekciju sa istim API-jem za oba backenda.
+
+    - "traci": poseban SUMO proces, komunikacija preko socketa (podržava GUI)
+    - "libsumo": SUMO učitan u isti proces, bez IPC troška
+    """
+    if backend == "libsumo":
+        if libsumo is None:
+            raise ImportError("libsumo nije instaliran, koristite SIM_BACKEND = \"traci\"")
+        if "gui" in args[0]:
+            print("Upozorenje: libsumo ne podržava GUI, pokrećem bez GUI-ja")
+        libsumo.start(args)
+        return libsumo
+
+    if backend != "traci":
+        raise ValueError(f"Nepoznat backend: {backend}")
+
+    traci.start(args, label=label)
+    return traci.getConnection(label)
+
+
+class CallCounter:
+    """Omotač konekcije koji broji TraCI pozive po funkciji.
+
+    Čitanje rezultata pretplata (get*SubscriptionResults) ne ide preko
+    socketa, pa se broji odvojeno kao "lokalni" poziv. Omotavaju se samo
+    funkcije i metode; domeni libsumo-a su klase (takođe callable), pa
+    idu kroz _CountingDomain kao i objekti domena traci konekcije.
+    """
+    LOCAL = ("getSubscriptionResults", "getAllSubscriptionResults")
+
+    def __init__(self, conn):
+        self._conn = conn
+        self.calls = {}
+        self.local_calls = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._conn, name)
+        if inspect.isroutine(attr):
+            return self._wrap(attr, name)
+        return _CountingDomain(self, attr, name)
+
+    def _wrap(self, func, name):
+        def counted(*args, **kwargs):
+            if name.rsplit(".", 1)[-1] in self.LOCAL:
+                self.local_calls += 1
+            else:
+                self.calls[name] = self.calls.get(name, 0) + 1
+            return func(*args, **kwargs)
+        return counted
+
+    @property
+    def total(self):
+        """Broj poziva koji zahtijevaju round-trip do SUMO-a"""
+        return sum(self.calls.values())
+
+    def reset(self):
+        self.calls = {}
+        self.local_calls = 0
+
+
+class _CountingDomain:
+    """Domen (trafficlight, lane, vehicle, ...) čije se metode broje"""
+
+    def __init__(self, counter, domain, name):
+        self._counter = counter
+        self._domain = domain
+        self._name = name
+
+    def __getattr__(self, name):
+        attr = getattr(self._domain, name)
+        if inspect.isroutine(attr):
+            return self._counter._wrap(attr, f"{self._name}.{name}")
+        return attr
@@ -0,0 +1,43 @@
+import argparse
+import os
+import time
+from backend import available_backends, start_simulation
+from observation import Observer
+from utils import check_sumo_home, generate_random_routes, get_state, calculate_reward
+from config import CONFIG_FILE, SIMULATION_FOLDER, SUMO_BINARY, TL_ID
+
+
+def benchmark_backend(backend, steps):
+    """Mjeri broj simulacionih koraka u sekundi za jedan backend"""
+    conn = start_simulation([SUMO_BINARY, "-c", CONFIG_FILE, "--no-warnings", "--no-step-log"],
+                            backend=backend, label=f"bench-{backend}")
+    observer = Observer(TL_ID, conn)
+    observer.subscribe()
+
+    start = time.perf_counter()
+    for _ in range(steps):
+        conn.simulationStep()
+        observer.update()
+        calculate_reward(get_state(TL_ID, observer=observer))
+    elapsed = time.perf_counter() - start
+
+    conn.close()
+    return steps / elapsed if elapsed > 0 else 0.0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Poređenje brzine traci i libsumo backenda")
+    parser.add_argument("--steps", type=int, default=3600)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--backends", nargs="+", default=available_backends())
+    args = parser.parse_args()
+
+    check_sumo_home()
+
+    os.chdir(SIMULATION_FOLDER)
+    generate_random_routes(args.seed)
+    os.chdir("../src")
+
+    for backend in args.backends:
+        steps_per_sec = benchmark_backend(backend, args.steps)
+        print(f"{backend:>8}: {steps_per_sec:10.1f} koraka/s ({args.steps} koraka)")
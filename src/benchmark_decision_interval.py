@@ -0,0 +1,68 @@
+import argparse
+import time
+from qtable import make_agent
+from route_cache import RouteCache
+from run_training import run_episode
+from evaluate_agent import evaluate_simulation
+from config import ALPHA, GAMMA, EPSILON, ALPHA_DECAY, EPSILON_DECAY, NUM_ROUTE_VARIATIONS, SIM_BACKEND
+
+# Poređenje intervala odlučivanja k: brzina treniranja naspram kvaliteta politike.
+# Za svaki k se od nule trenira isti broj epizoda, a naučena politika se
+# evaluira (bez istraživanja) na istim rutama kao i fiksna vremena semafora.
+
+
+def train_with_interval(k, episodes, backend):
+    agent = make_agent(actions=[0, 1], alpha=ALPHA, gamma=GAMMA, epsilon=EPSILON)
+    steps = 0
+    start = time.perf_counter()
+    for ep in range(1, episodes + 1):
+        _, episode_steps, _, _, _ = run_episode(agent, ep, backend=backend, decision_interval=k)
+        steps += episode_steps
+        agent.alpha *= ALPHA_DECAY
+        agent.epsilon *= EPSILON_DECAY
+    return agent, steps, time.perf_counter() - start
+
+
+def evaluate_with_interval(agent, k, seeds, backend):
+    agent.alpha = 0.0
+    agent.epsilon = 0.0
+    waiting, queue, steps = [], [], []
+    for seed in seeds:
+        route_file, sim_generating_end = RouteCache().get(seed)
+        metrics = evaluate_simulation(route_file, sim_generating_end, agent=agent, seed=seed,
+                                      backend=backend, decision_interval=k)
+        waiting.append(metrics['avg_waiting'])
+        queue.append(metrics['avg_queue_length'])
+        steps.append(metrics['total_steps'])
+    n = len(seeds)
+    return sum(waiting) / n, sum(queue) / n, sum(steps) / n
+
+
+def fixed_baseline(seeds, backend):
+    waiting = []
+    for seed in seeds:
+        route_file, sim_generating_end = RouteCache().get(seed)
+        waiting.append(evaluate_simulation(route_file, sim_generating_end, seed=seed,
+                                           backend=backend, decision_interval=1)['avg_waiting'])
+    return sum(waiting) / len(waiting)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Brzina treniranja i kvalitet politike za različite intervale odlučivanja")
+    parser.add_argument("--intervals", type=int, nargs="+", default=[1, 2, 5, 10])
+    parser.add_argument("--episodes", type=int, default=50)
+    parser.add_argument("--eval-runs", type=int, default=5)
+    parser.add_argument("--backend", default=SIM_BACKEND)
+    args = parser.parse_args()
+
+    seeds = [run % NUM_ROUTE_VARIATIONS for run in range(1, args.eval_runs + 1)]
+    RouteCache().warm(sorted(set(range(NUM_ROUTE_VARIATIONS))))
+    baseline = fixed_baseline(seeds, args.backend)
+    print(f"Fiksna vremena: prosječno čekanje {baseline:.2f}s")
+
+    print(f"\n{'k':>3} {'koraka/s':>10} {'epizoda/h':>10} {'čekanje [s]':>12} {'red':>7} {'koraci':>8}")
+    for k in args.intervals:
+        agent, steps, elapsed = train_with_interval(k, args.episodes, args.backend)
+        waiting, queue, eval_steps = evaluate_with_interval(agent, k, seeds, args.backend)
+        print(f"{k:>3} {steps / elapsed:10.0f} {args.episodes * 3600 / elapsed:10.1f} "
+              f"{waiting:12.2f} {queue:7.2f} {eval_steps:8.0f}")
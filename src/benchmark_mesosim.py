@@ -0,0 +1,74 @@
+import argparse
+import random
+import time
+from qtable import make_agent
+from route_cache import RouteCache
+from run_training import run_episode
+from benchmark_decision_interval import evaluate_with_interval, fixed_baseline
+from config import (
+    ALPHA,
+    GAMMA,
+    EPSILON,
+    ALPHA_DECAY,
+    EPSILON_DECAY,
+    NUM_ROUTE_VARIATIONS,
+    SIM_BACKEND,
+    MESO_MIN_EPSILON
+)
+
+# Poređenje rasporeda treniranja: samo mikroskopski naspram mezoskopskih ranih
+# epizoda (dok je epsilon iznad praga) i mikroskopskog nastavka. Obje politike
+# se evaluiraju mikroskopski na istim rutama, pa razlika u čekanju pokazuje
+# cijenu mezoskopskog predtreniranja, a vrijeme treniranja njegovu korist.
+
+
+def train_schedule(episodes, min_epsilon, backend, seed=0):
+    """Trenira od nule; min_epsilon=None znači samo mikroskopske epizode"""
+    random.seed(seed)
+    agent = make_agent(actions=[0, 1], alpha=ALPHA, gamma=GAMMA, epsilon=EPSILON)
+    timings = {"meso": [0, 0.0], "micro": [0, 0.0]}  # [koraci, sekunde]
+    for ep in range(1, episodes + 1):
+        agent.epsilon *= EPSILON_DECAY
+        agent.alpha *= ALPHA_DECAY
+        mesoscopic = min_epsilon is not None and agent.epsilon > min_epsilon
+        start = time.perf_counter()
+        _, steps, _, _, _ = run_episode(agent, ep, backend=backend, mesoscopic=mesoscopic)
+        mode = timings["meso" if mesoscopic else "micro"]
+        mode[0] += steps
+        mode[1] += time.perf_counter() - start
+    return agent, timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Brzina i kvalitet politike: mikroskopsko vs mješovito treniranje")
+    parser.add_argument("--episodes", type=int, default=100)
+    parser.add_argument("--min-epsilon", type=float, default=MESO_MIN_EPSILON,
+                        help="epizode sa epsilonom iznad ovoga su mezoskopske")
+    parser.add_argument("--eval-runs", type=int, default=5)
+    parser.add_argument("--backend", default=SIM_BACKEND)
+    args = parser.parse_args()
+
+    seeds = [run % NUM_ROUTE_VARIATIONS for run in range(1, args.eval_runs + 1)]
+    RouteCache().warm(sorted(set(range(NUM_ROUTE_VARIATIONS))))
+    baseline = fixed_baseline(seeds, args.backend)
+    print(f"Fiksna vremena: prosječno čekanje {baseline:.2f}s")
+
+    results = {}
+    for name, min_epsilon in (("mikro", None), ("mješovito", args.min_epsilon)):
+        agent, timings = train_schedule(args.episodes, min_epsilon, args.backend)
+        waiting, queue, _ = evaluate_with_interval(agent, 1, seeds, args.backend)
+        results[name] = (timings, waiting, queue)
+
+    print(f"\n{'raspored':>10} {'mezo ep. koraka/s':>18} {'mikro koraka/s':>15} {'trening [s]':>12} "
+          f"{'čekanje [s]':>12} {'red':>7}")
+    for name, (timings, waiting, queue) in results.items():
+        meso_steps, meso_time = timings["meso"]
+        micro_steps, micro_time = timings["micro"]
+        meso_rate = f"{meso_steps / meso_time:18.0f}" if meso_time else f"{'-':>18}"
+        micro_rate = f"{micro_steps / micro_time:15.0f}" if micro_time else f"{'-':>15}"
+        print(f"{name:>10} {meso_rate} {micro_rate} {meso_time + micro_time:12.1f} {waiting:12.2f} {queue:7.2f}")
+
+    micro, mixed = results["mikro"], results["mješovito"]
+    speedup = sum(t for _, t in micro[0].values()) / sum(t for _, t in mixed[0].values())
+    print(f"\nUbrzanje treniranja: {speedup:.2f}x, razlika u čekanju (mješovito - mikro): "
+          f"{mixed[1] - micro[1]:+.2f}s")
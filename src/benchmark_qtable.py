@@ -0,0 +1,60 @@
+import argparse
+import random
+import time
+import numpy as np
+from qtable import make_agent, state_dims
+from replay import ReplayBuffer
+from config import REPLAY_BATCH_SIZE
+
+
+def random_states(count, seed=0):
+    """Stanja u obliku koji vraća get_state (prosječni redovi po traci su float)"""
+    rng = random.Random(seed)
+    n_phases, n_queues = state_dims()
+    return [
+        (rng.randrange(n_phases), rng.choice([6, 27]))
+        + tuple(rng.randrange(0, 70) / rng.choice([1, 2, 3]) for _ in range(n_queues))
+        for _ in range(count)
+    ]
+
+
+def benchmark_agent(impl, states):
+    """Broj parova choose_action + learn u sekundi"""
+    agent = make_agent(actions=[0, 1], alpha=0.1, gamma=0.95, epsilon=0.1, impl=impl)
+    random.seed(0)
+
+    start = time.perf_counter()
+    for state, next_state in zip(states, states[1:]):
+        action = agent.choose_action(state)
+        agent.learn(state, action, -1.0, next_state)
+    elapsed = time.perf_counter() - start
+    return (len(states) - 1) / elapsed if elapsed > 0 else 0.0
+
+
+def benchmark_batch(states, batch_size=REPLAY_BATCH_SIZE, updates=2000):
+    """Broj prijelaza u sekundi za learn_batch nad paketima iz replay bafera"""
+    agent = make_agent(actions=[0, 1], alpha=0.1, gamma=0.95, epsilon=0.1, impl="array")
+    indices = agent.encoder.encode_batch(np.array(states))
+    buffer = ReplayBuffer(capacity=len(states), encoder=agent.encoder, seed=0)
+    actions = np.random.default_rng(0).integers(0, 2, len(states) - 1)
+    buffer.add_batch(indices[:-1], actions, np.full(len(actions), -1.0), indices[1:])
+
+    start = time.perf_counter()
+    buffer.replay(agent, updates, batch_size)
+    elapsed = time.perf_counter() - start
+    return updates * batch_size / elapsed if elapsed > 0 else 0.0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Poređenje dict i array Q-tabele")
+    parser.add_argument("--steps", type=int, default=200000)
+    args = parser.parse_args()
+
+    states = random_states(args.steps + 1)
+    rates = {impl: benchmark_agent(impl, states) for impl in ("dict", "array")}
+    for impl, rate in rates.items():
+        print(f"{impl:>6}: {rate:12.0f} choose_action+learn/s")
+    print(f"Ubrzanje array/dict: {rates['array'] / rates['dict']:.2f}x")
+
+    batch_rate = benchmark_batch(states)
+    print(f" batch: {batch_rate:12.0f} prijelaza/s (learn_batch, paketi od {REPLAY_BATCH_SIZE} iz replay bafera)")
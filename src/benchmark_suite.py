@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+import pickle
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import time
+from backend import start_simulation
+from benchmark_backends import benchmark_backend
+from benchmark_qtable import random_states, benchmark_agent
+from checkpoint import CheckpointWriter, load_q_table
+from evaluate_agent import run_evaluation
+from qtable import make_agent
+from route_cache import RouteCache
+from session import measure_startup
+from run_training import run_episode
+from utils import check_sumo_home, generate_random_routes
+from config import (
+    ALPHA,
+    GAMMA,
+    EPSILON,
+    CONFIG_FILE,
+    SUMO_BINARY,
+    SIM_BACKEND,
+    BENCHMARK_HISTORY,
+    BENCHMARK_THRESHOLD
+)
+
+# Reproducibilni benchmark simulacije i učenja. Svi seedovi su fiksni, a
+# rezultati se dopisuju u BENCHMARK_HISTORY zajedno sa commitom, pa se
+# dva mjerenja mogu uporediti (--compare) i regresije označiti.
+
+SEED = 0
+
+
+def metric(value, unit, better="higher"):
+    return {"value": value, "unit": unit, "better": better}
+
+
+def bench_raw_loop(steps, backend):
+    """Samo simulationStep, bez opažanja"""
+    conn = start_simulation([SUMO_BINARY, "-c", CONFIG_FILE, "--no-warnings", "--no-step-log",
+                             "--route-files", RouteCache().get(SEED)[0]],
+                            backend=backend, label="suite-raw")
+    start = time.perf_counter()
+    for _ in range(steps):
+        conn.simulationStep()
+    elapsed = time.perf_counter() - start
+    conn.close()
+    return steps / elapsed
+
+
+def bench_training_step(backend):
+    """Koraci u sekundi cijele epizode treniranja (opažanje, učenje, nagrada)"""
+    random.seed(SEED)
+    agent = make_agent(actions=[0, 1], alpha=ALPHA, gamma=GAMMA, epsilon=EPSILON)
+    start = time.perf_counter()
+    _, steps, _, _, _ = run_episode(agent, SEED, backend=backend)
+    elapsed = time.perf_counter() - start
+    return steps / elapsed, agent
+
+
+def bench_route_generation(repeats):
+    """Prosječno trajanje generate_random_routes (bez keša)"""
+    timings = []
+    for i in range(repeats):
+        out_dir = tempfile.mkdtemp(prefix="bench-routes-")
+        try:
+            start = time.perf_counter()
+            generate_random_routes(SEED + i, out_dir=out_dir)
+            timings.append(time.perf_counter() - start)
+        finally:
+            shutil.rmtree(out_dir, ignore_errors=True)
+    return sum(timings) / len(timings)
+
+
+def bench_checkpoint(agent):
+    """(save s, load s, veličina MB) za pickle i binarni format"""
+    results = {}
+    out_dir = tempfile.mkdtemp(prefix="bench-ckpt-")
+    try:
+        pkl_path = os.path.join(out_dir, "qtable.pkl")
+        start = time.perf_counter()
+        with open(pkl_path, "wb") as f:
+            pickle.dump(agent.q_table, f)
+        save = time.perf_counter() - start
+        start = time.perf_counter()
+        load_q_table(make_agent(actions=[0, 1]), pkl_path)
+        results["pickle"] = (save, time.perf_counter() - start, os.path.getsize(pkl_path) / 1e6)
+
+        qtc_path = os.path.join(out_dir, "qtable.qtc")
+        start = time.perf_counter()
+        CheckpointWriter(full_every=1).save(agent, SEED, qtc_path)
+        save = time.perf_counter() - start
+        start = time.perf_counter()
+        load_q_table(make_agent(actions=[0, 1]), qtc_path)
+        results["binary"] = (save, time.perf_counter() - start, os.path.getsize(qtc_path) / 1e6)
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return results
+
+
+def bench_evaluation(agent, runs):
+    agent.alpha = 0.0
+    agent.epsilon = 0.0
+    scratch = tempfile.mkdtemp(prefix="bench-eval-")
+    start = time.perf_counter()
+    run_evaluation(agent, num_runs=runs, workers=1, scratch_root=scratch)
+    return time.perf_counter() - start
+
+
+def run_suite(steps, eval_runs, route_repeats, qtable_steps, backend):
+    metrics = {}
+    RouteCache().get(SEED)
+
+    metrics["sumo_raw_steps_per_sec"] = metric(bench_raw_loop(steps, backend), "koraka/s")
+    metrics["sumo_observe_steps_per_sec"] = metric(benchmark_backend(backend, steps), "koraka/s")
+    metrics["episode_start_cold_sec"] = metric(measure_startup(backend, 5, reuse=False), "s", "lower")
+    metrics["episode_start_reused_sec"] = metric(measure_startup(backend, 5, reuse=True), "s", "lower")
+    rate, agent = bench_training_step(backend)
+    metrics["training_steps_per_sec"] = metric(rate, "koraka/s")
+    metrics["route_generation_sec"] = metric(bench_route_generation(route_repeats), "s", "lower")
+
+    states = random_states(qtable_steps + 1, seed=SEED)
+    for impl in ("dict", "array"):
+        metrics[f"qtable_{impl}_ops_per_sec"] = metric(benchmark_agent(impl, states), "choose+learn/s")
+
+    for fmt, (save, load, size) in bench_checkpoint(agent).items():
+        metrics[f"checkpoint_{fmt}_save_sec"] = metric(save, "s", "lower")
+        metrics[f"checkpoint_{fmt}_load_sec"] = metric(load, "s", "lower")
+        metrics[f"checkpoint_{fmt}_size_mb"] = metric(size, "MB", "lower")
+
+    if eval_runs:
+        metrics["evaluation_wall_sec"] = metric(bench_evaluation(agent, eval_runs), "s", "lower")
+    return metrics
+
+
+def git_commit():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+        dirty = subprocess.call(["git", "diff", "--quiet", "HEAD"]) != 0
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_history(path, history):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(history, f, indent=1)
+    os.replace(tmp_path, path)
+
+
+def find_entry(history, ref):
+    """Unos po commitu (prefiks) ili indeksu (npr. -1 za posljednji)"""
+    try:
+        return history[int(ref)]
+    except ValueError:
+        matches = [entry for entry in history if entry["commit"].startswith(ref)]
+        if not matches:
+            raise SystemExit(f"Commit {ref} nije u historiji benchmarka")
+        return matches[-1]
+
+
+def compare(base, new, threshold=BENCHMARK_THRESHOLD):
+    """Ispisuje promjene metrika i vraća listu regresija veće od threshold"""
+    regressions = []
+    print(f"{base['commit']} -> {new['commit']}")
+    for name, current in new["metrics"].items():
+        previous = base["metrics"].get(name)
+        if previous is None or not previous["value"]:
+            print(f"  {name:34s} {current['value']:12.4g} {current['unit']} (novo)")
+            continue
+        change = (current["value"] - previous["value"]) / previous["value"]
+        worse = change < -threshold if current["better"] == "higher" else change > threshold
+        flag = "  REGRESIJA" if worse else ""
+        print(f"  {name:34s} {previous['value']:12.4g} -> {current['value']:12.4g} {current['unit']:15s}"
+              f" {change * 100:+7.1f}%{flag}")
+        if worse:
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark simulacije, učenja i checkpointa sa historijom")
+    parser.add_argument("--steps", type=int, default=3600, help="koraka SUMO petlje")
+    parser.add_argument("--eval-runs", type=int, default=2, help="broj evaluacijskih parova (0 = preskoči)")
+    parser.add_argument("--route-repeats", type=int, default=3)
+    parser.add_argument("--qtable-steps", type=int, default=100000)
+    parser.add_argument("--backend", default=SIM_BACKEND)
+    parser.add_argument("--history", default=BENCHMARK_HISTORY)
+    parser.add_argument("--compare", nargs="*", metavar="REF",
+                        help="uporedi unose (commit ili indeks); bez argumenata posljednja dva")
+    parser.add_argument("--threshold", type=float, default=BENCHMARK_THRESHOLD)
+    args = parser.parse_args()
+
+    history = load_history(args.history)
+    if args.compare is not None:
+        refs = args.compare or ["-2", "-1"]
+        if len(history) < 2 and not args.compare:
+            raise SystemExit("Historija ima manje od dva mjerenja")
+        base, new = find_entry(history, refs[0]), find_entry(history, refs[-1] if len(refs) > 1 else "-1")
+        regressions = compare(base, new, args.threshold)
+        raise SystemExit(1 if regressions else 0)
+
+    check_sumo_home()
+    entry = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": platform.node(),
+        "python": platform.python_version(),
+        "backend": args.backend,
+        "params": {"steps": args.steps, "eval_runs": args.eval_runs, "seed": SEED},
+        "metrics": run_suite(args.steps, args.eval_runs, args.route_repeats, args.qtable_steps, args.backend),
+    }
+    history.append(entry)
+    save_history(args.history, history)
+
+    for name, value in entry["metrics"].items():
+        print(f"{name:34s} {value['value']:12.4g} {value['unit']}")
+    if len(history) > 1:
+        print()
+        compare(history[-2], entry, args.threshold)
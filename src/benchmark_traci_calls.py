@@ -0,0 +1,66 @@
+import argparse
+from backend import start_simulation, available_backends, CallCounter
+from observation import Observer
+from topology import load_topology
+from utils import get_state, calculate_reward
+from config import SUMO_BINARY, CONFIG_FILE, TL_ID, SIM_BACKEND
+
+# Broji TraCI pozive po koraku simulacije za stari i novi način opažanja:
+#   polling     - upiti po traci/vozilu i dva čitanja stanja po odluci (staro)
+#   pipeline    - pretplate i jedno čitanje stanja po koraku (novo)
+
+
+def legacy_step(conn, topology):
+    """Opažanje kao prije pretplata: sve preko direktnih upita"""
+    conn.simulation.getDepartedNumber()
+    conn.simulation.getArrivedNumber()
+    for veh_id in conn.vehicle.getIDList():
+        conn.vehicle.getWaitingTime(veh_id)
+    state = get_state(TL_ID, conn=conn, topology=topology)
+    calculate_reward(state)
+    get_state(TL_ID, conn=conn, topology=topology)
+
+
+def pipeline_step(observer):
+    """Jedno opažanje iz keša pretplata nakon simulationStep"""
+    state = get_state(TL_ID, observer=observer)
+    calculate_reward(state)
+
+
+def count_calls(mode, steps, backend):
+    conn = start_simulation(
+        [SUMO_BINARY, "-c", CONFIG_FILE, "--no-warnings", "--no-step-log"],
+        backend=backend, label=f"count-{mode}"
+    )
+    counter = CallCounter(conn)
+    topology = load_topology(TL_ID, conn)
+    observer = None
+    if mode == "pipeline":
+        observer = Observer(TL_ID, counter, topology)
+        observer.subscribe()
+    counter.reset()
+
+    for _ in range(steps):
+        counter.simulationStep()
+        if observer is not None:
+            observer.update()
+            pipeline_step(observer)
+        else:
+            legacy_step(counter, topology)
+
+    conn.close()
+    return counter
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Broj TraCI poziva po koraku simulacije")
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--backend", default=SIM_BACKEND, choices=available_backends())
+    args = parser.parse_args()
+
+    for mode in ("polling", "pipeline"):
+        counter = count_calls(mode, args.steps, args.backend)
+        print(f"\n{mode}: {counter.total / args.steps:.1f} TraCI poziva po koraku "
+              f"(+{counter.local_calls / args.steps:.1f} lokalnih čitanja pretplata)")
+        for name, count in sorted(counter.calls.items(), key=lambda item: -item[1]):
+            print(f"  {name:45s} {count / args.steps:8.2f}")
@@ -0,0 +1,195 @@
+import argparse
+import json
+import os
+import pickle
+import struct
+import numpy as np
+from qtable import ArrayQLearningAgent, StateEncoder, QUEUE_BINS, DURATION_BINS, table_dims
+from utils import MAX_QUEUE, QUEUE_STEP, DURATION_STEP
+from config import CHECKPOINT_FULL_EVERY
+
+# Binarni format checkpointa (.qtc):
+#   MAGIC | verzija (uint32) | dužina zaglavlja (uint32) | JSON zaglavlje | podaci
+# Podaci počinju na poravnatom offsetu. Pun checkpoint je float32 niz
+# (n_states, n_actions) sa NaN za neposjećene parove, pa se može otvoriti
+# preko numpy.memmap bez deserijalizacije. Delta checkpoint sadrži samo
+# promijenjene parove (int64 indeksi + float32 vrijednosti) u odnosu na
+# prethodni checkpoint naveden u zaglavlju kao "base".
+MAGIC = b"QTCK"
+VERSION = 1
+ALIGNMENT = 64
+_PREFIX = struct.Struct("<4sII")
+
+
+def schema(encoder, actions):
+    return {
+        "n_phases": encoder.n_phases,
+        "n_queues": encoder.n_queues,
+        "queue_bins": QUEUE_BINS,
+        "duration_bins": DURATION_BINS,
+        "max_queue": MAX_QUEUE,
+        "queue_step": QUEUE_STEP,
+        "duration_step": DURATION_STEP,
+        "actions": list(actions),
+    }
+
+
+def agent_arrays(agent):
+    """(encoder, float32 niz sa NaN za neposjećene parove) za dict ili array agenta"""
+    if not isinstance(agent, ArrayQLearningAgent):
+        q_table = agent.q_table
+        converted = ArrayQLearningAgent(agent.actions, *table_dims(q_table))
+        converted.q_table = q_table
+        agent = converted
+    table = agent.table.astype(np.float32)
+    table[~agent.visited] = np.nan
+    return agent.encoder, table
+
+
+def _write(path, header, *arrays):
+    header_bytes = json.dumps(header).encode()
+    offset = _PREFIX.size + len(header_bytes)
+    padding = (-offset) % ALIGNMENT
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, VERSION, len(header_bytes) + padding))
+        f.write(header_bytes + b" " * padding)
+        for array in arrays:
+            f.write(np.ascontiguousarray(array).tobytes())
+    os.replace(tmp_path, path)
+
+
+def read_header(path):
+    """Čita samo zaglavlje checkpointa; vraća (zaglavlje, offset podataka)"""
+    with open(path, "rb") as f:
+        magic, version, header_len = _PREFIX.unpack(f.read(_PREFIX.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} nije checkpoint verzije {VERSION}")
+        header = json.loads(f.read(header_len))
+    return header, _PREFIX.size + header_len
+
+
+def open_table(path):
+    """Pun checkpoint kao read-only memmap (konstantno vrijeme, bez čitanja podataka)"""
+    header, offset = read_header(path)
+    if header["kind"] != "full":
+        raise ValueError(f"{path} je delta checkpoint; koristite load_table")
+    table = np.memmap(path, dtype=np.float32, mode="r", offset=offset, shape=tuple(header["shape"]))
+    return header, table
+
+
+def load_table(path):
+    """Tabela iz punog ili delta checkpointa (delte se primjenjuju redom od punog)"""
+    header, offset = read_header(path)
+    if header["kind"] == "full":
+        return header, np.array(open_table(path)[1])
+
+    base_path = os.path.join(os.path.dirname(path), header["base"])
+    _, table = load_table(base_path)
+    count = header["count"]
+    indices = np.memmap(path, dtype=np.int64, mode="r", offset=offset, shape=(count,))
+    values = np.memmap(path, dtype=np.float32, mode="r", offset=offset + 8 * count, shape=(count,))
+    table.reshape(-1)[indices] = values
+    return header, table
+
+
+def load_into(agent, path):
+    """Učitava checkpoint u agenta (dict ili array) i vraća zaglavlje"""
+    header, table = load_table(path)
+    visited = ~np.isnan(table)
+    if isinstance(agent, ArrayQLearningAgent):
+        # Oblik tabele dolazi iz zaglavlja, ne iz trenutne konfiguracije
+        n_phases, n_queues = header["schema"]["n_phases"], header["schema"]["n_queues"]
+        if (n_phases, n_queues) != (agent.encoder.n_phases, agent.encoder.n_queues):
+            agent.set_dims(n_phases, n_queues)
+        agent.table[:] = np.nan_to_num(table)
+        agent.visited[:] = visited
+    else:
+        encoder = StateEncoder(header["schema"]["n_phases"], header["schema"]["n_queues"])
+        actions = header["schema"]["actions"]
+        states, action_ids = np.nonzero(visited)
+        agent.q_table = {
+            (encoder.decode(s), actions[a]): float(table[s, a])
+            for s, a in zip(states, action_ids)
+        }
+    return header
+
+
+def load_q_table(agent, path):
+    """Učitava .pkl (dict) ili .qtc (binarni) checkpoint u agenta"""
+    if path.endswith(".qtc"):
+        load_into(agent, path)
+    else:
+        with open(path, "rb") as f:
+            agent.q_table = pickle.load(f)
+
+
+class CheckpointWriter:
+    """Piše pune checkpointe svakih full_every snimaka, a između njih delte"""
+
+    def __init__(self, full_every=CHECKPOINT_FULL_EVERY):
+        self.full_every = full_every
+        self.saved = 0
+        self.last_table = None
+        self.last_path = None
+
+    def save(self, agent, episode, path):
+        encoder, table = agent_arrays(agent)
+        header = {
+            "schema": schema(encoder, agent.actions),
+            "alpha": agent.alpha,
+            "gamma": agent.gamma,
+            "epsilon": agent.epsilon,
+            "episode": episode,
+            "dtype": "float32",
+            "shape": list(table.shape),
+        }
+
+        full = self.last_table is None or self.saved % self.full_every == 0
+        if full:
+            header["kind"] = "full"
+            _write(path, header, table)
+        else:
+            # NaN != NaN, pa se neposjećeni parovi porede posebno
+            changed = (table != self.last_table) & ~(np.isnan(table) & np.isnan(self.last_table))
+            indices = np.flatnonzero(changed).astype(np.int64)
+            header.update(kind="delta", base=os.path.basename(self.last_path), count=len(indices))
+            _write(path, header, indices, table.reshape(-1)[indices])
+
+        self.saved += 1
+        self.last_table = table
+        self.last_path = path
+        return path
+
+
+def convert_pickle(pkl_path, out_path=None):
+    """Pretvara postojeći qtable_ep*.pkl u pun binarni checkpoint"""
+    with open(pkl_path, "rb") as f:
+        q_table = pickle.load(f)
+
+    agent = ArrayQLearningAgent([0, 1], *table_dims(q_table))
+    agent.q_table = q_table
+    name = os.path.basename(pkl_path)
+    episode = int(name[len("qtable_ep"):-len(".pkl")]) if name.startswith("qtable_ep") else None
+
+    out_path = out_path or os.path.splitext(pkl_path)[0] + ".qtc"
+    return CheckpointWriter(full_every=1).save(agent, episode, out_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Binarni checkpointi Q-tabele")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    convert = subparsers.add_parser("convert", help="pretvori .pkl checkpointe u .qtc")
+    convert.add_argument("paths", nargs="+")
+    info = subparsers.add_parser("info", help="ispiši zaglavlje checkpointa")
+    info.add_argument("paths", nargs="+")
+    args = parser.parse_args()
+
+    for path in args.paths:
+        if args.command == "convert":
+            out_path = convert_pickle(path)
+            print(f"{path} -> {out_path} ({os.path.getsize(out_path) / 1e6:.1f} MB)")
+        else:
+            header, _ = read_header(path)
+            print(f"{path}: {json.dumps(header)}")
@@ -10,16 +10,34 @@ CONFIG_FILE = "../simulation-config/osm.sumocfg"
 SIMULATION_FOLDER = "../simulation-config/"
 NET_FILE = "osm.net.xml"
 ROU_FILE = "routes.rou.xml"
+TRIPS_FILE = "trips.trips.xml"
 SUMO_BINARY = "sumo"
 SUMO_BINARY_EVAL = "sumo"
+SIM_BACKEND = "traci"  # "traci" (socket, podržava GUI) ili "libsumo" (u istom procesu)
+REUSE_SUMO_SESSION = True  # jedan SUMO po procesu, resetovan sa load() između epizoda (session.py)
+USE_SNAPSHOTS = False  # epizode počinju od zagrijanog stanja mreže po varijanti ruta (snapshot.py)
+SNAPSHOT_WARMUP = 600  # sekundi simulacije sa fiksnim vremenima prije snimanja stanja
 
 # Parametri treniranja
 MAX_STEPS = 22222  
+DECISION_INTERVAL = 1  # sekundi između odluka agenta (simulacija skače k koraka odjednom)
 EPISODES_DONE = 1500
 NUM_EPISODES = 2500
 NUM_EVAL_EPISODES = 50
+NUM_EVAL_WORKERS = 4  # paralelni procesi evaluacije (1 = serijski)
+EVAL_SCRATCH_DIR = "eval-scratch"
+
+# Pozadinska evaluacija checkpointa tokom treniranja (eval_scheduler.py)
+EVAL_MAX_CONCURRENT = 2  # najviše istovremenih evaluacija
+BACKGROUND_EVAL_WORKERS = 1  # procesa po pozadinskoj evaluaciji
+EVAL_NICE = 10  # niži prioritet evaluacije da ne usporava trening
 NUM_ROUTE_VARIATIONS = 7
 
+# Paralelno treniranje (parallel_training.py)
+NUM_WORKERS = 4
+SYNC_INTERVAL = 8  # broj završenih epizoda između slanja snapshota Q-tabele workerima
+ROLLOUT_DIR = "rollouts"
+
 # Hiperparametri Q-učenja
 ALPHA = 0.187
 GAMMA = 0.95
@@ -27,9 +45,82 @@ EPSILON = 1.0
 ALPHA_DECAY = 0.9996
 EPSILON_DECAY = 0.997
 
+# Implementacija Q-tabele (qtable.py): "dict" ili "array" (NumPy, indeksirana stanja)
+Q_TABLE_IMPL = "dict"
+# Oblik array tabele dolazi iz topologije semafora (qtable.state_dims); ovo su
+# rezervne vrijednosti kada se mreža ne može pročitati
+STATE_NUM_PHASES = 8  # broj faza programa semafora TL_ID
+STATE_NUM_QUEUES = 4  # broj prilaza (redova) u stanju
+DENSE_TABLE_MAX_STATES = 5_000_000  # najveći broj stanja guste (array) tabele zajedničkog agenta
+
+# Mezoskopsko treniranje ranih epizoda (SUMO --mesosim); kasnije epizode i evaluacija su mikroskopske
+MESO_TRAINING = False
+MESO_MIN_EPSILON = 0.2  # epizoda je mezoskopska dok je epsilon agenta iznad ovoga
+MESO_OPTIONS = ["--mesosim", "true", "--meso-junction-control", "true"]  # semafori upravljaju tokom i u mezo modelu
+
+# Rano prekidanje epizode u zastoju (termination.py), isto za trening i evaluaciju
+GRIDLOCK_DETECTION = True
+GRIDLOCK_QUEUE_LIMIT = 60  # ukupan red (zbir prosjeka po prilazu) iznad kojeg rast reda znači zastoj
+GRIDLOCK_QUEUE_WINDOW = 600  # sekundi u kojima se prati rast reda
+GRIDLOCK_STAGNATION = 900  # sekundi bez ijednog dolaska dok ima vozila u mreži
+GRIDLOCK_MAX_TELEPORTS = 20  # teleportovanih (zaglavljenih) vozila u epizodi
+GRIDLOCK_MAX_WAITING = 1200  # sekundi čekanja jednog vozila
+GRIDLOCK_PENALTY = -10000  # nagrada posljednjeg (terminalnog) prijelaza se umanjuje za ovo
+
+# Ponavljanje iskustva (replay.py, samo za Q_TABLE_IMPL = "array")
+REPLAY_CAPACITY = 1000000  # broj prijelaza u kružnom baferu
+REPLAY_BATCH_SIZE = 256
+REPLAY_UPDATES_PER_EPISODE = 0  # paketa nakon svake epizode; 0 = isključeno
+
+# Više raskrsnica (multi_agent.py)
+MULTI_TLS_IDS = None  # lista ID-ova semafora; None = svi semafori iz mreže
+MULTI_SHARED_AGENT = False  # True = jedna zajednička Q-tabela za sve raskrsnice
+
+# Surogat model raskrsnice za brzo predtreniranje (surrogate_env.py)
+SURROGATE_NUM_ENVS = 4096  # broj kopija okruženja koje se simuliraju zajedno
+SURROGATE_EPISODE_STEPS = 3600  # trajanje epizode surogata u sekundama
+SURROGATE_ARRIVAL_SHARE = 0.25  # udio generisanih putovanja koja prolaze kroz raskrsnicu
+SURROGATE_SATURATION_FLOW = 0.5  # vozila/s po traci na zelenom
+
+# Stanje treniranja (run_state.py): epizode, hiperparametri, checkpointi i metrike
+RUN_ID = "default"
+RUN_STATE_DB = "run_state.sqlite"
+RUN_STATE_COMMIT_EVERY = 10  # broj epizoda po transakciji (jedan fsync po paketu)
+ARTIFACTS_DIR = "q-tables-and-logs"
+EVAL_RESULTS_ROOT = "evaluation-results"
+# Stanje treniranja iz vremena kada se upisivalo u config.py; uvozi se jednom u
+# podrazumijevani run koji nastavlja od Q_TABLE_PATH (RunStore.import_legacy)
+LEGACY_EPISODES_DONE = 2199
+LEGACY_ALPHA = 0.060156
+LEGACY_GAMMA = 0.950000
+LEGACY_EPSILON = 0.001538
+
+# Telemetrija po koraku (telemetry.py): kolonski fajl po epizodi u {ARTIFACTS_DIR}/telemetry
+TELEMETRY_ENABLED = False
+TELEMETRY_FORMAT = "parquet"  # "parquet", "arrow" (IPC) ili "npz" (bez pyarrow)
+TELEMETRY_CHUNK_ROWS = 4096  # redova u baferu prije upisa u fajl
+TELEMETRY_DIR = "telemetry"
+
+# Grafikoni u zasebnom procesu nižeg prioriteta (dashboard.py)
+DASHBOARD_ENABLED = True
+DASHBOARD_INTERVAL = 60  # sekundi između osvježavanja grafikona
+DASHBOARD_NICE = 15
+DASHBOARD_WINDOW = 50  # prozor kliznog prosjeka nagrade i čekanja
+
+# Profilisanje epizoda (profiling.py); isključeno ne usporava petlju
+PROFILE_ENABLED = False
+PROFILE_DUMP = None  # None, "cprofile" (.prof) ili "pyinstrument" (.html) po epizodi
+PROFILE_FILE = "profile.jsonl"  # raspodjela vremena po epizodi, u direktoriju artefakata
+
+# Benchmark paket (benchmark_suite.py)
+BENCHMARK_HISTORY = "benchmarks/history.json"  # mjerenja po commitu
+BENCHMARK_THRESHOLD = 0.05  # pogoršanje veće od 5% se označava kao regresija
+
 # Putanje za čuvanje modela
 Q_TABLE_PATH = "./q-tables-and-logs/qtable_final.pkl"
 EVAL_Q_TABLE_PATH = "q-tables-and-logs/tables/qtable_ep"
+CHECKPOINT_FORMAT = "pickle"  # "pickle" (dict) ili "binary" (.qtc, memmap + delte, checkpoint.py)
+CHECKPOINT_FULL_EVERY = 10  # svaki N-ti binarni checkpoint je pun, ostali su delte
 
 # Parametri generisanja ruta
 SIM_START_OF_GENERATING = 0
@@ -38,8 +129,16 @@ SIM_GENERATING_RANGE_MAX = 1100
 ROUTES_PER_SEC_RANGE_MIN = 0.7
 ROUTES_PER_SEC_RANGE_MAX = 1.1
 ROUTES_PER_SEC_RANGE_RANDOMIZE = False
+ROUTE_GENERATOR = "randomTrips"  # "randomTrips" (subprocess + duarouter) ili "native" (trip_generator.py)
+DEMAND_PROFILE = "constant"  # za "native": "constant", "rush_hour" ili "double_peak"
+
+# Keš ruta: svaka varijanta (seed) se generiše jednom (route_cache.py)
+USE_ROUTE_CACHE = True
+ROUTE_CACHE_DIR = "../simulation-config/route-cache"
 
-last_alpha = 0.060156
-last_gamma = 0.950000
-last_epsilon = 0.001538
-episodes_done = 2199
+# Izrezana okolina kontrolisanog semafora (crop_network.py); zahtijeva keš ruta
+USE_CROPPED_NET = False  # trening na izrezanoj mreži
+EVAL_ON_CROPPED_NET = False  # evaluacija na izrezanoj (True) ili punoj mreži (False)
+CROP_RADIUS = 400  # metara oko semafora
+CROP_HOPS = None  # broj raskrsnica od semafora; ako je zadat, koristi se umjesto radijusa
+CROPPED_DIR = "../simulation-config/cropped"
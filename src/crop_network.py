@@ -0,0 +1,237 @@
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+import sumolib
+from backend import start_simulation, available_backends
+from observation import Observer
+from route_cache import RouteCache, net_hash
+from trip_generator import resolve_net_file
+from utils import check_sumo_home, get_state, calculate_reward
+from config import (
+    TL_ID,
+    CONFIG_FILE,
+    SUMO_BINARY,
+    SIM_BACKEND,
+    ROU_FILE,
+    CROP_RADIUS,
+    CROP_HOPS,
+    CROPPED_DIR
+)
+
+# Mreža i konfiguracija izrezane okoline kontrolisanog semafora
+CROPPED_NET = "osm.net.xml.gz"
+CROPPED_CONFIG = "osm.sumocfg"
+
+
+def tls_nodes(net, tls_id=TL_ID):
+    """Čvorovi (raskrsnice) kojima upravlja semafor"""
+    return {in_lane.getEdge().getToNode() for in_lane, _, _ in net.getTLS(tls_id).getConnections()}
+
+
+def nodes_within_hops(start, hops):
+    """Čvorovi do hops ivica od početnih, bez obzira na smjer ivice"""
+    seen = set(start)
+    queue = deque((node, 0) for node in start)
+    while queue:
+        node, depth = queue.popleft()
+        if depth == hops:
+            continue
+        neighbours = [e.getFromNode() for e in node.getIncoming()] + [e.getToNode() for e in node.getOutgoing()]
+        for neighbour in neighbours:
+            if neighbour not in seen:
+                seen.add(neighbour)
+                queue.append((neighbour, depth + 1))
+    return seen
+
+
+def nodes_within_radius(net, start, radius):
+    """Čvorovi udaljeni najviše radius metara od centra semafora"""
+    cx = sum(node.getCoord()[0] for node in start) / len(start)
+    cy = sum(node.getCoord()[1] for node in start) / len(start)
+    return {node for node in net.getNodes()
+            if math.hypot(node.getCoord()[0] - cx, node.getCoord()[1] - cy) <= radius}
+
+
+def neighbourhood_edges(net, tls_id=TL_ID, radius=CROP_RADIUS, hops=CROP_HOPS):
+    """ID-evi ivica okoline semafora (po radijusu ili broju skokova).
+
+    Zadržavaju se ivice čija su oba kraja u okolini, i uvijek sve ivice
+    samih raskrsnica semafora, pa su trake i indeksi veza semafora isti
+    kao u punoj mreži. Ivice na granici postaju izvori i ponori.
+    """
+    start = tls_nodes(net, tls_id)
+    if hops is not None:
+        nodes = nodes_within_hops(start, hops)
+    else:
+        nodes = nodes_within_radius(net, start, radius) | start
+
+    edges = {e.getID() for e in net.getEdges() if e.getFromNode() in nodes and e.getToNode() in nodes}
+    for node in start:
+        edges.update(e.getID() for e in node.getIncoming() + node.getOutgoing())
+    return sorted(edges)
+
+
+def write_config(out_dir, source_config=CONFIG_FILE):
+    """sumocfg izrezane mreže: iste opcije obrade kao puna, bez poligona i podrazumijevanih ruta"""
+    tree = ET.parse(source_config)
+    root = tree.getroot()
+    inputs = root.find("input")
+    for element in list(inputs):
+        if element.tag == "net-file":
+            element.set("value", CROPPED_NET)
+        else:
+            inputs.remove(element)  # rute se uvijek zadaju sa --route-files, poligoni nisu potrebni
+    gui = root.find("gui_only")
+    if gui is not None:
+        root.remove(gui)
+    path = os.path.join(out_dir, CROPPED_CONFIG)
+    tree.write(path, encoding="UTF-8", xml_declaration=True)
+    return path
+
+
+def crop(out_dir=CROPPED_DIR, tls_id=TL_ID, radius=CROP_RADIUS, hops=CROP_HOPS, net_file=None):
+    """Izrezuje okolinu semafora netconvertom i upisuje mrežu, sumocfg i crop.json"""
+    full_net = os.path.abspath(resolve_net_file(net_file))
+    net = sumolib.net.readNet(full_net, withPrograms=True)
+    edges = neighbourhood_edges(net, tls_id, radius, hops)
+    os.makedirs(out_dir, exist_ok=True)
+
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False) as f:
+        f.write("\n".join(edges))
+        edges_file = f.name
+    try:
+        subprocess.run([
+            sumolib.checkBinary("netconvert"),
+            "--sumo-net-file", full_net,
+            "--keep-edges.input-file", edges_file,
+            "--remove-edges.isolated",
+            "--no-warnings",
+            "--output-file", os.path.join(out_dir, CROPPED_NET),
+        ], check=True)
+    finally:
+        os.remove(edges_file)
+
+    write_config(out_dir)
+    meta = {
+        "tls": tls_id,
+        "radius": radius if hops is None else None,
+        "hops": hops,
+        "source_net": net_hash(full_net),
+        "edges": len(edges),
+        "full_edges": len(net.getEdges()),
+    }
+    with open(os.path.join(out_dir, "crop.json"), "w") as f:
+        json.dump(meta, f, indent=2)
+    print(f"Izrezana mreža: {len(edges)}/{len(net.getEdges())} ivica -> {out_dir}")
+    return meta
+
+
+class CroppedDemand:
+    """Adapter potražnje: rute pune mreže isječene na izrezanu mrežu.
+
+    Putovanja se i dalje generišu nad punom mrežom (isti seedovi i keš
+    ruta), a cutRoutes.py zadržava samo dio svake rute unutar izrezane
+    mreže, sa vremenom polaska pomjerenim na ulazak u nju. Tako izrezana
+    simulacija dobija isti saobraćaj na granici kao puna. Rezultat se
+    čuva u unosu keša ruta, po hashu izrezane mreže.
+    """
+
+    def __init__(self, crop_dir=CROPPED_DIR, route_cache=None):
+        self.crop_dir = crop_dir
+        self.routes = route_cache or RouteCache()
+        self.net_file = os.path.abspath(os.path.join(crop_dir, CROPPED_NET))
+        if not os.path.exists(self.net_file):
+            raise FileNotFoundError(f"{self.net_file} ne postoji, pokrenite crop_network.py")
+        self.key = net_hash(self.net_file)[:12]
+
+    def get(self, seed):
+        """(putanja isječenih ruta, kraj generisanja) za varijantu seed"""
+        trips, sim_end = self.routes.get(seed)
+        entry = os.path.dirname(trips)
+        out_path = os.path.join(entry, f"cropped-{self.key}.rou.xml")
+        if not os.path.exists(out_path):
+            self._adapt(entry, trips, out_path)
+        return out_path, sim_end
+
+    def _adapt(self, entry, trips, out_path):
+        full_net = os.path.abspath(self.routes.net_file)
+        tmp_path = f"{out_path}.{os.getpid()}.tmp"
+        full_routes = os.path.join(entry, ROU_FILE)
+        routed = None
+        if not os.path.exists(full_routes):
+            # Nativni generator daje samo putovanja; rute pune mreže računa duarouter
+            routed = full_routes = f"{tmp_path}.full.rou.xml"
+            subprocess.run([sumolib.checkBinary("duarouter"), "-n", full_net, "--route-files", trips,
+                            "-o", full_routes, "--ignore-errors", "--no-warnings"], check=True)
+        try:
+            subprocess.run([
+                sys.executable, os.path.join(os.environ["SUMO_HOME"], "tools", "route", "cutRoutes.py"),
+                self.net_file, full_routes,
+                "--routes-output", tmp_path,
+                "--orig-net", full_net,
+            ], check=True)
+            os.replace(tmp_path, out_path)
+        finally:
+            if routed is not None and os.path.exists(routed):
+                os.remove(routed)
+
+
+def cropped_config(crop_dir=CROPPED_DIR):
+    return os.path.join(crop_dir, CROPPED_CONFIG)
+
+
+def episode_inputs(seed, cropped=False, crop_dir=CROPPED_DIR):
+    """(sumocfg, putanja ruta, kraj generisanja) varijante seed na punoj ili izrezanoj mreži"""
+    if cropped:
+        route_file, sim_end = CroppedDemand(crop_dir).get(seed)
+        return cropped_config(crop_dir), route_file, sim_end
+    route_file, sim_end = RouteCache().get(seed)
+    return CONFIG_FILE, route_file, sim_end
+
+
+def benchmark(cropped, steps, backend, seed=0, crop_dir=CROPPED_DIR):
+    """Koraci u sekundi (opažanje i nagrada kao u treningu) na punoj ili izrezanoj mreži"""
+    config_file, route_file, _ = episode_inputs(seed, cropped, crop_dir)
+    conn = start_simulation([SUMO_BINARY, "-c", config_file, "--no-warnings", "--no-step-log",
+                             "--route-files", route_file], backend=backend, label=f"crop-bench-{cropped}")
+    observer = Observer(TL_ID, conn)
+    observer.subscribe()
+
+    start = time.perf_counter()
+    for _ in range(steps):
+        conn.simulationStep()
+        observer.update()
+        calculate_reward(get_state(TL_ID, observer=observer))
+    elapsed = time.perf_counter() - start
+
+    conn.close()
+    return steps / elapsed if elapsed > 0 else 0.0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Izrezivanje okoline kontrolisanog semafora iz pune mreže")
+    parser.add_argument("--tls", default=TL_ID)
+    parser.add_argument("--radius", type=float, default=CROP_RADIUS, help="metara oko semafora")
+    parser.add_argument("--hops", type=int, default=CROP_HOPS, help="broj raskrsnica od semafora (umjesto radijusa)")
+    parser.add_argument("--out", default=CROPPED_DIR)
+    parser.add_argument("--benchmark", action="store_true", help="uporedi brzinu pune i izrezane mreže")
+    parser.add_argument("--steps", type=int, default=3600)
+    parser.add_argument("--backend", choices=available_backends(), default=SIM_BACKEND)
+    args = parser.parse_args()
+
+    check_sumo_home()
+    if not args.benchmark or not os.path.exists(cropped_config(args.out)):
+        crop(args.out, args.tls, args.radius, args.hops)
+
+    if args.benchmark:
+        full = benchmark(False, args.steps, args.backend)
+        cropped = benchmark(True, args.steps, args.backend, crop_dir=args.out)
+        print(f"puna mreža: {full:10.1f} koraka/s")
+        print(f"izrezana:   {cropped:10.1f} koraka/s ({cropped / full:.2f}x)")
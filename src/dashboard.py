@@ -0,0 +1,329 @@
+import argparse
+import csv
+import math
+import os
+import signal
+import subprocess
+import sys
+import time
+from collections import deque
+import pandas as pd
+from telemetry import episode_files, summarize, plot_summaries
+from config import (
+    ARTIFACTS_DIR,
+    EVAL_RESULTS_ROOT,
+    TELEMETRY_DIR,
+    DASHBOARD_INTERVAL,
+    DASHBOARD_NICE,
+    DASHBOARD_WINDOW
+)
+
+# Grafikoni se crtaju u posebnom procesu nižeg prioriteta: trening i
+# evaluacija samo pišu log.csv, telemetriju i evaluation_results.csv, a
+# matplotlib se nikad ne uvozi u njihovom procesu.
+
+
+class LogTail:
+    """Čita samo nove kompletne linije fajla od posljednjeg čitanja"""
+
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self.partial = ""
+        self.inode = None
+        self.restarted = False  # posljednje čitanje je krenulo od početka novog fajla
+
+    def read_new(self):
+        self.restarted = False
+        if not os.path.exists(self.path):
+            return []
+        stat = os.stat(self.path)
+        if stat.st_size < self.offset or (self.inode is not None and stat.st_ino != self.inode):
+            # Fajl je obrisan i ponovo kreiran (novi trening)
+            self.offset = 0
+            self.partial = ""
+            self.restarted = True
+        self.inode = stat.st_ino
+        with open(self.path) as f:
+            f.seek(self.offset)
+            data = f.read()
+            self.offset = f.tell()
+
+        lines = (self.partial + data).split("\n")
+        self.partial = lines.pop()  # posljednja linija možda još nije dopisana
+        return [line for line in lines if line]
+
+
+class RollingMean:
+    """Klizni prosjek preko posljednjih window vrijednosti (NaN dok prozor nije pun)"""
+
+    def __init__(self, window):
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+
+    def add(self, value):
+        if len(self.values) == self.values.maxlen:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+        if len(self.values) < self.values.maxlen:
+            return math.nan
+        return self.total / len(self.values)
+
+
+class TrainingDashboard:
+    """Inkrementalni tok treniranja iz log.csv i fajlova telemetrije"""
+
+    def __init__(self, artifacts_dir=ARTIFACTS_DIR, window=DASHBOARD_WINDOW):
+        self.artifacts_dir = artifacts_dir
+        self.log = LogTail(os.path.join(artifacts_dir, "log.csv"))
+        self.window = window
+        self.reset()
+        self.telemetry_dir = os.path.join(artifacts_dir, TELEMETRY_DIR)
+        self.telemetry_seen = set()
+        self.telemetry_summaries = []
+
+    def reset(self):
+        self.reward_mean = RollingMean(self.window)
+        self.waiting_mean = RollingMean(self.window)
+        self.episodes = []
+        self.smoothed_reward = []
+        self.smoothed_waiting = []
+
+    def poll(self):
+        """Obrađuje nove redove loga i nove epizode telemetrije; vraća True ako ima promjena"""
+        changed = False
+        lines = self.log.read_new()
+        if self.log.restarted and self.episodes:
+            self.reset()  # novo treniranje (log.csv je iznova kreiran)
+            changed = True
+        for row in csv.reader(lines):
+            if row[0] == "Episode":
+                continue
+            episode, reward, _, _, _, waiting = row[:6]
+            self.episodes.append(int(episode))
+            self.smoothed_reward.append(self.reward_mean.add(float(reward)))
+            self.smoothed_waiting.append(self.waiting_mean.add(float(waiting)))
+            changed = True
+
+        for path in episode_files(self.telemetry_dir):
+            if path not in self.telemetry_seen:
+                self.telemetry_seen.add(path)
+                self.telemetry_summaries.append(summarize(path))
+                changed = True
+        return changed
+
+    def render(self):
+        plt = _pyplot()
+        if self.episodes:
+            plt.figure(figsize=(12, 6))
+
+            # Grafikon nagrada
+            plt.subplot(1, 2, 1)
+            plt.plot(self.episodes, self.smoothed_reward, 'b-')
+            plt.xlabel('Epizoda')
+            plt.ylabel('Prosečna nagrada')
+            plt.title('Tok treniranja')
+            plt.grid(True)
+
+            # Grafikon vremena čekanja
+            plt.subplot(1, 2, 2)
+            plt.plot(self.episodes, self.smoothed_waiting, 'r-')
+            plt.xlabel('Epizoda')
+            plt.ylabel('Prosečno čekanje (s)')
+            plt.title('Vreme čekanja vozila')
+            plt.grid(True)
+
+            plt.tight_layout()
+            plt.savefig(os.path.join(self.artifacts_dir, "training_progress.png"))
+            plt.close()
+
+        if self.telemetry_summaries:
+            plot_summaries(self.telemetry_summaries, os.path.join(self.artifacts_dir, "telemetry_progress.png"))
+
+
+class EvaluationDashboard:
+    """Crta grafikone za svaki novi ili izmijenjen evaluation_results.csv"""
+
+    def __init__(self, results_root=EVAL_RESULTS_ROOT):
+        self.results_root = results_root
+        self.rendered = {}
+
+    def poll(self):
+        """Direktoriji rezultata čiji CSV je noviji od posljednjeg crtanja"""
+        pending = []
+        if not os.path.isdir(self.results_root):
+            return pending
+        for name in os.listdir(self.results_root):
+            results_dir = os.path.join(self.results_root, name)
+            csv_path = os.path.join(results_dir, "evaluation_results.csv")
+            if not os.path.exists(csv_path):
+                continue
+            mtime = os.path.getmtime(csv_path)
+            if self.rendered.get(results_dir) == mtime:
+                continue
+            self.rendered[results_dir] = mtime
+
+            # Grafikon noviji od CSV-a je već nacrtan (npr. jednokratnim procesom evaluacije)
+            chart = os.path.join(results_dir, "evaluation_comparison.png")
+            if not os.path.exists(chart) or os.path.getmtime(chart) < mtime:
+                pending.append(results_dir)
+        return pending
+
+
+def _pyplot():
+    # matplotlib se uvozi tek pri crtanju; trening i evaluacija uvoze ovaj
+    # modul samo zbog pokretanja procesa
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def render_evaluation(results_dir, filename="evaluation_results.csv"):
+    """Grafikoni evaluacije iz sačuvanog CSV-a"""
+    df = pd.read_csv(os.path.join(results_dir, filename))
+    plot_results(df, results_dir)
+    plot_queue_lengths(df, results_dir)
+
+
+def plot_results(df, results_dir):
+    """Generiše grafikone za rezultate evaluacije"""
+    plt = _pyplot()
+    plt.figure(figsize=(15, 10))
+
+    # Grafikoni za vreme čekanja
+    plt.subplot(2, 2, 1)
+    plt.bar(df['run'], df['agent_avg_waiting'], color='blue', alpha=0.7, label='Sa agentom')
+    plt.bar(df['run'], df['fixed_avg_waiting'], color='red', alpha=0.7, label='Fiksni vremena')
+    plt.xlabel('Pokretanje')
+    plt.ylabel('Prosečno vreme čekanja (s)')
+    plt.title('Upoređenje vremena čekanja')
+    plt.legend()
+    plt.grid(True)
+
+    # Grafikoni za broj koraka
+    plt.subplot(2, 2, 2)
+    plt.plot(df['run'], df['agent_steps'], 'b-o', label='Sa agentom')
+    plt.plot(df['run'], df['fixed_steps'], 'r-o', label='Fiksni vremena')
+    plt.xlabel('Pokretanje')
+    plt.ylabel('Ukupno koraka simulacije')
+    plt.title('Trajanje simulacije')
+    plt.legend()
+    plt.grid(True)
+
+    # Grafikoni za nagradu
+    plt.subplot(2, 2, 3)
+    plt.bar(df['run'], df['agent_reward'], color='green', alpha=0.7)
+    plt.xlabel('Pokretanje')
+    plt.ylabel('Ukupna nagrada')
+    plt.title('Nagrada agenta po pokretanju')
+    plt.grid(True)
+
+    # Grafikoni za efikasnost
+    plt.subplot(2, 2, 4)
+    efficiency = (df['fixed_steps'] - df['agent_steps']) / df['fixed_steps'] * 100
+    plt.bar(df['run'], efficiency, color='purple', alpha=0.7)
+    plt.xlabel('Pokretanje')
+    plt.ylabel('Poboljšanje (%)')
+    plt.title('Efikasnost agenta u odnosu na fiksna vremena')
+    plt.grid(True)
+    plt.axhline(y=0, color='k', linestyle='-')
+
+    plt.tight_layout()
+    plt.savefig(os.path.join(results_dir, "evaluation_comparison.png"))
+    plt.close()
+    print(f"Grafikoni sačuvani kao {os.path.join(results_dir, 'evaluation_comparison.png')}")
+
+
+def plot_queue_lengths(df, results_dir):
+    plt = _pyplot()
+    plt.figure(figsize=(8, 6))
+    plt.bar(df['run'] - 0.2, df['fixed_avg_queue'], width=0.4, label='Fiksni ciklusi', alpha=0.7, color='red')
+    plt.bar(df['run'] + 0.2, df['agent_avg_queue'], width=0.4, label='Agent', alpha=0.7, color='blue')
+    plt.xlabel('Pokretanje')
+    plt.ylabel('Prosječna dužina reda (vozila)')
+    plt.title('Upoređenje prosječne dužine redova čekanja')
+    plt.legend()
+    plt.grid(True)
+    file_path = os.path.join(results_dir, "queue_length_comparison.png")
+    plt.savefig(file_path)
+    plt.close()
+    print(f"Grafik reda čekanja sačuvan kao {file_path}")
+
+
+def _command(artifacts_dir=None, eval_root=None, eval_dir=None, interval=None, once=False):
+    command = [sys.executable, os.path.abspath(__file__)]
+    if artifacts_dir is not None:
+        command += ["--artifacts", artifacts_dir]
+    if eval_root is not None:
+        command += ["--eval-root", eval_root]
+    if eval_dir is not None:
+        command += ["--eval-dir", eval_dir]
+    if interval is not None:
+        command += ["--interval", str(interval)]
+    if once:
+        command.append("--once")
+    return command
+
+
+def _spawn(command, nice=DASHBOARD_NICE):
+    preexec = (lambda: os.nice(nice)) if hasattr(os, "nice") and nice else None
+    return subprocess.Popen(command, preexec_fn=preexec)
+
+
+def start_dashboard(artifacts_dir, eval_root, interval=DASHBOARD_INTERVAL):
+    """Pokreće proces koji osvježava grafikone svakih interval sekundi"""
+    return _spawn(_command(artifacts_dir, eval_root, interval=interval))
+
+
+def stop_dashboard(process, timeout=120):
+    """Traži završno crtanje i čeka da proces izađe"""
+    if process is None or process.poll() is not None:
+        return
+    process.send_signal(signal.SIGTERM)
+    try:
+        process.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def render_in_background(eval_dir):
+    """Jednokratno crtanje grafikona evaluacije u zasebnom procesu (bez čekanja)"""
+    return _spawn(_command(eval_dir=eval_dir, once=True))
+
+
+def run(training, evaluation, interval, once=False):
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+
+    while True:
+        if training is not None and training.poll():
+            training.render()
+        if evaluation is not None:
+            for results_dir in evaluation.poll():
+                render_evaluation(results_dir)
+        if once or stopping:
+            break
+
+        # Kratki intervali spavanja da SIGTERM brzo dovede do završnog crtanja
+        deadline = time.monotonic() + interval
+        while not stopping and time.monotonic() < deadline:
+            time.sleep(0.5)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grafikoni treniranja i evaluacije van procesa treniranja")
+    parser.add_argument("--artifacts", help="direktorij sa log.csv (i telemetrijom) treniranja")
+    parser.add_argument("--eval-root", help="direktorij sa rezultatima evaluacija po epizodi")
+    parser.add_argument("--eval-dir", help="jedan direktorij rezultata evaluacije")
+    parser.add_argument("--interval", type=float, default=DASHBOARD_INTERVAL, help="sekundi između osvježavanja")
+    parser.add_argument("--once", action="store_true", help="nacrtaj jednom i izađi")
+    args = parser.parse_args()
+
+    if args.eval_dir:
+        render_evaluation(args.eval_dir)
+    if args.artifacts or args.eval_root:
+        training = TrainingDashboard(args.artifacts) if args.artifacts else None
+        evaluation = EvaluationDashboard(args.eval_root) if args.eval_root else None
+        run(training, evaluation, args.interval, args.once)
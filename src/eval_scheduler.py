@@ -0,0 +1,76 @@
+import os
+import queue
+import subprocess
+import sys
+import threading
+from config import EVAL_MAX_CONCURRENT, BACKGROUND_EVAL_WORKERS, EVAL_NICE
+
+# evaluate_agent.py i relativne putanje iz config.py važe iz ovog direktorija
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class EvaluationScheduler:
+    """Evaluira checkpointe (qtable_ep{N}.pkl) u pozadini dok trening traje.
+
+    Checkpointi se stavljaju u red, a najviše max_concurrent evaluacija radi
+    istovremeno, svaka kao poseban proces nižeg prioriteta koji piše u
+    evaluation-results/{N}. Trening nikad ne čeka na evaluaciju osim u close().
+    """
+
+    def __init__(self, max_concurrent=EVAL_MAX_CONCURRENT, workers_per_eval=BACKGROUND_EVAL_WORKERS,
+                 nice=EVAL_NICE, results_root="evaluation-results", run_id="default"):
+        self.workers_per_eval = workers_per_eval
+        self.run_id = run_id
+        self.nice = nice
+        self.results_root = os.path.abspath(results_root)
+        self.pending = queue.Queue()
+        self.threads = [
+            threading.Thread(target=self._worker, daemon=True)
+            for _ in range(max_concurrent)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, checkpoint_path, episode):
+        """Dodaje checkpoint u red za evaluaciju i odmah se vraća"""
+        self.pending.put((os.path.abspath(checkpoint_path), episode))
+
+    def close(self):
+        """Čeka da se sve evaluacije iz reda završe"""
+        for _ in self.threads:
+            self.pending.put(None)
+        for thread in self.threads:
+            thread.join()
+
+    def _worker(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                break
+            self._evaluate(*item)
+
+    def _lower_priority(self):
+        os.nice(self.nice)
+
+    def _evaluate(self, checkpoint_path, episode):
+        results_dir = os.path.join(self.results_root, str(episode))
+        os.makedirs(results_dir, exist_ok=True)
+
+        command = [
+            sys.executable, os.path.join(SRC_DIR, "evaluate_agent.py"),
+            "--run-id", self.run_id,
+            "--checkpoint", checkpoint_path,
+            "--episode", str(episode),
+            "--out", results_dir,
+            "--workers", str(self.workers_per_eval),
+        ]
+        preexec = self._lower_priority if hasattr(os, "nice") and self.nice else None
+
+        with open(os.path.join(results_dir, "evaluation.log"), "w") as log_file:
+            code = subprocess.call(command, stdout=log_file, stderr=subprocess.STDOUT, preexec_fn=preexec,
+                                   cwd=SRC_DIR)
+
+        if code != 0:
+            print(f"Evaluacija checkpointa {checkpoint_path} nije uspjela (kod {code})")
+        else:
+            print(f"Evaluacija nakon {episode} epizoda završena: {results_dir}")
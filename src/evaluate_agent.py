@@ -1,20 +1,30 @@
+import argparse
 import os
-import pickle
 import random
-import traci
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import pandas as pd
-import matplotlib.pyplot as plt
 from utils import (
-    QLearningAgent,
     check_sumo_home,
     generate_random_routes,
-    get_phase_count,
     get_state,
     calculate_reward
 )
+from session import acquire_simulation, release_simulation, close_sessions
+from observation import Observer
+from termination import TerminationMonitor
+from qtable import make_agent
+from checkpoint import load_q_table
+from run_state import RunStore
+from route_cache import RouteCache
+from snapshot import SnapshotCache
+from crop_network import episode_inputs
+from telemetry import TelemetryWriter
+from dashboard import render_in_background
+from profiling import profiler
 from config import (
     NUM_ROUTE_VARIATIONS,
-    SIMULATION_FOLDER,
     TL_ID,
     MIN_PHASE_DURATION,
     MAX_PHASE_DURATION,
@@ -22,46 +32,69 @@ from config import (
     SUMO_BINARY_EVAL,
     MAX_STEPS,
     NUM_EVAL_EPISODES,
-    EVAL_Q_TABLE_PATH,
-    episodes_done
+    NUM_EVAL_WORKERS,
+    EVAL_SCRATCH_DIR,
+    SIM_BACKEND,
+    DECISION_INTERVAL,
+    TRIPS_FILE,
+    USE_ROUTE_CACHE,
+    USE_SNAPSHOTS,
+    EVAL_ON_CROPPED_NET,
+    TELEMETRY_ENABLED,
+    TELEMETRY_DIR,
+    EVAL_RESULTS_ROOT,
+    RUN_ID
 )
 
 check_sumo_home()
 
-EVAL_RESULTS_DIR = os.path.join("evaluation-results", str(episodes_done+1))
-os.makedirs(EVAL_RESULTS_DIR, exist_ok=True)
+def load_eval_agent(q_table_path):
+    """Učitava naučenu Q-tabelu (.pkl ili binarni .qtc) u agenta bez učenja i istraživanja"""
+    agent = make_agent(actions=[0, 1])
+    load_q_table(agent, q_table_path)
+    agent.alpha = 0.0    # Onemogući učenje tokom evaluacije
+    agent.epsilon = 0.0  # Onemogući istraživanje tokom evaluacije
+    return agent
 
-# Load learned Q-table
-try:
-    with open(EVAL_Q_TABLE_PATH+str(episodes_done+1)+".pkl", "rb") as f:
-        q_table = pickle.load(f)
-    print("Uspješno učitana Q-tabela za evaluaciju!")
-except FileNotFoundError:
-    print("Greška: Q-tabela nije pronađena. Prvo izvršite treniranje.")
-    exit(1)
+def evaluate_simulation(route_file, sim_generating_end, agent=None, seed=None, backend=SIM_BACKEND,
+                        decision_interval=DECISION_INTERVAL, telemetry=None, state=None, config_file=CONFIG_FILE,
+                        monitor=None):
+    """Pokreće jednu simulaciju i prikuplja metriku performansi.
 
-# Initialize agent with learned Q-table
-agent = QLearningAgent(actions=[0, 1])
-agent.q_table = q_table
-agent.alpha = 0.0    # Onemogući učenje tokom evaluacije
-agent.epsilon = 0.0  # Onemogući istraživanje tokom evaluacije
+    Čista funkcija: rute, kraj generisanja i agent dolaze kao argumenti
+    (agent=None znači fiksna vremena semafora), nema globalnog stanja ni chdir.
+    Sa decision_interval > 1 metrike se uzorkuju u tačkama odluke i
+    ponderišu brojem preskočenih koraka. telemetry (TelemetryWriter) dobija
+    zapis svakog opaženog koraka. Sa state (snimak stanja) simulacija
+    počinje od vremena snimka, a metrike obuhvataju samo dio nakon njega.
+    config_file bira punu ili izrezanu mrežu (crop_network.py). Simulacija
+    prekinuta u zastoju (monitor, isti kao u treningu) se računa kao da je
+    trajala MAX_STEPS koraka, a razlog je u metrics['termination'].
+    """
+    use_agent = agent is not None
 
-def evaluate_simulation(use_agent=True, seed=None):
-    """Pokreće jednu simulaciju i prikuplja metriku performansi"""
-    # Generiši rute sa zadatim seed-om
-    # os.chdir(SIMULATION_FOLDER)
-    # sim_generating_end = generate_random_routes(seed)
-    # os.chdir("../src")
+    # Izjednačavanje Q-vrijednosti se rješava slučajno; lokalni generator sa
+    # seedom čini rezultat ponovljivim bez diranja globalnog random stanja
+    rng = random.Random(seed) if seed is not None else random
     
     # Pokreni SUMO
-    traci.start([SUMO_BINARY_EVAL, "-c", CONFIG_FILE, "--no-warnings", "--no-step-log"])
+    with profiler.section("start"):
+        conn = profiler.wrap_connection(acquire_simulation(
+            [SUMO_BINARY_EVAL, "-c", config_file, "--no-warnings", "--no-step-log", "--route-files", route_file],
+            backend=backend, state=state
+        ))
+        observer = Observer(TL_ID, conn, interval=decision_interval)
+        observer.subscribe()
     
-    step = 0
-    last_action_time = 0
+    step = int(conn.simulation.getTime())
+    last_action_time = step
     cumulative_waiting = 0
     measurement_count = 0
     total_reward = 0
-    total_departed = 0
+    total_departed = len(observer.vehicle_ids)  # vozila već u mreži (snimak)
+    if monitor is None:
+        monitor = TerminationMonitor()
+    monitor.reset(step)
     total_arrived = 0
     cumulative_queue_length = 0
     queue_measurement_count = 0
@@ -76,48 +109,61 @@ def evaluate_simulation(use_agent=True, seed=None):
     }
     
     while step < MAX_STEPS:
-        traci.simulationStep()
-        step += 1
+        with profiler.section("sumo_step"):
+            if decision_interval > 1:
+                elapsed = min(decision_interval, MAX_STEPS - step)
+                conn.simulationStep(step + elapsed)
+            else:
+                elapsed = 1
+                conn.simulationStep()
+        step += elapsed
+        profiler.count("steps", elapsed)
+        with profiler.section("observe"):
+            observer.update()
         
         # Ažuriraj broj vozila
-        departed = traci.simulation.getDepartedNumber()
-        arrived = traci.simulation.getArrivedNumber()
+        departed = observer.departed
+        arrived = observer.arrived
         
         # Prikupi podatke o čekanju
-        waiting_times = [traci.vehicle.getWaitingTime(veh_id) for veh_id in traci.vehicle.getIDList()]
-        if waiting_times:
-            cumulative_waiting += sum(waiting_times)
-            measurement_count += len(waiting_times)
+        if observer.vehicle_count:
+            cumulative_waiting += observer.waiting_sum * elapsed
+            measurement_count += observer.vehicle_count * elapsed
         
         # Provjera kraja simulacije
         if step > sim_generating_end:
             if total_arrived+arrived >= total_departed+departed:
                 break
             
-        current_state = get_state(TL_ID)
+        with profiler.section("observe"):
+            current_state = get_state(TL_ID, observer=observer)
+        if monitor.check(step, current_state, observer) is not None:
+            print(f"Simulacija prekinuta u koraku {step}: {monitor.reason}")
+            break
         total_queue = sum(current_state[2:])  # sve nakon faze i trajanja su redovi
-        cumulative_queue_length += total_queue
-        queue_measurement_count += 1
-
+        cumulative_queue_length += total_queue * elapsed
+        queue_measurement_count += elapsed
+        reward = 0.0
+        action = 0
         
         # Ako koristimo agenta, odredi akciju
         if use_agent:
-            current_phase = traci.trafficlight.getPhase(TL_ID)
+            current_phase = observer.phase
             if current_phase == -1:
                 continue
 
-            current_state = get_state(TL_ID)
-                
+            # current_state je već opažen u ovom koraku (nakon simulationStep)
             if step - last_action_time >= MIN_PHASE_DURATION:
                 if step - last_action_time >= MAX_PHASE_DURATION:
                     action = 1
                 else:
-                    action = agent.choose_action(current_state)
+                    with profiler.section("choose_action"):
+                        action = agent.choose_action(current_state, rng)
                 
                 if action == 1:
                     #current_phase = traci.trafficlight.getPhase(TL_ID)
-                    new_phase = (current_phase + 1) % get_phase_count(TL_ID)
-                    traci.trafficlight.setPhase(TL_ID, new_phase)
+                    new_phase = observer.topology.next_phase(current_phase)
+                    observer.set_phase(new_phase)
                     last_action_time = step
                     #phase_options = list(range(get_phase_count()))
                     #phase_options.remove(current_phase)  # Ukloni trenutnu fazu
@@ -142,14 +188,19 @@ def evaluate_simulation(use_agent=True, seed=None):
                 action = 0
             
             # Izračunaj nagradu (samo za praćenje, ne za učenje)
-            reward = calculate_reward(current_state)
+            reward = calculate_reward(current_state) * decision_interval
             total_reward += reward        
+
+        if telemetry is not None:
+            with profiler.section("telemetry"):
+                telemetry.record(step, current_state, observer.waiting_sum, observer.vehicle_count, reward, action)
             
         total_arrived += arrived
         total_departed += departed
     
-    # Prikupi finalne metrike
-    metrics['total_steps'] = step
+    # Prikupi finalne metrike; zastoj ne smije izgledati kao kraća simulacija
+    metrics['total_steps'] = MAX_STEPS if monitor.reason else step
+    metrics['termination'] = monitor.reason or ""
     metrics['departed'] = departed
     metrics['arrived'] = arrived
     metrics['avg_waiting'] = cumulative_waiting / measurement_count if measurement_count > 0 else 0
@@ -157,13 +208,14 @@ def evaluate_simulation(use_agent=True, seed=None):
     metrics['avg_queue_length'] = cumulative_queue_length / queue_measurement_count if queue_measurement_count > 0 else 0
 
     
-    traci.close()
+    with profiler.section("close"):
+        release_simulation(conn)
     return metrics
 
-def save_results(results, filename="evaluation_results.csv"):
+def save_results(results, results_dir, filename="evaluation_results.csv"):
     """Čuva rezultate evaluacije u CSV fajl"""
-    os.makedirs("evaluation-results", exist_ok=True)
-    path = os.path.join(EVAL_RESULTS_DIR, filename)
+    os.makedirs(results_dir, exist_ok=True)
+    path = os.path.join(results_dir, filename)
     
     df = pd.DataFrame(results)
     df.to_csv(path, index=False)
@@ -171,116 +223,184 @@ def save_results(results, filename="evaluation_results.csv"):
     
     return df
 
-def plot_results(df):
-    """Generiše grafikone za rezultate evaluacije"""
-    plt.figure(figsize=(15, 10))
+# Agent u procesima evaluacionog poola (postavlja ga _init_eval_worker)
+_worker_agent = None
+
+def _init_eval_worker(q_table):
+    global _worker_agent
+    _worker_agent = make_agent(actions=[0, 1], alpha=0.0, epsilon=0.0)
+    _worker_agent.q_table = q_table
+
+def evaluate_run(run, scratch_root=EVAL_SCRATCH_DIR, agent=None, backend=SIM_BACKEND, telemetry_dir=None,
+                 profile_dir=None):
+    """Jedan par fiksna vremena / agent nad istim rutama, u izolovanom direktoriju.
+
+    Sa telemetry_dir se koraci obje simulacije upisuju u run{N}_fixed i run{N}_agent,
+    a sa profile_dir (i uključenim profilerom) tamo ide raspodjela vremena.
+    """
+    if agent is None:
+        agent = _worker_agent
+
+    print(f"\n{'='*50}")
+    print(f"Evaluacijsko pokretanje {run}/{NUM_EVAL_EPISODES}")
     
-    # Grafikoni za vreme čekanja
-    plt.subplot(2, 2, 1)
-    plt.bar(df['run'], df['agent_avg_waiting'], color='blue', alpha=0.7, label='Sa agentom')
-    plt.bar(df['run'], df['fixed_avg_waiting'], color='red', alpha=0.7, label='Fiksni vremena')
-    plt.xlabel('Pokretanje')
-    plt.ylabel('Prosečno vreme čekanja (s)')
-    plt.title('Upoređenje vremena čekanja')
-    plt.legend()
-    plt.grid(True)
+    # Generiši jedinstveni seed za obe varijante
+    seed = run % NUM_ROUTE_VARIATIONS
+    work_dir = os.path.abspath(os.path.join(scratch_root, f"run{run}"))
+    config_file = CONFIG_FILE
+    if USE_ROUTE_CACHE:
+        config_file, route_file, sim_generating_end = episode_inputs(seed, EVAL_ON_CROPPED_NET)
+    else:
+        sim_generating_end = generate_random_routes(seed, out_dir=work_dir)
+        route_file = os.path.join(work_dir, TRIPS_FILE)
+
+    # Obje grane počinju od istog zagrijanog stanja umjesto da ponavljaju početak
+    state = None
+    if USE_SNAPSHOTS and USE_ROUTE_CACHE:
+        state = SnapshotCache(backend=backend, cropped=EVAL_ON_CROPPED_NET).get(seed)
     
-    # Grafikoni za broj koraka
-    plt.subplot(2, 2, 2)
-    plt.plot(df['run'], df['agent_steps'], 'b-o', label='Sa agentom')
-    plt.plot(df['run'], df['fixed_steps'], 'r-o', label='Fiksni vremena')
-    plt.xlabel('Pokretanje')
-    plt.ylabel('Ukupno koraka simulacije')
-    plt.title('Trajanje simulacije')
-    plt.legend()
-    plt.grid(True)
+    telemetry = {}
+    if telemetry_dir is not None:
+        telemetry = {
+            variant: TelemetryWriter(telemetry_dir, f"run{run:03d}_{variant}")
+            for variant in ("fixed", "agent")
+        }
+
+    profile_dir = profile_dir or EVAL_RESULTS_ROOT
+
+    # Pokreni sa fiksnim vremenima semafora
+    with profiler.episode(f"run{run:03d}_fixed", profile_dir):
+        fixed_metrics = evaluate_simulation(route_file, sim_generating_end, seed=seed, backend=backend,
+                                            telemetry=telemetry.get("fixed"), state=state,
+                                            config_file=config_file)
+    print(f"[{run}] Fiksna vremena: Koraci={fixed_metrics['total_steps']}, Čekanje={fixed_metrics['avg_waiting']:.2f}s")
     
-    # Grafikoni za nagradu
-    plt.subplot(2, 2, 3)
-    plt.bar(df['run'], df['agent_reward'], color='green', alpha=0.7)
-    plt.xlabel('Pokretanje')
-    plt.ylabel('Ukupna nagrada')
-    plt.title('Nagrada agenta po pokretanju')
-    plt.grid(True)
+    # Pokreni sa agentom
+    with profiler.episode(f"run{run:03d}_agent", profile_dir):
+        agent_metrics = evaluate_simulation(route_file, sim_generating_end, agent=agent, seed=seed, backend=backend,
+                                            telemetry=telemetry.get("agent"), state=state,
+                                            config_file=config_file)
+    for writer in telemetry.values():
+        writer.close()
+    print(f"[{run}] Agent: Koraci={agent_metrics['total_steps']}, Čekanje={agent_metrics['avg_waiting']:.2f}s, Nagrada={agent_metrics['total_reward']:.2f}")
     
-    # Grafikoni za efikasnost
-    plt.subplot(2, 2, 4)
-    efficiency = (df['fixed_steps'] - df['agent_steps']) / df['fixed_steps'] * 100
-    plt.bar(df['run'], efficiency, color='purple', alpha=0.7)
-    plt.xlabel('Pokretanje')
-    plt.ylabel('Poboljšanje (%)')
-    plt.title('Efikasnost agenta u odnosu na fiksna vremena')
-    plt.grid(True)
-    plt.axhline(y=0, color='k', linestyle='-')
+    shutil.rmtree(work_dir, ignore_errors=True)
     
-    plt.tight_layout()
-    plt.savefig(os.path.join(EVAL_RESULTS_DIR, "evaluation_comparison.png"))
-    print(f"Grafikoni sačuvani kao {os.path.join(EVAL_RESULTS_DIR, 'evaluation_comparison.png')}")
+    return {
+        'run': run,
+        'seed': seed,
+        'fixed_steps': fixed_metrics['total_steps'],
+        'fixed_avg_waiting': fixed_metrics['avg_waiting'],
+        'agent_steps': agent_metrics['total_steps'],
+        'agent_avg_waiting': agent_metrics['avg_waiting'],
+        'agent_reward': agent_metrics['total_reward'],
+        'improvement_steps': fixed_metrics['total_steps'] - agent_metrics['total_steps'],
+        'improvement_waiting': fixed_metrics['avg_waiting'] - agent_metrics['avg_waiting'],
+        'fixed_avg_queue': fixed_metrics['avg_queue_length'],
+        'agent_avg_queue': agent_metrics['avg_queue_length'],
+        'fixed_termination': fixed_metrics['termination'],
+        'agent_termination': agent_metrics['termination'],
+    }
 
-def plot_queue_lengths(df):
-    plt.figure(figsize=(8, 6))
-    plt.bar(df['run'] - 0.2, df['fixed_avg_queue'], width=0.4, label='Fiksni ciklusi', alpha=0.7, color='red')
-    plt.bar(df['run'] + 0.2, df['agent_avg_queue'], width=0.4, label='Agent', alpha=0.7, color='blue')
-    plt.xlabel('Pokretanje')
-    plt.ylabel('Prosječna dužina reda (vozila)')
-    plt.title('Upoređenje prosječne dužine redova čekanja')
-    plt.legend()
-    plt.grid(True)
-    file_path = os.path.join(EVAL_RESULTS_DIR, "queue_length_comparison.png")
-    plt.savefig(file_path)
-    plt.close()
-    print(f"Grafik reda čekanja sačuvan kao {file_path}")
+def run_evaluation(agent, num_runs=NUM_EVAL_EPISODES, workers=NUM_EVAL_WORKERS, scratch_root=EVAL_SCRATCH_DIR,
+                   telemetry_dir=None, profile_dir=None):
+    """Evaluira num_runs parova; sa workers > 1 koristi pool procesa.
 
-if __name__ == "__main__":
-    results = []
-    
-    for i in range(1, NUM_EVAL_EPISODES + 1):
-        print(f"\n{'='*50}")
-        print(f"Evaluacijsko pokretanje {i}/{NUM_EVAL_EPISODES}")
-        
-        # Generiši jedinstveni seed za obe varijante
-        seed = i % NUM_ROUTE_VARIATIONS
-        
-        os.chdir(SIMULATION_FOLDER)
-        sim_generating_end = generate_random_routes(seed)
-        os.chdir("../src")
-        
-        # Pokreni sa fiksnim vremenima semafora
-        print("Pokrećem simulaciju sa FIKSNIM vremenima semafora...")
-        fixed_metrics = evaluate_simulation(use_agent=False, seed=seed)
-        print(f"Završeno sa fiksnim vremenima: Koraci={fixed_metrics['total_steps']}, Čekanje={fixed_metrics['avg_waiting']:.2f}s")
-        
-        # Pokreni sa agentom
-        print("Pokrećem simulaciju sa AGENTOM...")
-        agent_metrics = evaluate_simulation(use_agent=True, seed=seed)
-        print(f"Završeno sa agentom: Koraci={agent_metrics['total_steps']}, Čekanje={agent_metrics['avg_waiting']:.2f}s, Nagrada={agent_metrics['total_reward']:.2f}")
-        
-        # Sačuvaj rezultate
-        results.append({
-            'run': i,
-            'seed': seed,
-            'fixed_steps': fixed_metrics['total_steps'],
-            'fixed_avg_waiting': fixed_metrics['avg_waiting'],
-            'agent_steps': agent_metrics['total_steps'],
-            'agent_avg_waiting': agent_metrics['avg_waiting'],
-            'agent_reward': agent_metrics['total_reward'],
-            'improvement_steps': fixed_metrics['total_steps'] - agent_metrics['total_steps'],
-            'improvement_waiting': fixed_metrics['avg_waiting'] - agent_metrics['avg_waiting'],
-            'fixed_avg_queue': fixed_metrics['avg_queue_length'],
-            'agent_avg_queue': agent_metrics['avg_queue_length'],
-        })
-    
-    # Sačuvaj i prikaži rezultate
-    df = save_results(results)
-    plot_results(df)
-    plot_queue_lengths(df)
+    Rezultati su sortirani po rednom broju pokretanja, pa je izlaz isti kao
+    kod serijskog izvršavanja za iste seedove.
+    """
+    runs = range(1, num_runs + 1)
+    if USE_ROUTE_CACHE:
+        seeds = sorted({run % NUM_ROUTE_VARIATIONS for run in runs})
+        RouteCache().warm(seeds)
+        if USE_SNAPSHOTS:
+            SnapshotCache(cropped=EVAL_ON_CROPPED_NET).warm(seeds)
+            if workers > 1:
+                # Workeri pokreću svoj SUMO; sesija roditelja ne smije preći u pool
+                close_sessions()
+
+    if workers <= 1:
+        results = [evaluate_run(run, scratch_root, agent, telemetry_dir=telemetry_dir, profile_dir=profile_dir)
+                   for run in runs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_eval_worker,
+                                 initargs=(agent.q_table,)) as pool:
+            run_one = partial(evaluate_run, scratch_root=scratch_root, telemetry_dir=telemetry_dir,
+                              profile_dir=profile_dir)
+            results = list(pool.map(run_one, runs))
+    shutil.rmtree(scratch_root, ignore_errors=True)
+    return sorted(results, key=lambda row: row['run'])
+
+def report(results, results_dir, num_runs=NUM_EVAL_EPISODES):
+    """Čuva CSV, pokreće crtanje grafikona i vraća prosječno poboljšanje"""
+    df = save_results(results, results_dir)
+    # Grafikoni se crtaju u zasebnom procesu, evaluacija ne čeka na matplotlib
+    render_in_background(results_dir)
     
-    # Prikaz ukupnog poboljšanja
+    # Trajanje uključuje sva pokretanja (zastoj se računa kao MAX_STEPS), a
+    # čekanje i red samo pokretanja bez zastoja u obje grane, jer su u
+    # prekinutoj simulaciji izmjereni samo do prekida
     avg_step_improvement = df['improvement_steps'].mean()
-    avg_waiting_improvement = df['improvement_waiting'].mean()
+    completed = df[(df['fixed_termination'].fillna("") == "") & (df['agent_termination'].fillna("") == "")]
+    avg_waiting_improvement = completed['improvement_waiting'].mean()
     
     print("\n" + "="*50)
-    print(f"PROSEČNO POBOLJŠANJE U {NUM_EVAL_EPISODES} POKRETANJA:")
+    print(f"PROSEČNO POBOLJŠANJE U {num_runs} POKRETANJA:")
     print(f"Skraćenje trajanja simulacije: {avg_step_improvement:.1f} koraka ({avg_step_improvement/df['fixed_steps'].mean()*100:.1f}%)")
-    print(f"Smanjenje vremena čekanja: {avg_waiting_improvement:.1f} sekundi ({avg_waiting_improvement/df['fixed_avg_waiting'].mean()*100:.1f}%)")
-    print("="*50)
\ No newline at end of file
+    gridlocked = len(df) - len(completed)
+    if gridlocked:
+        print(f"Zastoj u {gridlocked} od {len(df)} pokretanja (agent: "
+              f"{int((df['agent_termination'].fillna('') != '').sum())}); čekanje i red su prosjek "
+              f"preostalih {len(completed)} pokretanja")
+    if len(completed):
+        print(f"Smanjenje vremena čekanja: {avg_waiting_improvement:.1f} sekundi ({avg_waiting_improvement/completed['fixed_avg_waiting'].mean()*100:.1f}%)")
+    else:
+        print("Nijedno pokretanje nije završeno bez zastoja, čekanje se ne poredi")
+    print("="*50)
+    
+    return {
+        'avg_step_improvement': float(avg_step_improvement),
+        'avg_waiting_improvement': float(avg_waiting_improvement),
+        'fixed_avg_waiting': float(completed['fixed_avg_waiting'].mean()),
+        'agent_avg_waiting': float(completed['agent_avg_waiting'].mean()),
+        'gridlocked_runs': int(gridlocked),
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Evaluacija naučenog agenta naspram fiksnih vremena")
+    parser.add_argument("--run-id", default=RUN_ID, help="run iz run-state baze")
+    parser.add_argument("--episode", type=int, help="podrazumijevano posljednji checkpoint runa")
+    parser.add_argument("--checkpoint", help="putanja do Q-tabele (podrazumijevano iz run-state baze)")
+    parser.add_argument("--out", help="direktorij za rezultate (podrazumijevano evaluation-results/{episode})")
+    parser.add_argument("--workers", type=int, default=NUM_EVAL_WORKERS)
+    args = parser.parse_args()
+
+    store = RunStore(args.run_id)
+    episode, checkpoint = args.episode, args.checkpoint
+    if episode is None:
+        episode, latest_path = store.latest_checkpoint() or (None, None)
+        checkpoint = checkpoint or latest_path
+    elif checkpoint is None:
+        checkpoint = store.checkpoint_path(episode)
+
+    if checkpoint is None:
+        print("Greška: Q-tabela nije pronađena. Prvo izvršite treniranje.")
+        exit(1)
+    results_dir = args.out or os.path.join(store.eval_dir, str(episode))
+    
+    # Load learned Q-table
+    try:
+        agent = load_eval_agent(checkpoint)
+        print("Uspješno učitana Q-tabela za evaluaciju!")
+    except FileNotFoundError:
+        print("Greška: Q-tabela nije pronađena. Prvo izvršite treniranje.")
+        exit(1)
+    
+    # Svaka evaluacija ima vlastiti scratch direktorij (više evaluacija može raditi istovremeno)
+    scratch_root = os.path.join(EVAL_SCRATCH_DIR, f"{args.run_id}-{episode}")
+    telemetry_dir = os.path.join(results_dir, TELEMETRY_DIR) if TELEMETRY_ENABLED else None
+    results = run_evaluation(agent, workers=args.workers, scratch_root=scratch_root, telemetry_dir=telemetry_dir,
+                             profile_dir=results_dir)
+    summary = report(results, results_dir)
+    store.record_evaluation(episode, results_dir, summary)
+    store.close()
@@ -0,0 +1,502 @@
+import argparse
+import os
+import pickle
+import time
+import numpy as np
+import traci.constants as tc
+from backend import start_simulation, available_backends
+from session import acquire_simulation, release_simulation
+from qtable import make_agent, ArrayQLearningAgent, StateEncoder
+from observation import ApproachTracker, VEHICLE_VARS
+from route_cache import RouteCache
+from run_state import RunStore
+from run_training import log_episode
+from termination import TerminationMonitor
+from topology import load_all_topologies
+from utils import check_sumo_home, generate_random_routes
+from config import (
+    ALPHA,
+    GAMMA,
+    EPSILON,
+    ALPHA_DECAY,
+    EPSILON_DECAY,
+    MIN_PHASE_DURATION,
+    MAX_PHASE_DURATION,
+    CONFIG_FILE,
+    SUMO_BINARY,
+    MAX_STEPS,
+    NUM_EPISODES,
+    NUM_ROUTE_VARIATIONS,
+    SIMULATION_FOLDER,
+    SIM_BACKEND,
+    TRIPS_FILE,
+    USE_ROUTE_CACHE,
+    MULTI_TLS_IDS,
+    MULTI_SHARED_AGENT,
+    GRIDLOCK_PENALTY,
+    DENSE_TABLE_MAX_STATES
+)
+
+
+class MultiObserver:
+    """Opservacije svih kontrolisanih semafora iz jednog skupa pretplata.
+
+    Rezultati pretplata se čitaju jednim getAllSubscriptionResults po
+    domenu, bez obzira na broj raskrsnica. Trake svih raskrsnica su spojene
+    u jedan niz, pa se redovi po prilazima i nagrade za sve raskrsnice
+    računaju nekoliko NumPy operacija po koraku. Čekanje i teleportacije
+    za prepoznavanje zastoja prate se na prilazima svih raskrsnica.
+    """
+
+    def __init__(self, conn, topologies):
+        self.conn = conn
+        self.topologies = list(topologies)
+        self.tls_ids = [topology.tls_id for topology in self.topologies]
+
+        # Jedinstvene trake svih raskrsnica i segment (raskrsnica, prilaz) za svaki link
+        self.lanes = list(dict.fromkeys(lane for topology in self.topologies for lane in topology.lanes))
+        lane_position = {lane: i for i, lane in enumerate(self.lanes)}
+        link_lane, link_segment, offsets = [], [], [0]
+        for topology in self.topologies:
+            link_lane.extend(lane_position[lane] for lane in topology.links)
+            link_segment.extend((offsets[-1] + topology.link_approach).tolist())
+            offsets.append(offsets[-1] + topology.n_approaches)
+        self.link_lane = np.array(link_lane, dtype=np.int64)
+        self.link_segment = np.array(link_segment, dtype=np.int64)
+        self.offsets = np.array(offsets, dtype=np.int64)
+        self.segment_lane_counts = np.bincount(self.link_segment, minlength=offsets[-1])
+        self.n_approaches = np.diff(self.offsets)
+        self.n_phases = np.array([topology.n_phases for topology in self.topologies], dtype=np.int64)
+
+        # Vrijednosti posljednjeg koraka
+        n = len(self.topologies)
+        self.phases = np.full(n, -1, dtype=np.int64)
+        self.phase_durations = np.zeros(n)
+        self.queues = np.zeros(offsets[-1])
+        self.departed = 0
+        self.arrived = 0
+        self.waiting_sum = 0.0
+        self.vehicle_count = 0
+        self.tracker = ApproachTracker(edge for topology in self.topologies for edge in topology.approaches)
+        self.approach_waiting_max = 0.0
+        self.teleports = 0
+
+    def subscribe(self):
+        """Postavlja pretplate za sve raskrsnice; poziva se jednom po simulaciji"""
+        conn = self.conn
+        conn.simulation.subscribe([
+            tc.VAR_DEPARTED_VEHICLES_NUMBER,
+            tc.VAR_ARRIVED_VEHICLES_NUMBER,
+            tc.VAR_DEPARTED_VEHICLES_IDS,
+            tc.VAR_TELEPORT_STARTING_VEHICLES_IDS,
+        ])
+        for tls_id in self.tls_ids:
+            conn.trafficlight.subscribe(tls_id, [tc.TL_CURRENT_PHASE, tc.TL_PHASE_DURATION])
+        for lane in self.lanes:
+            conn.lane.subscribe(lane, [tc.LAST_STEP_VEHICLE_NUMBER])
+        for veh_id in conn.vehicle.getIDList():
+            conn.vehicle.subscribe(veh_id, VEHICLE_VARS)
+        self.update()
+
+    def update(self):
+        """Čita rezultate svih pretplata nakon simulationStep"""
+        conn = self.conn
+
+        sim = conn.simulation.getSubscriptionResults()
+        self.departed = sim.get(tc.VAR_DEPARTED_VEHICLES_NUMBER, 0)
+        self.arrived = sim.get(tc.VAR_ARRIVED_VEHICLES_NUMBER, 0)
+        for veh_id in sim.get(tc.VAR_DEPARTED_VEHICLES_IDS, ()):
+            conn.vehicle.subscribe(veh_id, VEHICLE_VARS)
+
+        tls = conn.trafficlight.getAllSubscriptionResults()
+        for i, tls_id in enumerate(self.tls_ids):
+            values = tls.get(tls_id, {})
+            self.phases[i] = values.get(tc.TL_CURRENT_PHASE, -1)
+            self.phase_durations[i] = values.get(tc.TL_PHASE_DURATION, 0)
+
+        lanes = conn.lane.getAllSubscriptionResults()
+        lane_vehicles = np.fromiter(
+            (lanes[lane][tc.LAST_STEP_VEHICLE_NUMBER] if lane in lanes else 0 for lane in self.lanes),
+            dtype=float, count=len(self.lanes)
+        )
+        totals = np.bincount(self.link_segment, weights=lane_vehicles[self.link_lane],
+                             minlength=len(self.segment_lane_counts))
+        self.queues = totals / self.segment_lane_counts
+
+        vehicles = conn.vehicle.getAllSubscriptionResults()
+        self.waiting_sum = sum(values[tc.VAR_WAITING_TIME] for values in vehicles.values())
+        self.vehicle_count = len(vehicles)
+        self.tracker.update(vehicles, sim.get(tc.VAR_TELEPORT_STARTING_VEHICLES_IDS, ()))
+        self.teleports = self.tracker.teleports
+        self.approach_waiting_max = self.tracker.waiting_max
+
+    def max_junction_queue(self):
+        """Najveći ukupan red jedne raskrsnice (zbir prosjeka po prilazu), za TerminationMonitor"""
+        return float(np.add.reduceat(self.queues, self.offsets[:-1]).max())
+
+    def states(self):
+        """Stanja svih raskrsnica, u formatu utils.get_state"""
+        queues = self.queues.tolist()
+        return [
+            (int(phase), float(duration)) + tuple(queues[start:end])
+            for phase, duration, start, end in zip(self.phases, self.phase_durations,
+                                                   self.offsets[:-1], self.offsets[1:])
+        ]
+
+    def rewards(self):
+        """utils.calculate_reward za sve raskrsnice odjednom"""
+        starts = self.offsets[:-1]
+        queue_penalty = np.add.reduceat(self.queues ** 2, starts) / self.n_approaches
+        max_queue = np.maximum.reduceat(self.queues, starts)
+        congested = (max_queue > 20) & (self.phase_durations > 60)
+        duration_penalty = np.where(congested, (self.phase_durations - 60) * 1.2, 0.0)
+        return -(queue_penalty + duration_penalty)
+
+    def set_phases(self, indices, phases):
+        """Postavlja faze za više raskrsnica odjednom (samo one koje mijenjaju fazu)"""
+        for i, phase in zip(indices.tolist(), phases.tolist()):
+            self.conn.trafficlight.setPhase(self.tls_ids[i], phase)
+            self.phases[i] = phase
+            self.phase_durations[i] = self.topologies[i].phase_duration(phase)
+
+
+class SharedGroup:
+    """Raskrsnice koje dijele jednog ArrayQLearningAgent-a (isti broj prilaza).
+
+    Stanja svih raskrsnica grupe se enkodiraju jednim encode_batch, akcije
+    biraju jednim choose_actions, a prijelazi uče jednim learn_batch, pa
+    cijena koraka ne raste sa Python petljom po raskrsnici.
+    """
+
+    def __init__(self, agent, indices, observer):
+        self.agent = agent
+        self.indices = np.asarray(indices, dtype=np.int64)
+        n_queues = int(observer.n_approaches[self.indices[0]])
+        # Pozicije redova svake raskrsnice grupe u spojenom nizu observer.queues
+        self.queue_index = observer.offsets[self.indices][:, None] + np.arange(n_queues)
+        self.actions = np.asarray(agent.actions)
+        n = len(self.indices)
+        self.prev_states = np.zeros(n, dtype=np.int64)
+        self.prev_actions = np.zeros(n, dtype=np.int64)
+        self.prev_rewards = np.zeros(n)
+        self.has_prev = np.zeros(n, dtype=bool)
+
+    def step(self, obs, rewards, active, eligible, forced, switch, learn, done=False):
+        """Vraća zbir kazni zastoja dodanih nagradama terminalnih prijelaza"""
+        mask = active[self.indices]
+        if not mask.any():
+            return 0.0
+        members = self.indices[mask]
+        states = np.column_stack((obs.phases[members], obs.phase_durations[members],
+                                  obs.queues[self.queue_index[mask]]))
+        encoded = self.agent.encoder.encode_batch(states)
+
+        # Učenje na prijelazima s -> s' svih aktivnih raskrsnica grupe
+        learned = self.has_prev[mask]
+        positions = np.flatnonzero(mask)[learned]
+        penalty = GRIDLOCK_PENALTY * len(positions) if done else 0.0
+        if learn and len(positions):
+            rewards_learned = self.prev_rewards[positions] + (GRIDLOCK_PENALTY if done else 0.0)
+            self.agent.learn_batch(self.prev_states[positions], self.prev_actions[positions],
+                                   rewards_learned, encoded[learned], np.full(len(positions), done))
+        if done:
+            return penalty
+
+        # Bez odluke akcija je promjena faze samo kad je istekao MAX_PHASE_DURATION
+        chosen = np.where(eligible[members], self.agent.choose_actions(encoded),
+                          forced[members].astype(np.int64))
+        switch[members] |= self.actions[chosen] == 1
+
+        self.prev_states[mask] = encoded
+        self.prev_actions[mask] = chosen
+        self.prev_rewards[mask] = rewards[members]
+        self.has_prev[mask] = True
+        return 0.0
+
+
+class MultiIntersectionController:
+    """Upravlja svim raskrsnicama MultiObserver-a.
+
+    agents je lista agenata po raskrsnici; za zajedničku Q-tabelu ista
+    instanca se ponavlja za sve raskrsnice. Ograničenja trajanja faza i
+    promjene faza računaju se vektorski, a agent se pita samo za
+    raskrsnice kojima je istekao MIN_PHASE_DURATION. Raskrsnice sa
+    zajedničkim ArrayQLearningAgent-om idu kroz SharedGroup (vektorski),
+    ostale kroz petlju po raskrsnici. Agenti po raskrsnici (bez --shared)
+    su referentni, spori način: Python rad po koraku raste linearno sa
+    brojem raskrsnica, a gusta tabela po raskrsnici bi zauzela previše
+    memorije, pa za veće mreže treba koristiti zajedničkog agenta.
+    """
+
+    def __init__(self, agents, observer):
+        self.agents = agents
+        self.observer = observer
+        n = len(observer.tls_ids)
+        self.last_action_time = np.zeros(n, dtype=np.int64)
+        self.previous = [None] * n
+        self.total_reward = 0.0
+
+        members = {}
+        for i, agent in enumerate(agents):
+            if isinstance(agent, ArrayQLearningAgent):
+                members.setdefault(id(agent), (agent, []))[1].append(i)
+        self.groups = [SharedGroup(agent, indices, observer) for agent, indices in members.values()]
+        self.looped = np.ones(n, dtype=bool)
+        for group in self.groups:
+            self.looped[group.indices] = False
+
+    def step(self, step, learn=True, done=False):
+        """Korak odluke svih raskrsnica; sa done (zastoj) samo terminalno učenje sa GRIDLOCK_PENALTY"""
+        obs = self.observer
+        rewards = obs.rewards()
+
+        active = obs.phases != -1
+        since_action = step - self.last_action_time
+        forced = active & (since_action >= MAX_PHASE_DURATION)
+        eligible = active & (since_action >= MIN_PHASE_DURATION) & ~forced
+        switch = forced.copy()
+
+        for group in self.groups:
+            self.total_reward += group.step(obs, rewards, active, eligible, forced, switch, learn, done)
+
+        looped = np.flatnonzero(active & self.looped).tolist()
+        states = obs.states() if looped else None
+        for i in looped:
+            state = states[i]
+            agent = self.agents[i]
+
+            # Učenje na prijelazu s -> s' ove raskrsnice
+            if self.previous[i] is not None:
+                prev_state, prev_action, prev_reward = self.previous[i]
+                if done:
+                    prev_reward += GRIDLOCK_PENALTY
+                    self.total_reward += GRIDLOCK_PENALTY
+                if learn:
+                    agent.learn(prev_state, prev_action, prev_reward, state, done)
+            if done:
+                continue
+
+            if eligible[i]:
+                action = agent.choose_action(state)
+                switch[i] = action == 1
+            else:
+                action = int(forced[i])
+            self.previous[i] = (state, action, float(rewards[i]))
+
+        if done:
+            return
+        self.total_reward += float(rewards[active].sum())
+
+        indices = np.flatnonzero(switch)
+        if len(indices):
+            obs.set_phases(indices, (obs.phases[indices] + 1) % obs.n_phases[indices])
+            self.last_action_time[indices] = step
+
+
+def make_agents(topologies, shared=MULTI_SHARED_AGENT, alpha=ALPHA, gamma=GAMMA, epsilon=EPSILON):
+    """Agent po raskrsnici, ili zajednički agent ponovljen za raskrsnice.
+
+    Stanja raskrsnica sa različitim brojem prilaza se ni u zajedničkoj dict
+    tabeli ne preklapaju (ključevi različite dužine), pa zajednički agent
+    postoji po broju prilaza: ArrayQLearningAgent (vektorski korak) dimenzija
+    iz topologija grupe, a dict tabela za veće raskrsnice, čija bi gusta
+    tabela imala više od DENSE_TABLE_MAX_STATES stanja.
+    """
+    if not shared:
+        return [make_agent(actions=[0, 1], alpha=alpha, gamma=gamma, epsilon=epsilon, impl="dict")
+                for _ in topologies]
+
+    by_approaches = {}
+    for topology in topologies:
+        by_approaches.setdefault(topology.n_approaches, []).append(topology)
+    shared_agents = {}
+    for n_queues, group in by_approaches.items():
+        n_phases = max(topology.n_phases for topology in group)
+        if StateEncoder(n_phases, n_queues).n_states <= DENSE_TABLE_MAX_STATES:
+            shared_agents[n_queues] = ArrayQLearningAgent([0, 1], n_phases=n_phases, n_queues=n_queues,
+                                                          alpha=alpha, gamma=gamma, epsilon=epsilon)
+        else:
+            shared_agents[n_queues] = make_agent(actions=[0, 1], alpha=alpha, gamma=gamma, epsilon=epsilon,
+                                                 impl="dict")
+    return [shared_agents[topology.n_approaches] for topology in topologies]
+
+
+def unique_agents(agents):
+    return list({id(agent): agent for agent in agents}.values())
+
+
+def episode_routes(episode):
+    """(putanja ruta, kraj generisanja) za epizodu"""
+    seed = episode % NUM_ROUTE_VARIATIONS
+    if USE_ROUTE_CACHE:
+        return RouteCache().get(seed)
+    sim_generating_end = generate_random_routes(seed, out_dir=SIMULATION_FOLDER)
+    return os.path.join(SIMULATION_FOLDER, TRIPS_FILE), sim_generating_end
+
+
+def run_multi_episode(agents, episode, topologies, backend=SIM_BACKEND, learn=True, monitor=None):
+    """Jedna epizoda nad svim raskrsnicama; vraća isto što i run_episode.
+
+    monitor (TerminationMonitor) prati najveći red jedne raskrsnice i
+    prilaze svih raskrsnica; u zastoju je posljednji prijelaz svake
+    raskrsnice terminalan sa GRIDLOCK_PENALTY, a razlog ostaje u monitor.reason.
+    """
+    route_file, sim_generating_end = episode_routes(episode)
+    conn = acquire_simulation(
+        [SUMO_BINARY, "-c", CONFIG_FILE, "--no-warnings", "--no-step-log", "--route-files", route_file],
+        backend=backend
+    )
+    observer = MultiObserver(conn, topologies)
+    observer.subscribe()
+    controller = MultiIntersectionController(agents, observer)
+    if monitor is None:
+        monitor = TerminationMonitor()
+
+    step = 0
+    monitor.reset(step)
+    departed_vehicles = 0
+    arrived_vehicles = 0
+    cumulative_waiting = 0
+    measurement_count = 0
+
+    while step < MAX_STEPS:
+        conn.simulationStep()
+        step += 1
+        observer.update()
+
+        if step >= sim_generating_end:
+            if arrived_vehicles + observer.arrived >= departed_vehicles + observer.departed:
+                break
+
+        if observer.vehicle_count:
+            cumulative_waiting += observer.waiting_sum
+            measurement_count += observer.vehicle_count
+
+        done = monitor.check_queue(step, observer.max_junction_queue(), observer) is not None
+        controller.step(step, learn, done)
+        if done:
+            print(f"Epizoda {episode} prekinuta u koraku {step}: {monitor.reason}")
+            break
+
+        departed_vehicles += observer.departed
+        arrived_vehicles += observer.arrived
+
+    release_simulation(conn)
+
+    avg_waiting = cumulative_waiting / measurement_count if measurement_count > 0 else 0
+    return (controller.total_reward, step, sim_generating_end, arrived_vehicles, avg_waiting)
+
+
+def save_multi_checkpoint(agents, tls_ids, ep, store):
+    """Čuva Q-tabele svih raskrsnica ({tls_id: q_table}) u jedan pickle"""
+    table_path = os.path.join(store.tables_dir, f"multi_qtables_ep{ep}.pkl")
+    # Zajednička tabela se izvozi jednom, bez obzira na broj raskrsnica koje je dijele
+    tables = {id(agent): agent.q_table for agent in unique_agents(agents)}
+    with open(table_path, "wb") as f:
+        pickle.dump({tls_id: tables[id(agent)] for tls_id, agent in zip(tls_ids, agents)}, f)
+    store.record_checkpoint(ep, table_path)
+    print(f"Sačuvane Q-tabele: {table_path}")
+
+
+def train_multi(store, topologies, episodes=NUM_EPISODES, shared=MULTI_SHARED_AGENT, backend=SIM_BACKEND):
+    tls_ids = [topology.tls_id for topology in topologies]
+    agents = make_agents(topologies, shared)
+    monitor = TerminationMonitor()
+    os.makedirs(store.tables_dir, exist_ok=True)
+    if USE_ROUTE_CACHE:
+        RouteCache().warm()
+
+    try:
+        for ep in range(1, episodes + 1):
+            for agent in unique_agents(agents):
+                agent.epsilon *= EPSILON_DECAY
+                agent.alpha *= ALPHA_DECAY
+
+            print(f"Početak epizode {ep} ({len(tls_ids)} raskrsnica)")
+            reward, steps, gen_end, arrived, avg_wait = run_multi_episode(agents, ep, topologies, backend,
+                                                                           monitor=monitor)
+            store.record_episode(ep, agents[0].alpha, agents[0].gamma, agents[0].epsilon,
+                                 reward, steps, gen_end, arrived, avg_wait)
+
+            if ep % 40 == 0 or ep == episodes:
+                save_multi_checkpoint(agents, tls_ids, ep, store)
+            log_episode(ep, reward, steps, gen_end, arrived, avg_wait, store.log_path, monitor.reason)
+    finally:
+        store.flush()
+
+
+def benchmark_multi(topologies, counts, steps, backend=SIM_BACKEND):
+    """Trajanje koraka po broju raskrsnica (0 = sve), za agente po raskrsnici i zajednički.
+
+    Vrijeme kontrolera (odluke i učenje) mjeri se odvojeno od simulacije i
+    opažanja, pa se vidi kako svaki dio raste sa brojem raskrsnica.
+    """
+    route_file, _ = episode_routes(0)
+    available = len(topologies)
+    sizes = []
+    for n in counts:
+        n = available if n == 0 else n
+        if n > available:
+            print(f"{n:>5} raskrsnica: mreža ima samo {available} semafora, mjerim za {available}")
+            n = available
+        if n not in sizes:
+            sizes.append(n)
+
+    print(f"\n{'raskrsnica':>10} {'agenti':>16} {'koraka/s':>10} {'sim+opažanje [ms]':>18} "
+          f"{'kontroler [ms]':>15} {'kontroler/rask. [µs]':>21}")
+    for n in sizes:
+        selected = topologies[:n]
+        for name, shared in (("po raskrsnici", False), ("zajednički", True)):
+            agents = make_agents(selected, shared=shared)
+            conn = start_simulation(
+                [SUMO_BINARY, "-c", CONFIG_FILE, "--no-warnings", "--no-step-log", "--route-files", route_file],
+                backend=backend, label=f"multi-{n}-{name}"
+            )
+            observer = MultiObserver(conn, selected)
+            observer.subscribe()
+            controller = MultiIntersectionController(agents, observer)
+
+            sim_time = control_time = 0.0
+            for step in range(1, steps + 1):
+                start = time.perf_counter()
+                conn.simulationStep()
+                observer.update()
+                middle = time.perf_counter()
+                controller.step(step)
+                control_time += time.perf_counter() - middle
+                sim_time += middle - start
+            conn.close()
+
+            print(f"{n:>10} {name:>16} {steps / (sim_time + control_time):10.1f} "
+                  f"{sim_time / steps * 1e3:18.3f} {control_time / steps * 1e3:15.3f} "
+                  f"{control_time / steps / n * 1e6:21.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upravljanje svim semaforima mreže")
+    parser.add_argument("--tls", nargs="+", default=MULTI_TLS_IDS, help="ID-ovi semafora (podrazumijevano svi)")
+    parser.add_argument("--shared", action="store_true", default=MULTI_SHARED_AGENT,
+                        help="jedna zajednička Q-tabela za sve raskrsnice")
+    parser.add_argument("--episodes", type=int, default=NUM_EPISODES)
+    parser.add_argument("--backend", default=SIM_BACKEND, choices=available_backends())
+    parser.add_argument("--run-id", default="multi", help="identifikator runa u run-state bazi")
+    parser.add_argument("--new", action="store_true", help="obriši zapise prethodnog treniranja ovog runa")
+    parser.add_argument("--benchmark", action="store_true", help="trajanje koraka (simulacija i kontroler) po broju raskrsnica")
+    parser.add_argument("--counts", type=int, nargs="+", default=[1, 10, 0])
+    parser.add_argument("--steps", type=int, default=2000)
+    args = parser.parse_args()
+
+    check_sumo_home()
+    topologies = [topology for topology in load_all_topologies(tls_ids=args.tls) if topology.links]
+    print(f"Kontrolisani semafori: {len(topologies)}")
+
+    if args.benchmark:
+        benchmark_multi(topologies, args.counts, args.steps, args.backend)
+    else:
+        store = RunStore(args.run_id)
+        if args.new:
+            store.reset()
+            if os.path.exists(store.log_path):
+                os.remove(store.log_path)
+        train_multi(store, topologies, args.episodes, args.shared, args.backend)
+        store.close()
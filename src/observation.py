@@ -0,0 +1,190 @@
+import numpy as np
+import traci
+import traci.constants as tc
+from topology import load_topology
+from config import TL_ID
+
+# Varijable pretplate po vozilu: čekanje i ivica (za vozila na prilazima)
+VEHICLE_VARS = [tc.VAR_WAITING_TIME, tc.VAR_ROAD_ID]
+
+
+class ApproachTracker:
+    """Najduže čekanje i teleportacije vozila na prilazima semafora (termination.py).
+
+    Teleportacija se broji kada vozilo koje je pri prethodnom opažanju bilo
+    na prilazu nestane sa mreže (SUMO ga prenosi), pa se sa interval > 1
+    sabiraju sve teleportacije započete u intervalu koje još traju, a
+    teleportacije posljednjeg koraka uvijek.
+    """
+
+    def __init__(self, approaches):
+        self.approaches = set(approaches)
+        self.waiting_max = 0.0
+        self.teleports = 0
+        self.approach_ids = set()  # vozila na prilazima pri posljednjem opažanju
+        self.teleporting = set()  # već prebrojana vozila koja se još teleportuju
+
+    def update(self, vehicles, teleport_ids):
+        """vehicles su rezultati pretplata vozila (VEHICLE_VARS)"""
+        approach_ids = set()
+        waiting_max = 0.0
+        in_transit = set(teleport_ids)
+        for veh_id, values in vehicles.items():
+            road = values.get(tc.VAR_ROAD_ID, "")
+            if road in self.approaches:
+                approach_ids.add(veh_id)
+                waiting_max = max(waiting_max, values[tc.VAR_WAITING_TIME])
+            elif not road:
+                in_transit.add(veh_id)  # vozilo van mreže: teleportacija u toku
+        teleported = (in_transit & self.approach_ids) - self.teleporting
+        self.teleports = len(teleported)
+        self.teleporting = (self.teleporting & in_transit) | teleported
+        self.approach_ids = approach_ids
+        self.waiting_max = waiting_max
+
+
+class Observer:
+    """Keš opservacija zasnovan na TraCI pretplatama (subscriptions).
+
+    Umjesto upita po vozilu i po traci u svakom koraku, pretplaćujemo se
+    jednom na varijable semafora, kontrolisanih traka i vozila. SUMO vraća
+    sve rezultate zajedno sa odgovorom na simulationStep, pa čitanje keša
+    ne zahtijeva dodatne round-tripove.
+
+    Sa interval > 1 simulacija se pomjera više koraka odjednom
+    (simulationStep(t + k)), a brojači odlazaka/dolazaka iz pretplate važe
+    samo za posljednji korak; tada se računaju iz razlike skupova vozila.
+
+    Mezoskopski model (mesoscopic=True) nema vozila po traci, pa se broj
+    vozila ivice dijeli na njene trake. Prosjek po prilazu je tada isti kao
+    mikroskopski prosjek po traci, pa je stanje uporedivo u oba režima.
+
+    Za prepoznavanje zastoja (termination.py) approach_waiting_max i
+    teleports gledaju samo vozila na prilazima kontrolisanog semafora
+    (ApproachTracker).
+    """
+
+    def __init__(self, tls_id=TL_ID, conn=None, topology=None, interval=1, mesoscopic=False):
+        self.conn = conn if conn is not None else traci
+        self.tls_id = tls_id
+        self.topology = topology
+        self.interval = interval
+        self.mesoscopic = mesoscopic
+        self.vehicle_ids = set()
+
+        # Vrijednosti posljednjeg koraka
+        self.departed = 0
+        self.arrived = 0
+        self.phase = 0
+        self.phase_duration = 0
+        self.lane_vehicles = None
+        self.waiting_sum = 0.0
+        self.vehicle_count = 0
+        self.approach_waiting_max = 0.0
+        self.teleports = 0
+        self.tracker = None
+
+    def subscribe(self):
+        """Postavlja pretplate; poziva se jednom nakon pokretanja simulacije"""
+        conn = self.conn
+        conn.simulation.subscribe([
+            tc.VAR_DEPARTED_VEHICLES_NUMBER,
+            tc.VAR_ARRIVED_VEHICLES_NUMBER,
+            tc.VAR_DEPARTED_VEHICLES_IDS,
+            tc.VAR_TELEPORT_STARTING_VEHICLES_IDS,
+        ])
+        conn.trafficlight.subscribe(self.tls_id, [tc.TL_CURRENT_PHASE, tc.TL_PHASE_DURATION])
+
+        # Trake i prilazi su statični za mrežu, pa dolaze iz topologije
+        if self.topology is None:
+            self.topology = load_topology(self.tls_id, conn)
+        self.tracker = ApproachTracker(self.topology.approaches)
+        if self.mesoscopic:
+            self._subscribe_edges()
+        else:
+            for lane in self.topology.lanes:
+                conn.lane.subscribe(lane, [tc.LAST_STEP_VEHICLE_NUMBER])
+
+        # Vozila koja su već u mreži (npr. nakon učitavanja stanja)
+        self.vehicle_ids = set(conn.vehicle.getIDList())
+        for veh_id in self.vehicle_ids:
+            conn.vehicle.subscribe(veh_id, VEHICLE_VARS)
+
+        self.update()
+
+    def update(self):
+        """Čita rezultate pretplata nakon simulationStep"""
+        conn = self.conn
+
+        sim = conn.simulation.getSubscriptionResults()
+        if self.interval > 1:
+            self._update_vehicles()
+        else:
+            self.departed = sim.get(tc.VAR_DEPARTED_VEHICLES_NUMBER, 0)
+            self.arrived = sim.get(tc.VAR_ARRIVED_VEHICLES_NUMBER, 0)
+
+            # Nova vozila dobijaju pretplatu na čekanje i ivicu; pretplate
+            # vozila koja su napustila mrežu SUMO uklanja sam
+            for veh_id in sim.get(tc.VAR_DEPARTED_VEHICLES_IDS, ()):
+                conn.vehicle.subscribe(veh_id, VEHICLE_VARS)
+
+        tls = conn.trafficlight.getSubscriptionResults(self.tls_id)
+        self.phase = tls.get(tc.TL_CURRENT_PHASE, -1)
+        self.phase_duration = tls.get(tc.TL_PHASE_DURATION, 0)
+
+        if self.mesoscopic:
+            edges = conn.edge.getAllSubscriptionResults()
+            edge_vehicles = np.array([
+                edges[edge][tc.LAST_STEP_VEHICLE_NUMBER] if edge in edges else 0
+                for edge in self.edges
+            ], dtype=float)
+            self.lane_vehicles = edge_vehicles[self.lane_edge] * self.lane_share
+        else:
+            lanes = conn.lane.getAllSubscriptionResults()
+            self.lane_vehicles = np.array([
+                lanes[lane][tc.LAST_STEP_VEHICLE_NUMBER] if lane in lanes else 0
+                for lane in self.topology.lanes
+            ])
+
+        vehicles = conn.vehicle.getAllSubscriptionResults()
+        self.waiting_sum = sum(values[tc.VAR_WAITING_TIME] for values in vehicles.values())
+        self.vehicle_count = len(vehicles)
+        self.tracker.update(vehicles, sim.get(tc.VAR_TELEPORT_STARTING_VEHICLES_IDS, ()))
+        self.teleports = self.tracker.teleports
+        self.approach_waiting_max = self.tracker.waiting_max
+
+    def _subscribe_edges(self):
+        """Pretplate na ivice kontrolisanih traka i udio svake trake u ivici"""
+        conn = self.conn
+        lane_edges = [lane.rsplit("_", 1)[0] for lane in self.topology.lanes]
+        self.edges = list(dict.fromkeys(lane_edges))
+        edge_position = {edge: i for i, edge in enumerate(self.edges)}
+        self.lane_edge = np.array([edge_position[edge] for edge in lane_edges], dtype=np.int64)
+        lane_numbers = {edge: conn.edge.getLaneNumber(edge) for edge in self.edges}
+        self.lane_share = np.array([1.0 / lane_numbers[edge] for edge in lane_edges])
+        for edge in self.edges:
+            conn.edge.subscribe(edge, [tc.LAST_STEP_VEHICLE_NUMBER])
+
+    def _update_vehicles(self):
+        """Odlasci i dolasci od prethodnog opažanja (jedan getIDList po odluci).
+
+        Vozila koja uđu i izađu unutar istog intervala se ne broje.
+        """
+        current = set(self.conn.vehicle.getIDList())
+        departed = current - self.vehicle_ids
+        self.departed = len(departed)
+        self.arrived = len(self.vehicle_ids - current)
+        self.vehicle_ids = current
+        for veh_id in departed:
+            self.conn.vehicle.subscribe(veh_id, VEHICLE_VARS)
+
+    def set_phase(self, phase):
+        """Postavlja fazu semafora i osvježava keširane vrijednosti faze"""
+        self.conn.trafficlight.setPhase(self.tls_id, phase)
+        self.phase = phase
+        self.phase_duration = self.topology.phase_duration(phase)
+
+    def get_state(self):
+        """Stanje u istom formatu kao utils.get_state, iz keša"""
+        queue_lengths = self.topology.queue_lengths(self.lane_vehicles)
+        return (self.phase, self.phase_duration) + tuple(queue_lengths.tolist())
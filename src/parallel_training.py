@@ -0,0 +1,266 @@
+import argparse
+import multiprocessing as mp
+import os
+import shutil
+import sys
+import time
+from qtable import make_agent, ArrayQLearningAgent
+from eval_scheduler import EvaluationScheduler
+from route_cache import RouteCache
+from run_state import RunStore
+from run_training import (
+    clean_artifacts,
+    load_agent,
+    run_episode,
+    use_mesosim,
+    save_checkpoint,
+    log_episode
+)
+from dashboard import start_dashboard, stop_dashboard
+from profiling import profiler
+from termination import TerminationMonitor
+from config import (
+    ALPHA_DECAY,
+    EPSILON_DECAY,
+    NUM_EPISODES,
+    NUM_WORKERS,
+    SYNC_INTERVAL,
+    ROLLOUT_DIR,
+    SIM_BACKEND,
+    USE_ROUTE_CACHE,
+    DASHBOARD_ENABLED,
+    RUN_ID
+)
+
+
+def q_delta(q_table, base):
+    """Razlika lokalne Q-tabele u odnosu na posljednji poslani snapshot"""
+    return {key: value - base.get(key, 0.0) for key, value in q_table.items() if value != base.get(key)}
+
+
+def table_snapshot(agent):
+    """Snapshot koji learner šalje workerima: nizovi array agenta ili kopija dict tabele"""
+    if isinstance(agent, ArrayQLearningAgent):
+        return (agent.encoder.n_phases, agent.encoder.n_queues, agent.table.copy(), agent.visited.copy())
+    return dict(agent.q_table)
+
+
+def load_snapshot(agent, snapshot):
+    """Postavlja snapshot u agenta workera; vraća bazu za računanje sljedeće delte"""
+    if isinstance(agent, ArrayQLearningAgent):
+        n_phases, n_queues, table, visited = snapshot
+        if (n_phases, n_queues) != (agent.encoder.n_phases, agent.encoder.n_queues):
+            agent.set_dims(n_phases, n_queues)
+        agent.table[:] = table
+        agent.visited[:] = visited
+        return table.copy()
+    agent.q_table = dict(snapshot)
+    return dict(snapshot)
+
+
+def take_delta(agent, base):
+    """Delta od base i pomjeranje base na trenutnu tabelu, bez kopiranja cijele tabele"""
+    if isinstance(agent, ArrayQLearningAgent):
+        delta = agent.delta_since(base)
+        base[:] = agent.table
+        return delta
+    delta = q_delta(agent.q_table, base)
+    for key in delta:
+        base[key] = agent.q_table[key]
+    return delta
+
+
+def rollout_worker(worker_id, task_queue, result_queue, backend, work_dir):
+    """Worker: vrti epizode na vlastitoj SUMO instanci i šalje Q-delte learneru"""
+    agent = make_agent(actions=[0, 1])
+    monitor = TerminationMonitor()
+    base = agent.table.copy() if isinstance(agent, ArrayQLearningAgent) else {}
+
+    while True:
+        message = task_queue.get()
+        kind = message[0]
+
+        if kind == "stop":
+            break
+
+        if kind == "snapshot":
+            # Novi snapshot od learnera zamjenjuje lokalnu tabelu
+            base = load_snapshot(agent, message[1])
+            continue
+
+        _, episode, alpha, epsilon = message
+        agent.alpha = alpha
+        agent.epsilon = epsilon
+
+        with profiler.episode(f"ep{episode:05d}_w{worker_id}", ROLLOUT_DIR):
+            result = run_episode(agent, episode, work_dir=work_dir, backend=backend,
+                                 mesoscopic=use_mesosim(epsilon), monitor=monitor)
+
+        delta = take_delta(agent, base)
+        result_queue.put((worker_id, episode, alpha, epsilon, result, delta, monitor.reason))
+
+
+class RolloutLearner:
+    """Centralni learner: raspoređuje epizode na workere i spaja njihove Q-delte"""
+
+    def __init__(self, agent, num_workers=NUM_WORKERS, sync_interval=SYNC_INTERVAL,
+                 backend=SIM_BACKEND, rollout_dir=ROLLOUT_DIR):
+        self.agent = agent
+        self.num_workers = num_workers
+        self.sync_interval = sync_interval
+        self.backend = backend
+        self.rollout_dir = rollout_dir
+        self.workers = []
+        self.task_queues = []
+        self.result_queue = mp.Queue()
+
+    def start(self):
+        for worker_id in range(self.num_workers):
+            work_dir = os.path.abspath(os.path.join(self.rollout_dir, f"worker{worker_id}"))
+            os.makedirs(work_dir, exist_ok=True)
+            task_queue = mp.Queue()
+            process = mp.Process(
+                target=rollout_worker,
+                args=(worker_id, task_queue, self.result_queue, self.backend, work_dir),
+                daemon=True
+            )
+            process.start()
+            self.workers.append(process)
+            self.task_queues.append(task_queue)
+        self.broadcast()
+
+    def stop(self):
+        for task_queue in self.task_queues:
+            task_queue.put(("stop",))
+        for process in self.workers:
+            process.join()
+        self.workers = []
+        self.task_queues = []
+
+    def broadcast(self):
+        """Šalje svim workerima svjež snapshot Q-tabele"""
+        snapshot = table_snapshot(self.agent)
+        for task_queue in self.task_queues:
+            task_queue.put(("snapshot", snapshot))
+
+    def merge(self, delta):
+        """Dodaje deltu workera u tabelu learnera na mjestu (bez izvoza cijele tabele)"""
+        if isinstance(self.agent, ArrayQLearningAgent):
+            self.agent.add_delta(delta)
+            return
+        q_table = self.agent.q_table
+        for key, value in delta.items():
+            q_table[key] = q_table.get(key, 0.0) + value
+
+    def run(self, first_episode, last_episode, on_result=None):
+        """Trenira epizode [first_episode, last_episode]; vraća broj epizoda po satu"""
+        start = time.perf_counter()
+        pending = iter(range(first_episode, last_episode + 1))
+        idle = list(range(self.num_workers))
+        in_flight = 0
+        since_sync = 0
+
+        while True:
+            for worker_id in idle:
+                ep = next(pending, None)
+                if ep is None:
+                    break
+                # Raspored alpha/epsilon isti kao u serijskom treniranju
+                self.agent.epsilon *= EPSILON_DECAY
+                self.agent.alpha *= ALPHA_DECAY
+                self.task_queues[worker_id].put(("episode", ep, self.agent.alpha, self.agent.epsilon))
+                in_flight += 1
+            idle = []
+
+            if in_flight == 0:
+                break
+
+            worker_id, episode, alpha, epsilon, result, delta, termination = self.result_queue.get()
+            in_flight -= 1
+            idle.append(worker_id)
+            self.merge(delta)
+
+            if on_result is not None:
+                on_result(episode, alpha, epsilon, result, termination)
+
+            since_sync += 1
+            if since_sync >= self.sync_interval:
+                self.broadcast()
+                since_sync = 0
+
+        elapsed = time.perf_counter() - start
+        return (last_episode - first_episode + 1) / elapsed * 3600 if elapsed > 0 else 0.0
+
+
+def train_parallel(agent, store, start_episode, num_workers, sync_interval, backend):
+    """Paralelna verzija run_training.train sa istim logom, checkpointima i run-state bazom"""
+    scheduler = EvaluationScheduler(results_root=store.eval_dir, run_id=store.run_id)
+
+    def on_result(ep, alpha, epsilon, result, termination):
+        reward, steps, gen_end, arrived, avg_wait = result
+        store.record_episode(ep, alpha, agent.gamma, epsilon, reward, steps, gen_end, arrived, avg_wait)
+        if ep % 40 == 0 or ep == NUM_EPISODES:
+            save_checkpoint(agent, ep, store, scheduler)
+        log_episode(ep, reward, steps, gen_end, arrived, avg_wait, store.log_path, termination)
+
+    if USE_ROUTE_CACHE:
+        RouteCache().warm()
+
+    learner = RolloutLearner(agent, num_workers, sync_interval, backend)
+    learner.start()
+    try:
+        rate = learner.run(start_episode + 1, NUM_EPISODES, on_result)
+    finally:
+        learner.stop()
+        store.flush()
+        scheduler.close()
+    print(f"Paralelno treniranje ({num_workers} workera): {rate:.1f} epizoda/h")
+
+
+def measure_scaling(max_workers, episodes, sync_interval, backend):
+    """Mjeri epizode/h za 1..max_workers workera na svježem agentu, bez čuvanja"""
+    rates = {}
+    for num_workers in range(1, max_workers + 1):
+        agent = make_agent(actions=[0, 1], alpha=0.1, gamma=0.95, epsilon=1.0)
+        learner = RolloutLearner(agent, num_workers, sync_interval, backend,
+                                 rollout_dir=os.path.join(ROLLOUT_DIR, "scaling"))
+        learner.start()
+        try:
+            rates[num_workers] = learner.run(1, episodes * num_workers)
+        finally:
+            learner.stop()
+        speedup = rates[num_workers] / rates[1] if rates[1] > 0 else 0.0
+        print(f"{num_workers:>3} workera: {rates[num_workers]:8.1f} epizoda/h (ubrzanje {speedup:.2f}x)")
+    shutil.rmtree(os.path.join(ROLLOUT_DIR, "scaling"), ignore_errors=True)
+    return rates
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Paralelno treniranje sa centralnim learnerom")
+    parser.add_argument("--workers", type=int, default=NUM_WORKERS)
+    parser.add_argument("--sync-interval", type=int, default=SYNC_INTERVAL,
+                        help="broj završenih epizoda između slanja snapshota workerima")
+    parser.add_argument("--backend", default=SIM_BACKEND)
+    parser.add_argument("--scaling", action="store_true",
+                        help="samo izmjeri skaliranje epizoda/h od 1 do --workers")
+    parser.add_argument("--scaling-episodes", type=int, default=2,
+                        help="broj epizoda po workeru u mjerenju skaliranja")
+    parser.add_argument("--new", action="store_true")
+    parser.add_argument("--run-id", default=RUN_ID)
+    args = parser.parse_args()
+
+    if args.scaling:
+        measure_scaling(args.workers, args.scaling_episodes, args.sync_interval, args.backend)
+        sys.exit(0)
+
+    store = RunStore(args.run_id)
+    if args.new:
+        clean_artifacts(store)
+
+    agent, start_episode = load_agent(store)
+    dashboard = start_dashboard(store.artifacts_dir, store.eval_dir) if DASHBOARD_ENABLED else None
+    try:
+        train_parallel(agent, store, start_episode, args.workers, args.sync_interval, args.backend)
+    finally:
+        stop_dashboard(dashboard)
+        store.close()
@@ -0,0 +1,180 @@
+import argparse
+import cProfile
+import json
+import os
+import time
+from contextlib import contextmanager
+from backend import CallCounter
+from config import PROFILE_ENABLED, PROFILE_DUMP, PROFILE_FILE
+
+try:
+    import pyinstrument
+except ImportError:
+    pyinstrument = None
+
+
+class _Section:
+    """Mjerač jedne faze; isti objekat se koristi u svakom koraku (bez alokacija)"""
+
+    __slots__ = ("seconds", "calls", "_start")
+
+    def __init__(self):
+        self.seconds = 0.0
+        self.calls = 0
+        self._start = 0.0
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.seconds += time.perf_counter() - self._start
+        self.calls += 1
+
+
+class _NullSection:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_SECTION = _NullSection()
+
+
+class Profiler:
+    """Tajmeri i brojači za faze epizode (SUMO korak, opažanje, agent, ...).
+
+    Isključen profiler vraća isti prazni context manager za svaku fazu i ne
+    omotava konekciju, pa je trošak u petlji jedan poziv metode po fazi.
+    Uključen, nakon svake epizode dopisuje raspodjelu vremena u PROFILE_FILE
+    i po želji čuva cProfile/pyinstrument dump epizode.
+    """
+
+    def __init__(self, enabled=PROFILE_ENABLED, dump=PROFILE_DUMP):
+        self.enabled = enabled
+        self.dump = dump
+        self.sections = {}
+        self.counters = {}
+        self.connections = []
+
+    def section(self, name):
+        if not self.enabled:
+            return _NULL_SECTION
+        section = self.sections.get(name)
+        if section is None:
+            section = self.sections[name] = _Section()
+        return section
+
+    def count(self, name, n=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def wrap_connection(self, conn):
+        """Konekcija koja broji TraCI pozive (samo kad je profiler uključen)"""
+        if not self.enabled:
+            return conn
+        counter = CallCounter(conn)
+        self.connections.append(counter)
+        return counter
+
+    def reset(self):
+        self.sections = {}
+        self.counters = {}
+        self.connections = []
+
+    def breakdown(self, name, wall):
+        """Raspodjela vremena epizode kao dict spreman za JSON"""
+        measured = sum(section.seconds for section in self.sections.values())
+        steps = self.counters.get("steps", 0)
+        traci_calls = {}
+        for counter in self.connections:
+            for call, count in counter.calls.items():
+                traci_calls[call] = traci_calls.get(call, 0) + count
+        total_calls = sum(traci_calls.values())
+
+        return {
+            "episode": name,
+            "wall": wall,
+            "stages": {
+                stage: {"seconds": section.seconds, "calls": section.calls,
+                        "share": section.seconds / wall if wall > 0 else 0.0}
+                for stage, section in sorted(self.sections.items(), key=lambda item: -item[1].seconds)
+            },
+            "other": wall - measured,
+            "counters": dict(self.counters),
+            "traci_calls": total_calls,
+            "traci_calls_per_step": total_calls / steps if steps else 0.0,
+            "traci_top": dict(sorted(traci_calls.items(), key=lambda item: -item[1])[:10]),
+        }
+
+    @contextmanager
+    def episode(self, name, out_dir):
+        """Mjeri jednu epizodu i upisuje njen izvještaj u out_dir"""
+        if not self.enabled:
+            yield
+            return
+
+        self.reset()
+        dumper = self._start_dump()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            os.makedirs(out_dir, exist_ok=True)
+            self._stop_dump(dumper, os.path.join(out_dir, f"profile_{name}"))
+            with open(os.path.join(out_dir, PROFILE_FILE), "a") as f:
+                f.write(json.dumps(self.breakdown(name, wall)) + "\n")
+
+    def _start_dump(self):
+        if self.dump == "cprofile":
+            dumper = cProfile.Profile()
+            dumper.enable()
+            return dumper
+        if self.dump == "pyinstrument":
+            if pyinstrument is None:
+                print("pyinstrument nije instaliran, dump se preskače")
+                return None
+            dumper = pyinstrument.Profiler()
+            dumper.start()
+            return dumper
+        return None
+
+    def _stop_dump(self, dumper, path):
+        if dumper is None:
+            return
+        if isinstance(dumper, cProfile.Profile):
+            dumper.disable()
+            dumper.dump_stats(path + ".prof")
+        else:
+            dumper.stop()
+            with open(path + ".html", "w") as f:
+                f.write(dumper.output_html())
+
+
+# Zajednički profiler procesa (trening, evaluacija)
+profiler = Profiler()
+
+
+def print_breakdown(report):
+    steps = report["counters"].get("steps", 0)
+    print(f"{report['episode']}: {report['wall']:.2f}s, {steps} koraka, "
+          f"{report['traci_calls_per_step']:.1f} TraCI poziva po koraku")
+    for stage, values in report["stages"].items():
+        print(f"  {stage:>12}: {values['seconds']:9.3f}s {values['share'] * 100:5.1f}%  ({values['calls']} poziva)")
+    print(f"  {'ostalo':>12}: {report['other']:9.3f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prikaz raspodjele vremena epizoda iz profile.jsonl")
+    parser.add_argument("path", help="putanja do profile.jsonl")
+    parser.add_argument("--last", type=int, default=5, help="broj posljednjih epizoda")
+    args = parser.parse_args()
+
+    with open(args.path) as f:
+        reports = [json.loads(line) for line in f if line.strip()]
+    for report in reports[-args.last:]:
+        print_breakdown(report)
@@ -0,0 +1,254 @@
+import random
+import numpy as np
+from utils import (
+    QLearningAgent,
+    MAX_QUEUE,
+    QUEUE_STEP,
+    DURATION_STEP,
+    MAX_DURATION_BIN
+)
+from topology import load_topology
+from config import Q_TABLE_IMPL, STATE_NUM_PHASES, STATE_NUM_QUEUES, TL_ID
+
+QUEUE_BINS = MAX_QUEUE // QUEUE_STEP + 1
+DURATION_BINS = MAX_DURATION_BIN + 1
+
+_rng = np.random.default_rng()
+
+
+def state_dims(tls_id=TL_ID):
+    """(broj faza, broj prilaza) semafora iz topologije mreže.
+
+    STATE_NUM_PHASES i STATE_NUM_QUEUES iz config.py koriste se samo ako
+    topologija ne može da se pročita.
+    """
+    try:
+        topology = load_topology(tls_id)
+    except Exception as e:
+        print(f"Topologija semafora {tls_id} nije dostupna ({e}), koristim STATE_NUM_PHASES/STATE_NUM_QUEUES")
+        return STATE_NUM_PHASES, STATE_NUM_QUEUES
+    return topology.n_phases, topology.n_approaches
+
+
+def table_dims(q_table, tls_id=TL_ID):
+    """Dimenzije stanja koje pokrivaju ključeve dict tabele (npr. učitane iz .pkl)"""
+    n_phases, n_queues = state_dims(tls_id)
+    keys = [key for key, _ in q_table]
+    if keys:
+        n_queues = len(keys[0]) - 2
+        n_phases = max(n_phases, max(key[0] for key in keys) + 1)
+    return n_phases, n_queues
+
+
+class StateEncoder:
+    """Preslikava stanje (phase, duration, *queues) u gusti cjelobrojni indeks.
+
+    Binovi su isti kao u QLearningAgent.get_state_key, pa se ključevi
+    dict tabele mogu prevesti u indekse i nazad.
+    """
+
+    def __init__(self, n_phases, n_queues):
+        self.n_phases = n_phases
+        self.n_queues = n_queues
+        self.shape = (n_phases, DURATION_BINS) + (QUEUE_BINS,) * n_queues
+        self.n_states = int(np.prod(self.shape))
+
+        strides = [1] * len(self.shape)
+        for i in range(len(self.shape) - 2, -1, -1):
+            strides[i] = strides[i + 1] * self.shape[i + 1]
+        self.phase_stride, self.duration_stride, *self.queue_strides = strides
+
+    def encode(self, state):
+        """Indeks stanja iz sirovog stanja koje vraća get_state"""
+        phase, duration, *queues = state
+        if not 0 <= phase < self.n_phases or len(queues) != self.n_queues:
+            raise ValueError(f"Stanje {state} ne odgovara enkoderu {self.shape}")
+
+        index = phase * self.phase_stride
+        index += min(int(duration / DURATION_STEP), MAX_DURATION_BIN) * self.duration_stride
+        for q, stride in zip(queues, self.queue_strides):
+            index += int(min(q, MAX_QUEUE) // QUEUE_STEP) * stride
+        return index
+
+    def encode_batch(self, states):
+        """Indeksi za niz stanja oblika (n, 2 + n_queues), isti binovi kao encode"""
+        states = np.asarray(states, dtype=float)
+        if states.ndim != 2 or states.shape[1] != 2 + self.n_queues:
+            raise ValueError(f"Niz stanja oblika {states.shape} ne odgovara enkoderu {self.shape}")
+
+        phases = states[:, 0].astype(np.int64)
+        durations = np.minimum((states[:, 1] / DURATION_STEP).astype(np.int64), MAX_DURATION_BIN)
+        queues = (np.minimum(states[:, 2:], MAX_QUEUE) // QUEUE_STEP).astype(np.int64)
+        return (phases * self.phase_stride + durations * self.duration_stride
+                + queues @ np.array(self.queue_strides, dtype=np.int64))
+
+    def encode_key(self, key):
+        """Indeks iz već diskretizovanog ključa (phase, duration_bin, *queue_bins)"""
+        return int(np.ravel_multi_index(tuple(int(v) for v in key), self.shape))
+
+    def encode_keys(self, keys):
+        """Indeksi za niz diskretizovanih ključeva oblika (n, 2 + n_queues)"""
+        keys = np.asarray(keys, dtype=np.int64).reshape(-1, len(self.shape))
+        return np.ravel_multi_index(keys.T, self.shape)
+
+    def decode_batch(self, indices):
+        """Ključevi za niz indeksa, kao niz oblika (n, 2 + n_queues)"""
+        return np.column_stack(np.unravel_index(np.asarray(indices, dtype=np.int64), self.shape))
+
+    def decode(self, index):
+        """Diskretizovani ključ iz indeksa (format ključa dict tabele)"""
+        return tuple(int(v) for v in np.unravel_index(index, self.shape))
+
+
+class ArrayQLearningAgent:
+    """Q-learning agent sa NumPy tabelom oblika (n_states, n_actions).
+
+    API je isti kao kod QLearningAgent; q_table je svojstvo koje uvozi i
+    izvozi dict format, pa postojeći qtable_ep*.pkl fajlovi rade bez izmjena.
+    Bez n_phases/n_queues oblik tabele dolazi iz topologije TL_ID
+    (state_dims), a uvezena tabela drugog oblika ga mijenja (set_dims).
+    """
+
+    def __init__(self, actions, n_phases=None, n_queues=None, alpha=0.1, gamma=0.95, epsilon=0.5):
+        self.actions = actions
+        self.alpha = alpha
+        self.gamma = gamma
+        self.epsilon = epsilon
+        self.action_index = {a: i for i, a in enumerate(actions)}
+        if n_phases is None or n_queues is None:
+            default_phases, default_queues = state_dims()
+            n_phases = n_phases or default_phases
+            n_queues = n_queues or default_queues
+        self.set_dims(n_phases, n_queues)
+
+    def set_dims(self, n_phases, n_queues):
+        """Nova (prazna) tabela za dati broj faza i prilaza"""
+        self.encoder = StateEncoder(n_phases, n_queues)
+        self.table = np.zeros((self.encoder.n_states, len(self.actions)))
+        # Posjećeni parovi (stanje, akcija); samo oni se izvoze u dict
+        self.visited = np.zeros(self.table.shape, dtype=bool)
+
+        # Indeks posljednjeg stanja: choose_action i learn u istom koraku
+        # dobijaju isti tuple, pa se enkodiranje radi jednom
+        self._last_state = None
+        self._last_index = None
+
+    def state_index(self, state):
+        if state is not self._last_state:
+            self._last_index = self.encoder.encode(state)
+            self._last_state = state
+        return self._last_index
+
+    def get_state_key(self, state):
+        return self.encoder.decode(self.state_index(state))
+
+    def get_Q(self, state, action):
+        return self.table[self.state_index(state), self.action_index[action]]
+
+    def choose_action(self, state, rng=random):
+        if rng.random() < self.epsilon:
+            return rng.choice(self.actions)
+
+        q_values = self.table[self.state_index(state)]
+        max_q = q_values.max()
+
+        # Ako ima više akcija sa istom Q vrednošću
+        max_indices = np.flatnonzero(q_values == max_q)
+        return self.actions[rng.choice(max_indices)]
+
+    def learn(self, state, action, reward, next_state, done=False):
+        s = self.state_index(state)
+        a = self.action_index[action]
+        current_q = self.table[s, a]
+        # Terminalni prijelaz (prekid u zastoju) nema buduću vrijednost
+        next_max_q = 0.0 if done else self.table[self.state_index(next_state)].max()
+
+        self.table[s, a] = current_q + self.alpha * (reward + self.gamma * next_max_q - current_q)
+        self.visited[s, a] = True
+
+    def choose_actions(self, indices, rng=None):
+        """Epsilon-greedy indeksi akcija za niz indeksa stanja"""
+        rng = rng if rng is not None else _rng
+        indices = np.asarray(indices, dtype=np.int64)
+        q_values = self.table[indices]
+        best = q_values == q_values.max(axis=1, keepdims=True)
+        greedy = np.argmax(best * rng.random(q_values.shape), axis=1)  # slučajno među jednakima
+        explore = rng.random(len(indices)) < self.epsilon
+        return np.where(explore, rng.integers(0, len(self.actions), len(indices)), greedy)
+
+    def learn_batch(self, states, actions, rewards, next_states, dones=None):
+        """Vektorizovano TD ažuriranje nad nizovima indeksa stanja i akcija.
+
+        Ponovljeni parovi (stanje, akcija) u paketu se grupišu i dobijaju
+        jedno ažuriranje prema srednjem TD cilju; za završne prijelaze
+        (dones) cilj je samo nagrada.
+        """
+        states = np.asarray(states, dtype=np.int64)
+        actions = np.asarray(actions, dtype=np.int64)
+        next_max_q = self.table[np.asarray(next_states, dtype=np.int64)].max(axis=1)
+        if dones is not None:
+            next_max_q = np.where(dones, 0.0, next_max_q)
+        targets = np.asarray(rewards, dtype=float) + self.gamma * next_max_q
+
+        pairs, group = np.unique(states * len(self.actions) + actions, return_inverse=True)
+        mean_targets = np.bincount(group, weights=targets) / np.bincount(group)
+
+        table = self.table.reshape(-1)
+        table[pairs] += self.alpha * (mean_targets - table[pairs])
+        self.visited.reshape(-1)[pairs] = True
+
+    def add_delta(self, delta):
+        """Dodaje promjene {(ključ, akcija): razlika} direktno u tabelu, bez izvoza i uvoza"""
+        if not delta:
+            return
+        states = self.encoder.encode_keys([key for key, _ in delta])
+        actions = np.fromiter((self.action_index[action] for _, action in delta), dtype=np.int64, count=len(delta))
+        np.add.at(self.table, (states, actions), np.fromiter(delta.values(), dtype=float, count=len(delta)))
+        self.visited[states, actions] = True
+
+    def delta_since(self, base):
+        """Promjene tabele u odnosu na kopiju base, u formatu za add_delta"""
+        changed = np.flatnonzero(self.table != base)
+        states, actions = np.divmod(changed, len(self.actions))
+        keys = self.encoder.decode_batch(states).tolist()
+        differences = (self.table.reshape(-1)[changed] - base.reshape(-1)[changed]).tolist()
+        return {
+            (tuple(key), self.actions[a]): value
+            for key, a, value in zip(keys, actions.tolist(), differences)
+        }
+
+    @property
+    def q_table(self):
+        """Izvoz u dict format {((phase, duration_bin, *queue_bins), action): q}"""
+        states, actions = np.nonzero(self.visited)
+        return {
+            (self.encoder.decode(s), self.actions[a]): float(self.table[s, a])
+            for s, a in zip(states, actions)
+        }
+
+    @q_table.setter
+    def q_table(self, q_table):
+        """Uvoz iz dict formata (npr. učitanog iz qtable_ep*.pkl)"""
+        if q_table:
+            # Tabela druge mreže ili semafora: oblik se prilagođava ključevima
+            n_phases, n_queues = table_dims(q_table)
+            if n_queues == self.encoder.n_queues:
+                n_phases = max(n_phases, self.encoder.n_phases)
+            if (n_phases, n_queues) != (self.encoder.n_phases, self.encoder.n_queues):
+                self.set_dims(n_phases, n_queues)
+        self.table.fill(0.0)
+        self.visited.fill(False)
+        for (key, action), value in q_table.items():
+            s = self.encoder.encode_key(key)
+            a = self.action_index[action]
+            self.table[s, a] = value
+            self.visited[s, a] = True
+
+
+def make_agent(actions, alpha=0.1, gamma=0.95, epsilon=0.5, impl=Q_TABLE_IMPL, n_phases=None, n_queues=None):
+    """Kreira agenta sa dict ili array Q-tabelom prema Q_TABLE_IMPL (oblik array tabele: state_dims)"""
+    if impl == "array":
+        return ArrayQLearningAgent(actions, n_phases, n_queues, alpha=alpha, gamma=gamma, epsilon=epsilon)
+    if impl != "dict":
+        raise ValueError(f"Nepoznata implementacija Q-tabele: {impl}")
+    return QLearningAgent(actions, alpha=alpha, gamma=gamma, epsilon=epsilon)
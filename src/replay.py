@@ -0,0 +1,121 @@
+import argparse
+import pickle
+import numpy as np
+from qtable import ArrayQLearningAgent, StateEncoder, state_dims
+from checkpoint import load_q_table
+from config import REPLAY_CAPACITY, REPLAY_BATCH_SIZE
+
+
+class ReplayBuffer:
+    """Bafer iskustva u unaprijed alociranim kružnim nizovima.
+
+    Prijelazi se čuvaju kao indeksi stanja (StateEncoder), pa dodavanje i
+    uzorkovanje ne alociraju Python objekte. Kada se bafer napuni, najstariji
+    prijelazi se prepisuju. Bafer se može sačuvati u .npz i kasnije učitati
+    (npr. prijelazi iz paralelnih workera ili ranijih runova).
+    """
+
+    def __init__(self, capacity=REPLAY_CAPACITY, encoder=None, seed=None):
+        self.capacity = capacity
+        self.encoder = encoder or StateEncoder(*state_dims())
+        self.rng = np.random.default_rng(seed)
+
+        self.states = np.zeros(capacity, dtype=np.int64)
+        self.actions = np.zeros(capacity, dtype=np.int64)
+        self.rewards = np.zeros(capacity, dtype=np.float32)
+        self.next_states = np.zeros(capacity, dtype=np.int64)
+        self.dones = np.zeros(capacity, dtype=bool)
+        self.position = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, state, action, reward, next_state, done=False):
+        """Dodaje jedan prijelaz sa sirovim stanjima (kao get_state); action je indeks akcije"""
+        i = self.position
+        self.states[i] = self.encoder.encode(state)
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = self.encoder.encode(next_state)
+        self.dones[i] = done
+        self.position = (i + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def add_batch(self, states, actions, rewards, next_states, dones=None):
+        """Dodaje niz prijelaza zadatih indeksima stanja"""
+        n = len(states)
+        if n > self.capacity:
+            # Zadržavaju se samo najnoviji prijelazi
+            states, actions, rewards, next_states = (
+                np.asarray(a)[-self.capacity:] for a in (states, actions, rewards, next_states)
+            )
+            dones = None if dones is None else np.asarray(dones)[-self.capacity:]
+            n = self.capacity
+
+        slots = (self.position + np.arange(n)) % self.capacity
+        self.states[slots] = states
+        self.actions[slots] = actions
+        self.rewards[slots] = rewards
+        self.next_states[slots] = next_states
+        self.dones[slots] = False if dones is None else dones
+        self.position = (self.position + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def sample(self, batch_size=REPLAY_BATCH_SIZE):
+        """Slučajan paket (states, actions, rewards, next_states, dones)"""
+        slots = self.rng.integers(0, self.size, batch_size)
+        return (self.states[slots], self.actions[slots], self.rewards[slots],
+                self.next_states[slots], self.dones[slots])
+
+    def replay(self, agent, updates, batch_size=REPLAY_BATCH_SIZE):
+        """Ponavlja updates paketa iz bafera kroz agent.learn_batch"""
+        if not isinstance(agent, ArrayQLearningAgent):
+            raise ValueError("Ponavljanje iskustva zahtijeva ArrayQLearningAgent (Q_TABLE_IMPL = \"array\")")
+        if self.size == 0:
+            return
+        for _ in range(updates):
+            agent.learn_batch(*self.sample(batch_size))
+
+    def _ordered(self):
+        """Sadržaj bafera od najstarijeg do najnovijeg prijelaza"""
+        start = self.position if self.size == self.capacity else 0
+        slots = (start + np.arange(self.size)) % self.capacity
+        return (self.states[slots], self.actions[slots], self.rewards[slots],
+                self.next_states[slots], self.dones[slots])
+
+    def save(self, path):
+        states, actions, rewards, next_states, dones = self._ordered()
+        np.savez(path, states=states, actions=actions, rewards=rewards,
+                 next_states=next_states, dones=dones, encoder_shape=np.array(self.encoder.shape))
+
+    def load(self, path):
+        """Dodaje prijelaze iz .npz fajla u bafer"""
+        with np.load(path) as data:
+            if tuple(data["encoder_shape"]) != self.encoder.shape:
+                raise ValueError(f"{path}: stanja su kodirana za drugi oblik tabele")
+            self.add_batch(data["states"], data["actions"], data["rewards"],
+                           data["next_states"], data["dones"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ponavljanje sačuvanih prijelaza nad Q-tabelom")
+    parser.add_argument("buffers", nargs="+", help=".npz fajlovi sa prijelazima")
+    parser.add_argument("--q-table", required=True, help="Q-tabela (.pkl ili .qtc) koja se dotrenira")
+    parser.add_argument("--out", required=True, help="putanja nove Q-tabele (.pkl)")
+    parser.add_argument("--updates", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=REPLAY_BATCH_SIZE)
+    parser.add_argument("--alpha", type=float, default=0.05)
+    args = parser.parse_args()
+
+    agent = ArrayQLearningAgent([0, 1], alpha=args.alpha)
+    load_q_table(agent, args.q_table)
+    # Prijelazi su kodirani za oblik tabele koja se dotrenira
+    buffer = ReplayBuffer(capacity=REPLAY_CAPACITY, encoder=agent.encoder)
+    for path in args.buffers:
+        buffer.load(path)
+
+    buffer.replay(agent, args.updates, args.batch_size)
+    with open(args.out, "wb") as f:
+        pickle.dump(agent.q_table, f)
+    print(f"{args.updates} paketa × {args.batch_size} prijelaza iz {len(buffer)} sačuvanih -> {args.out}")
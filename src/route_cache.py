@@ -0,0 +1,151 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from utils import check_sumo_home, generate_random_routes, route_parameters
+from trip_generator import resolve_net_file
+from config import (
+    TRIPS_FILE,
+    ROUTE_GENERATOR,
+    DEMAND_PROFILE,
+    SIM_START_OF_GENERATING,
+    NUM_ROUTE_VARIATIONS,
+    ROUTE_CACHE_DIR
+)
+
+
+def route_options():
+    """Opcije generatora koje ulaze u ključ keša"""
+    if ROUTE_GENERATOR == "native":
+        return ["native", f"profile={DEMAND_PROFILE}"]
+    return ["--validate"]
+
+
+# Hash mreže po (putanja, veličina, vrijeme izmjene), da se fajl ne čita svaki put
+_net_hashes = {}
+
+
+def net_hash(net_path):
+    stat = os.stat(net_path)
+    signature = (os.path.abspath(net_path), stat.st_size, stat.st_mtime)
+    if signature not in _net_hashes:
+        digest = hashlib.sha256()
+        with open(net_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        _net_hashes[signature] = digest.hexdigest()
+    return _net_hashes[signature]
+
+
+class RouteCache:
+    """Keš unaprijed generisanih ruta adresiran sadržajem.
+
+    Ključ je hash od (hash mreže, seed, begin, end, period, opcije). Svaki
+    unos je direktorij sa trips fajlom i meta.json; index.json je pregled
+    svih unosa. Unos se upisuje u privremeni direktorij i atomski
+    preimenuje, pa ga više procesa može tražiti istovremeno.
+    """
+
+    def __init__(self, cache_dir=ROUTE_CACHE_DIR, net_file=None):
+        self.cache_dir = cache_dir
+        self.net_file = resolve_net_file(net_file)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def describe(self, seed):
+        sim_end, period = route_parameters(seed)
+        return {
+            "net": net_hash(self.net_file),
+            "seed": seed,
+            "begin": SIM_START_OF_GENERATING,
+            "end": sim_end,
+            "period": period,
+            "options": route_options(),
+        }
+
+    @staticmethod
+    def key(params):
+        return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+
+    def entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def lookup(self, seed):
+        """Vraća (putanja do trips fajla, sim_end) ili None ako varijanta nije keširana"""
+        params = self.describe(seed)
+        entry = self.entry_dir(self.key(params))
+        if os.path.exists(os.path.join(entry, "meta.json")):
+            return os.path.abspath(os.path.join(entry, TRIPS_FILE)), params["end"]
+        return None
+
+    def get(self, seed):
+        """Vraća (putanja do trips fajla, sim_end), generiše varijantu ako treba"""
+        cached = self.lookup(seed)
+        if cached is not None:
+            return cached
+
+        params = self.describe(seed)
+        key = self.key(params)
+        tmp_dir = tempfile.mkdtemp(prefix=f".{key}-", dir=self.cache_dir)
+        try:
+            generate_random_routes(seed, out_dir=tmp_dir)
+            if not os.path.exists(os.path.join(tmp_dir, TRIPS_FILE)):
+                raise RuntimeError(f"Generisanje ruta za seed {seed} nije uspjelo")
+            with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+                json.dump(params, f, indent=2)
+            try:
+                os.rename(tmp_dir, self.entry_dir(key))
+            except OSError:
+                # Drugi proces je u međuvremenu upisao isti unos
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        self.write_index()
+        return os.path.abspath(os.path.join(self.entry_dir(key), TRIPS_FILE)), params["end"]
+
+    def warm(self, seeds=range(NUM_ROUTE_VARIATIONS), max_workers=None):
+        """Paralelno generiše sve varijante koje još nisu u kešu"""
+        missing = [seed for seed in seeds if self.lookup(seed) is None]
+        if missing:
+            print(f"Generišem {len(missing)} varijanti ruta u keš...")
+            with ThreadPoolExecutor(max_workers=max_workers or len(missing)) as pool:
+                list(pool.map(self.get, missing))
+        return {seed: self.get(seed) for seed in seeds}
+
+    def write_index(self):
+        """Upisuje index.json iz meta fajlova svih unosa"""
+        index = {}
+        for key in sorted(os.listdir(self.cache_dir)):
+            meta_path = os.path.join(self.cache_dir, key, "meta.json")
+            if not key.startswith(".") and os.path.exists(meta_path):
+                with open(meta_path) as f:
+                    index[key] = json.load(f)
+
+        tmp_path = os.path.join(self.cache_dir, f".index-{os.getpid()}-{threading.get_ident()}.json")
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.cache_dir, "index.json"))
+
+    def clear(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keš generisanih ruta")
+    parser.add_argument("--warm", type=int, default=NUM_ROUTE_VARIATIONS,
+                        help="broj varijanti (seedova) koje treba generisati")
+    parser.add_argument("--clear", action="store_true")
+    args = parser.parse_args()
+
+    check_sumo_home()
+    cache = RouteCache()
+    if args.clear:
+        cache.clear()
+    for seed, (path, sim_end) in cache.warm(range(args.warm)).items():
+        print(f"seed {seed}: sim_end={sim_end} {path}")
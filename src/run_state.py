@@ -0,0 +1,183 @@
+import json
+import os
+import sqlite3
+import time
+from config import (
+    RUN_ID,
+    RUN_STATE_DB,
+    RUN_STATE_COMMIT_EVERY,
+    ARTIFACTS_DIR,
+    EVAL_RESULTS_ROOT
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    created REAL,
+    config TEXT
+);
+CREATE TABLE IF NOT EXISTS episodes (
+    run_id TEXT,
+    episode INTEGER,
+    alpha REAL,
+    gamma REAL,
+    epsilon REAL,
+    reward REAL,
+    steps INTEGER,
+    gen_end INTEGER,
+    arrived INTEGER,
+    avg_waiting REAL,
+    created REAL,
+    PRIMARY KEY (run_id, episode)
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    run_id TEXT,
+    episode INTEGER,
+    path TEXT,
+    created REAL,
+    PRIMARY KEY (run_id, episode)
+);
+CREATE TABLE IF NOT EXISTS evaluations (
+    run_id TEXT,
+    episode INTEGER,
+    results_dir TEXT,
+    metrics TEXT,
+    created REAL,
+    PRIMARY KEY (run_id, episode)
+);
+"""
+
+
+class RunStore:
+    """Stanje treniranja (brojač epizoda, alpha/epsilon, checkpointi, metrike) u SQLite bazi.
+
+    Zamjenjuje prepisivanje config.py nakon svake epizode. Epizode se
+    baferuju i upisuju u jednoj transakciji svakih commit_every epizoda
+    (jedan fsync po paketu); checkpointi i evaluacije se upisuju odmah.
+    Baza je u WAL modu, pa evaluacija može čitati dok trening piše, a više
+    treniranja može živjeti jedno pored drugog pod različitim run_id.
+    """
+
+    def __init__(self, run_id=RUN_ID, db_path=RUN_STATE_DB, commit_every=RUN_STATE_COMMIT_EVERY):
+        self.run_id = run_id
+        self.commit_every = commit_every
+        self.pending = []
+
+        self.db = sqlite3.connect(db_path, timeout=30)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=FULL")
+        self.db.executescript(SCHEMA)
+        with self.db:
+            self.db.execute(
+                "INSERT OR IGNORE INTO runs VALUES (?, ?, ?)", (run_id, time.time(), "{}")
+            )
+
+    # Putanje artefakata; podrazumijevani run koristi postojeće direktorije
+    @property
+    def artifacts_dir(self):
+        return ARTIFACTS_DIR if self.run_id == "default" else f"{ARTIFACTS_DIR}-{self.run_id}"
+
+    @property
+    def tables_dir(self):
+        return os.path.join(self.artifacts_dir, "tables")
+
+    @property
+    def log_path(self):
+        return os.path.join(self.artifacts_dir, "log.csv")
+
+    @property
+    def eval_dir(self):
+        return EVAL_RESULTS_ROOT if self.run_id == "default" else f"{EVAL_RESULTS_ROOT}-{self.run_id}"
+
+    def record_episode(self, episode, alpha, gamma, epsilon, reward=None, steps=None,
+                       gen_end=None, arrived=None, avg_waiting=None):
+        self.pending.append((self.run_id, episode, alpha, gamma, epsilon, reward, steps,
+                             gen_end, arrived, avg_waiting, time.time()))
+        if len(self.pending) >= self.commit_every:
+            self.flush()
+
+    def import_legacy(self, episode, alpha, gamma, epsilon):
+        """Jednokratno upisuje stanje starog treniranja ako run još nema nijednu epizodu"""
+        self.flush()
+        with self.db:
+            if self.db.execute("SELECT 1 FROM episodes WHERE run_id = ? LIMIT 1", (self.run_id,)).fetchone():
+                return False
+            self.db.execute(
+                "INSERT INTO episodes (run_id, episode, alpha, gamma, epsilon, created) VALUES (?, ?, ?, ?, ?, ?)",
+                (self.run_id, episode, alpha, gamma, epsilon, time.time())
+            )
+        return True
+
+    def record_checkpoint(self, episode, path):
+        self.flush()
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?)",
+                (self.run_id, episode, path, time.time())
+            )
+
+    def record_evaluation(self, episode, results_dir, metrics):
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO evaluations VALUES (?, ?, ?, ?, ?)",
+                (self.run_id, episode, results_dir, json.dumps(metrics), time.time())
+            )
+
+    def flush(self):
+        """Upisuje baferovane epizode u jednoj transakciji"""
+        if not self.pending:
+            return
+        with self.db:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO episodes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                self.pending
+            )
+        self.pending = []
+
+    def _state(self, where, params):
+        self.flush()
+        row = self.db.execute(
+            "SELECT episode, alpha, gamma, epsilon FROM episodes WHERE run_id = ? " + where +
+            " ORDER BY episode DESC LIMIT 1", (self.run_id,) + params
+        ).fetchone()
+        if row is None:
+            return None
+        return {"episodes_done": row[0], "alpha": row[1], "gamma": row[2], "epsilon": row[3]}
+
+    def last_state(self):
+        """Posljednja upisana epizoda sa hiperparametrima, ili None za novi run"""
+        return self._state("", ())
+
+    def episode_state(self, episode):
+        """Hiperparametri nakon date epizode (ili posljednje prije nje)"""
+        return self._state("AND episode <= ?", (episode,))
+
+    def latest_checkpoint(self):
+        """(epizoda, putanja) najnovijeg checkpointa, ili None"""
+        return self.db.execute(
+            "SELECT episode, path FROM checkpoints WHERE run_id = ? ORDER BY episode DESC LIMIT 1",
+            (self.run_id,)
+        ).fetchone()
+
+    def checkpoint_path(self, episode):
+        row = self.db.execute(
+            "SELECT path FROM checkpoints WHERE run_id = ? AND episode = ?", (self.run_id, episode)
+        ).fetchone()
+        return row[0] if row else None
+
+    def truncate_after(self, episode):
+        """Briše epizode poslije date (nastavak od checkpointa ih ponovo trenira)"""
+        self.flush()
+        with self.db:
+            self.db.execute("DELETE FROM episodes WHERE run_id = ? AND episode > ?", (self.run_id, episode))
+
+    def reset(self):
+        """Briše sve zapise ovog runa (opcija --new)"""
+        self.pending = []
+        with self.db:
+            for table in ("episodes", "checkpoints", "evaluations"):
+                self.db.execute(f"DELETE FROM {table} WHERE run_id = ?", (self.run_id,))
+
+    def close(self):
+        self.flush()
+        self.db.close()
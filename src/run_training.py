@@ -1,19 +1,28 @@
+import argparse
 import pickle
-import pandas as pd
-import matplotlib.pyplot as plt
 import os
 import shutil
 import sys
-import traci
 from utils import (
-    QLearningAgent,
     check_sumo_home,
     get_state,
     generate_random_routes,
-    get_phase_count,
-    update_config,
     calculate_reward  # Dodata nova funkcija za nagradu
 )
+from session import acquire_simulation, release_simulation
+from eval_scheduler import EvaluationScheduler
+from qtable import make_agent, ArrayQLearningAgent
+from replay import ReplayBuffer
+from telemetry import TelemetryWriter
+from dashboard import start_dashboard, stop_dashboard
+from profiling import profiler
+from checkpoint import CheckpointWriter, load_q_table
+from run_state import RunStore
+from route_cache import RouteCache
+from crop_network import episode_inputs
+from snapshot import SnapshotCache
+from observation import Observer
+from termination import TerminationMonitor
 from config import (
     ALPHA,
     EPSILON,
@@ -31,71 +40,203 @@ from config import (
     NUM_EPISODES,
     Q_TABLE_PATH,
     SIMULATION_FOLDER,
-    last_alpha,
-    last_gamma,
-    last_epsilon,
-    episodes_done
+    SIM_BACKEND,
+    DECISION_INTERVAL,
+    TRIPS_FILE,
+    USE_ROUTE_CACHE,
+    USE_SNAPSHOTS,
+    USE_CROPPED_NET,
+    MESO_TRAINING,
+    MESO_MIN_EPSILON,
+    MESO_OPTIONS,
+    GRIDLOCK_PENALTY,
+    REPLAY_UPDATES_PER_EPISODE,
+    TELEMETRY_ENABLED,
+    TELEMETRY_DIR,
+    DASHBOARD_ENABLED,
+    CHECKPOINT_FORMAT,
+    RUN_ID,
+    LEGACY_EPISODES_DONE,
+    LEGACY_ALPHA,
+    LEGACY_GAMMA,
+    LEGACY_EPSILON
 )
 
 check_sumo_home()
 
-if "--new" in sys.argv:
+def clean_artifacts(store):
+    """Briše artefakte i zapise prethodnog treniranja (opcija --new)"""
     print("Cleaning previous training artifacts...")
-    if os.path.exists("evaluation-results"):
-        shutil.rmtree("evaluation-results")
-    if os.path.exists("q-tables-and-logs"):
-        shutil.rmtree("q-tables-and-logs")
-
-if os.path.exists(Q_TABLE_PATH):
-    with open(Q_TABLE_PATH, "rb") as f:
-        loaded_q_table = pickle.load(f)
-    print("Učitana postojeća Q-tabela!")
-    agent = QLearningAgent(
-        actions=[0, 1], alpha=last_alpha, gamma=last_gamma, epsilon=last_epsilon
-    )
-    agent.q_table = loaded_q_table
-else:
-    agent = QLearningAgent(actions=[0, 1], alpha=ALPHA, gamma=GAMMA, epsilon=EPSILON)
-    print("Nema postojeće Q-tabele, kreiran novi agent!")
-    try:
-        if os.path.exists("q-tables-and-logs"):
-            shutil.rmtree("q-tables-and-logs")
-        os.makedirs("q-tables-and-logs")
-        os.makedirs("q-tables-and-logs/tables", exist_ok=True)
-    except Exception as e:
-        print(f"Greška pri kreiranju direktorijuma: {e}")
-
-def run_episode(episode, sim_folder=SIMULATION_FOLDER):
+    if os.path.exists(store.eval_dir):
+        shutil.rmtree(store.eval_dir)
+    if os.path.exists(store.artifacts_dir):
+        shutil.rmtree(store.artifacts_dir)
+    store.reset()
+
+def truncate_log(log_path, episode):
+    """Zadržava u log.csv samo zaglavlje i epizode do date (uključivo)"""
+    if not os.path.exists(log_path):
+        return
+    with open(log_path) as f:
+        lines = f.readlines()
+    kept = [line for line in lines
+            if not line.split(",", 1)[0].isdigit() or int(line.split(",", 1)[0]) <= episode]
+    if len(kept) == len(lines):
+        return
+    # Novi fajl (drugi inode) pa dashboard kreće iznova
+    tmp_path = log_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.writelines(kept)
+    os.replace(tmp_path, log_path)
+    print(f"Iz {log_path} uklonjeno {len(lines) - len(kept)} epizoda poslije epizode {episode}")
+
+def load_agent(store, init_table=None):
+    """Nastavlja od posljednjeg checkpointa iz run-state baze ili kreira novog agenta.
+
+    Novi agent može krenuti od init_table (npr. tabele predtrenirane na
+    surogat modelu); ako run već ima Q-tabelu, init_table je greška. Vraća (agent, broj završenih epizoda od kojeg trening nastavlja).
+    """
+    checkpoint = store.latest_checkpoint()
+    legacy_table = Q_TABLE_PATH if store.run_id == "default" else os.path.join(store.artifacts_dir, "qtable_final.pkl")
+
+    # Početna tabela važi samo za novog agenta; nastavak bi je tiho zanemario
+    if init_table is not None and (checkpoint is not None or os.path.exists(legacy_table)):
+        existing = checkpoint[1] if checkpoint is not None else legacy_table
+        print(f"Greška: --init-q-table {init_table} se ne može primijeniti, run već ima Q-tabelu {existing}. "
+              f"Pokrenite sa --new ili drugim --run-id.")
+        sys.exit(1)
+
+    if checkpoint is not None:
+        episode, path = checkpoint
+        state = store.episode_state(episode) or {
+            "alpha": ALPHA * ALPHA_DECAY ** episode,
+            "gamma": GAMMA,
+            "epsilon": EPSILON * EPSILON_DECAY ** episode,
+        }
+        agent = make_agent(actions=[0, 1], alpha=state["alpha"], gamma=state["gamma"], epsilon=state["epsilon"])
+        load_q_table(agent, path)
+        # Epizode poslije checkpointa se ponovo treniraju, pa njihovi zapisi ne smiju ostati dvostruki
+        store.truncate_after(episode)
+        truncate_log(store.log_path, episode)
+        print(f"Nastavljam od checkpointa {path} (epizoda {episode})")
+        return agent, episode
+
+    os.makedirs(store.tables_dir, exist_ok=True)
+    if os.path.exists(legacy_table):
+        with open(legacy_table, "rb") as f:
+            loaded_q_table = pickle.load(f)
+        print("Učitana postojeća Q-tabela!")
+        # Stanje treniranja iz starog config.py prelazi u bazu pri prvom nastavku
+        if store.run_id == "default" and store.import_legacy(LEGACY_EPISODES_DONE, LEGACY_ALPHA,
+                                                             LEGACY_GAMMA, LEGACY_EPSILON):
+            print(f"Uvezeno stanje prethodnog treniranja (epizoda {LEGACY_EPISODES_DONE})")
+        state = store.last_state() or {
+            "episodes_done": EPISODES_DONE,
+            "alpha": ALPHA * ALPHA_DECAY ** EPISODES_DONE,
+            "gamma": GAMMA,
+            "epsilon": EPSILON * EPSILON_DECAY ** EPISODES_DONE,
+        }
+        agent = make_agent(actions=[0, 1], alpha=state["alpha"], gamma=state["gamma"], epsilon=state["epsilon"])
+        agent.q_table = loaded_q_table
+        return agent, state["episodes_done"]
+    else:
+        agent = make_agent(actions=[0, 1], alpha=ALPHA, gamma=GAMMA, epsilon=EPSILON)
+        print("Nema postojeće Q-tabele, kreiran novi agent!")
+        # Učitava se prije brisanja direktorija artefakata, gdje tabela može biti
+        if init_table is not None:
+            load_q_table(agent, init_table)
+            print(f"Početna Q-tabela: {init_table}")
+        try:
+            if os.path.exists(store.artifacts_dir):
+                shutil.rmtree(store.artifacts_dir)
+            os.makedirs(store.tables_dir, exist_ok=True)
+        except Exception as e:
+            print(f"Greška pri kreiranju direktorijuma: {e}")
+    return agent, EPISODES_DONE
+
+def use_mesosim(epsilon):
+    """Da li se epizoda sa datim epsilonom simulira mezoskopski (rane epizode sa puno istraživanja)"""
+    return MESO_TRAINING and epsilon > MESO_MIN_EPSILON
+
+
+def run_episode(agent, episode, sim_folder=SIMULATION_FOLDER, work_dir=None, backend=SIM_BACKEND,
+                decision_interval=DECISION_INTERVAL, replay=None, telemetry=None, mesoscopic=False,
+                monitor=None):
+    """Jedna epizoda treniranja; work_dir daje izolovan direktorij za rute (paralelni workeri).
+
+    decision_interval = k: SUMO se pomjera k koraka jednim pozivom, a stanje
+    se opaža i agent uči samo u tačkama odluke; nagrada prijelaza je zbir
+    nagrada preskočenih koraka (stanje između odluka se ne opaža, pa se
+    koristi nagrada opaženog stanja pomnožena brojem koraka). Ako je dat
+    replay bafer, svaki naučeni prijelaz se i u njega upisuje, a telemetry
+    (TelemetryWriter) dobija zapis svakog koraka odluke. Sa mesoscopic=True
+    SUMO koristi mezoskopski model (MESO_OPTIONS), bez snimka stanja.
+    monitor (TerminationMonitor) prekida epizodu u zastoju; posljednji
+    prijelaz je tada terminalan i dobija GRIDLOCK_PENALTY, a razlog ostaje
+    u monitor.reason.
+    """
     if not os.path.exists(sim_folder):
         print(f"Direktorijum '{sim_folder}' ne postoji!")
         return (0, 0, 0, 0, 0)
     
-    os.chdir(sim_folder)
     seed = episode % NUM_ROUTE_VARIATIONS
-    sim_generating_end = generate_random_routes(seed)
-    os.chdir("../src")
+    sumo_args = [SUMO_BINARY, "-c", CONFIG_FILE, "--no-warnings", "--no-step-log"]
+    state = None
+    with profiler.section("routes"):
+        if USE_ROUTE_CACHE:
+            config_file, route_file, sim_generating_end = episode_inputs(seed, USE_CROPPED_NET)
+            sumo_args = [SUMO_BINARY, "-c", config_file, "--no-warnings", "--no-step-log", "--route-files", route_file]
+            # Snimci su mikroskopski i ne mogu se učitati u mezo modelu
+            if USE_SNAPSHOTS and not mesoscopic:
+                state = SnapshotCache(backend=backend, cropped=USE_CROPPED_NET).get(seed)
+        elif work_dir is None:
+            # Bez chdir: radni direktorij dijele pozadinske niti (evaluacija, dashboard)
+            sim_generating_end = generate_random_routes(seed, out_dir=sim_folder)
+        else:
+            sim_generating_end = generate_random_routes(seed, out_dir=work_dir)
+            sumo_args += ["--route-files", os.path.join(work_dir, TRIPS_FILE)]
     
-    traci.start([SUMO_BINARY, "-c", CONFIG_FILE, "--no-warnings", "--no-step-log"])
-    step = 0
-    last_action_time = 0
+    if mesoscopic:
+        sumo_args = sumo_args + MESO_OPTIONS
+    with profiler.section("start"):
+        conn = profiler.wrap_connection(acquire_simulation(sumo_args, backend=backend, state=state))
+    # Sa snimkom epizoda počinje od vremena snimka, sa vozilima već u mreži
+    step = int(conn.simulation.getTime())
+    last_action_time = step
     total_reward = 0
-    departed_vehicles = 0
     arrived_vehicles = 0
     departures_ended = False
     cumulative_waiting = 0
     measurement_count = 0
     last_phase_change_time = 0
     
-    # Inicijalizacija stanja
-    lanes = traci.trafficlight.getControlledLanes(TL_ID)
-    state = get_state(TL_ID)
+    # Inicijalizacija pretplata (stanje se dalje čita iz keša)
+    with profiler.section("start"):
+        observer = Observer(TL_ID, conn, interval=decision_interval, mesoscopic=mesoscopic)
+        observer.subscribe()
+    departed_vehicles = len(observer.vehicle_ids)
+    if monitor is None:
+        monitor = TerminationMonitor()
+    monitor.reset(step)
+
+    # Prijelaz (s, a, r) iz prethodne odluke; uči se kad se opazi s'
+    previous = None
 
     while step < MAX_STEPS:
-        traci.simulationStep()
-        step += 1
+        with profiler.section("sumo_step"):
+            if decision_interval > 1:
+                elapsed = min(decision_interval, MAX_STEPS - step)
+                conn.simulationStep(step + elapsed)
+            else:
+                elapsed = 1
+                conn.simulationStep()
+        step += elapsed
+        profiler.count("steps", elapsed)
+        with profiler.section("observe"):
+            observer.update()
         
-        current_departed = traci.simulation.getDepartedNumber()
-        current_arrived = traci.simulation.getArrivedNumber()
+        current_departed = observer.departed
+        current_arrived = observer.arrived
         
         if step >= sim_generating_end:
             departures_ended = True
@@ -106,27 +247,46 @@ def run_episode(episode, sim_folder=SIMULATION_FOLDER):
                 break
 
         # Prikupljanje podataka o čekanju
-        waiting_times = [traci.vehicle.getWaitingTime(veh_id) for veh_id in traci.vehicle.getIDList()]
-        if waiting_times:
-            cumulative_waiting += sum(waiting_times)
-            measurement_count += len(waiting_times)
+        if observer.vehicle_count:
+            cumulative_waiting += observer.waiting_sum * elapsed
+            measurement_count += observer.vehicle_count * elapsed
 
         # Izbor akcije
-        current_phase = traci.trafficlight.getPhase(TL_ID)
+        current_phase = observer.phase
         if current_phase == -1:
             continue
         
-        current_state = get_state(TL_ID)
+        # Stanje se opaža jednom po koraku, nakon simulationStep
+        with profiler.section("observe"):
+            current_state = get_state(TL_ID, observer=observer)
+
+        # Zastoj: prijelaz u current_state je terminalan, sa kaznom
+        done = monitor.check(step, current_state, observer) is not None
+
+        # Učenje agenta na stvarnom prijelazu s -> s'
+        if previous is not None:
+            prev_state, prev_action, prev_reward = previous
+            if done:
+                prev_reward += GRIDLOCK_PENALTY
+                total_reward += GRIDLOCK_PENALTY
+            with profiler.section("learn"):
+                agent.learn(prev_state, prev_action, prev_reward, current_state, done)
+                if replay is not None:
+                    replay.add(prev_state, prev_action, prev_reward, current_state, done)
+        if done:
+            print(f"Epizoda {episode} prekinuta u koraku {step}: {monitor.reason}")
+            break
 
         if step - last_action_time >= MIN_PHASE_DURATION:
             if step - last_action_time >= MAX_PHASE_DURATION:
                 action = 1
             else:
-                action = agent.choose_action(current_state)
+                with profiler.section("choose_action"):
+                    action = agent.choose_action(current_state)
                 
             if action == 1:
-                new_phase = (current_phase + 1) % get_phase_count()
-                traci.trafficlight.setPhase(TL_ID, new_phase)
+                new_phase = observer.topology.next_phase(current_phase)
+                observer.set_phase(new_phase)
                 last_action_time = step
                 # Optimizovana promjena faze - KORIGOVANO
                 #phase_options = list(range(get_phase_count()))
@@ -152,89 +312,124 @@ def run_episode(episode, sim_folder=SIMULATION_FOLDER):
             action = 0
 
         # Izračun nagrade
-        reward = calculate_reward(current_state)
+        # Stanje važi za narednih decision_interval koraka do sljedeće odluke
+        reward = calculate_reward(current_state) * decision_interval
         total_reward += reward
-
-        # Učenje agenta
-        next_state = get_state(TL_ID)
-        agent.learn(current_state, action, reward, next_state)
-        #state = next_state
+        previous = (current_state, action, reward)
+        if telemetry is not None:
+            with profiler.section("telemetry"):
+                telemetry.record(step, current_state, observer.waiting_sum, observer.vehicle_count, reward, action)
         
         # update pokrenutih i pristiglih vozila
         departed_vehicles += current_departed
         arrived_vehicles += current_arrived
 
-    traci.close()
+    with profiler.section("close"):
+        release_simulation(conn)
     
     # Izračun prosečnog vremena čekanja
     avg_waiting = cumulative_waiting / measurement_count if measurement_count > 0 else 0
     
     return (total_reward, step, sim_generating_end, arrived_vehicles, avg_waiting)
 
-# Glavna petlja treniranja
-for ep in range(EPISODES_DONE + 1, NUM_EPISODES + 1):
-    agent.epsilon *= EPSILON_DECAY
-    agent.alpha *= ALPHA_DECAY
-    
-    print(f"Početak epizode {ep}")
-    reward, steps, gen_end, arrived, avg_wait = run_episode(ep)
-    
-    # Čuvanje Q-tabele
-    if ep % 40 == 0 or ep == NUM_EPISODES:
-        table_path = f"q-tables-and-logs/tables/qtable_ep{ep}.pkl"
+# Binarni checkpointi: pun snimak svakih CHECKPOINT_FULL_EVERY, između njih delte
+checkpoint_writer = CheckpointWriter()
+
+def save_checkpoint(agent, ep, store, scheduler=None):
+    """Čuva Q-tabelu, bilježi je u run-state bazi i šalje na evaluaciju"""
+    if CHECKPOINT_FORMAT == "binary":
+        table_path = checkpoint_writer.save(agent, ep, os.path.join(store.tables_dir, f"qtable_ep{ep}.qtc"))
+    else:
+        table_path = os.path.join(store.tables_dir, f"qtable_ep{ep}.pkl")
         with open(table_path, "wb") as f:
             pickle.dump(agent.q_table, f)
-        print(f"Sačuvana Q-tabela: {table_path}")
-        
-        # Pokreni evaluaciju
-        print(f"Pokrećem evaluaciju nakon {ep} epizoda...")
-        os.system(f"{sys.executable} evaluate_agent.py")
+    store.record_checkpoint(ep, table_path)
+    print(f"Sačuvana Q-tabela: {table_path}")
     
-    # Logovanje rezultata
-    log_entry = f"{ep},{reward},{gen_end},{steps},{arrived},{avg_wait}\n"
-    with open("q-tables-and-logs/log.csv", "a") as log_file:
-        if ep == 1:
-            log_file.write("Episode,Total Reward,Gen End,Sim End,Arrived Vehicles,Avg Waiting\n")
+    # Pokreni evaluaciju
+    print(f"Pokrećem evaluaciju nakon {ep} epizoda...")
+    if scheduler is not None:
+        scheduler.submit(table_path, ep)
+    else:
+        os.system(f"{sys.executable} evaluate_agent.py --run-id {store.run_id} --episode {ep} --checkpoint {table_path}")
+
+def log_episode(ep, reward, steps, gen_end, arrived, avg_wait, log_path="q-tables-and-logs/log.csv", termination=None):
+    """Dodaje rezultat epizode u log.csv; termination je razlog ranog prekida (zastoj)"""
+    log_entry = f"{ep},{reward},{gen_end},{steps},{arrived},{avg_wait},{termination or ''}\n"
+    with open(log_path, "a") as log_file:
+        # Zaglavlje samo u novom fajlu: prva epizoda paralelnog treniranja ne mora biti prvi red
+        if log_file.tell() == 0:
+            log_file.write("Episode,Total Reward,Gen End,Sim End,Arrived Vehicles,Avg Waiting,Termination\n")
         log_file.write(log_entry)
     
     print(f"Epizoda {ep} završena: Nagrada={reward:.2f}, Vozila={arrived}, Čekanje={avg_wait:.2f}s")
-    
-    # Ažuriranje konfiguracije
-    update_config(
-        last_alpha=round(agent.alpha, 6),
-        last_gamma=round(agent.gamma, 6),
-        last_epsilon=round(agent.epsilon, 6),
-        episodes_done=ep
-    )
-
-# Generisanje grafikona
-if os.path.exists("q-tables-and-logs/log.csv"):
-    os.chdir("q-tables-and-logs")
-    df = pd.read_csv("log.csv")
-    
-    plt.figure(figsize=(12, 6))
-    
-    # Grafikon nagrada
-    plt.subplot(1, 2, 1)
-    df['Smoothed Reward'] = df['Total Reward'].rolling(window=50).mean()
-    plt.plot(df['Episode'], df['Smoothed Reward'], 'b-')
-    plt.xlabel('Epizoda')
-    plt.ylabel('Prosečna nagrada')
-    plt.title('Tok treniranja')
-    plt.grid(True)
-    
-    # Grafikon vremena čekanja
-    plt.subplot(1, 2, 2)
-    df['Smoothed Waiting'] = df['Avg Waiting'].rolling(window=50).mean()
-    plt.plot(df['Episode'], df['Smoothed Waiting'], 'r-')
-    plt.xlabel('Epizoda')
-    plt.ylabel('Prosečno čekanje (s)')
-    plt.title('Vreme čekanja vozila')
-    plt.grid(True)
-    
-    plt.tight_layout()
-    plt.savefig("training_progress.png")
-    print("Grafikoni sačuvani kao training_progress.png")
-    os.chdir("..")
-else:
-    print("Log fajl nije pronađen, preskačem generisanje grafikona")
\ No newline at end of file
+
+def train(agent, store, start_episode=EPISODES_DONE):
+    """Glavna petlja treniranja; evaluacija checkpointa teče u pozadini"""
+    if USE_ROUTE_CACHE:
+        RouteCache().warm()
+
+    scheduler = EvaluationScheduler(results_root=store.eval_dir, run_id=store.run_id)
+    monitor = TerminationMonitor()
+    replay = None
+    if REPLAY_UPDATES_PER_EPISODE > 0:
+        if isinstance(agent, ArrayQLearningAgent):
+            replay = ReplayBuffer(encoder=agent.encoder)
+        else:
+            print("Ponavljanje iskustva zahtijeva Q_TABLE_IMPL = \"array\", isključeno")
+    try:
+        for ep in range(start_episode + 1, NUM_EPISODES + 1):
+            agent.epsilon *= EPSILON_DECAY
+            agent.alpha *= ALPHA_DECAY
+            
+            mesoscopic = use_mesosim(agent.epsilon)
+            print(f"Početak epizode {ep}" + (" (mezoskopski)" if mesoscopic else ""))
+            with profiler.episode(f"ep{ep:05d}", store.artifacts_dir):
+                telemetry = None
+                if TELEMETRY_ENABLED:
+                    telemetry = TelemetryWriter(os.path.join(store.artifacts_dir, TELEMETRY_DIR), f"ep{ep:05d}")
+                reward, steps, gen_end, arrived, avg_wait = run_episode(agent, ep, replay=replay, telemetry=telemetry,
+                                                                       mesoscopic=mesoscopic, monitor=monitor)
+                if telemetry is not None:
+                    telemetry.close()
+                if replay is not None:
+                    with profiler.section("replay"):
+                        replay.replay(agent, REPLAY_UPDATES_PER_EPISODE)
+
+                # Stanje runa (baferovano, upisuje se u paketima)
+                with profiler.section("run_state"):
+                    store.record_episode(ep, agent.alpha, agent.gamma, agent.epsilon,
+                                         reward, steps, gen_end, arrived, avg_wait)
+
+                # Čuvanje Q-tabele
+                if ep % 40 == 0 or ep == NUM_EPISODES:
+                    with profiler.section("checkpoint"):
+                        save_checkpoint(agent, ep, store, scheduler)
+                        if replay is not None:
+                            replay.save(os.path.join(store.artifacts_dir, "replay.npz"))
+
+                # Logovanje rezultata
+                log_episode(ep, reward, steps, gen_end, arrived, avg_wait, store.log_path, monitor.reason)
+    finally:
+        store.flush()
+        print("Čekam završetak pozadinskih evaluacija...")
+        scheduler.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Treniranje Q-learning agenta")
+    parser.add_argument("--new", action="store_true", help="obriši artefakte prethodnog treniranja")
+    parser.add_argument("--run-id", default=RUN_ID, help="identifikator runa u run-state bazi")
+    parser.add_argument("--init-q-table", help="početna Q-tabela za novog agenta (npr. iz surrogate_env.py)")
+    args = parser.parse_args()
+
+    store = RunStore(args.run_id)
+    if args.new:
+        clean_artifacts(store)
+
+    agent, start_episode = load_agent(store, args.init_q_table)
+    dashboard = start_dashboard(store.artifacts_dir, store.eval_dir) if DASHBOARD_ENABLED else None
+    try:
+        train(agent, store, start_episode)
+    finally:
+        stop_dashboard(dashboard)
+        store.close()
@@ -0,0 +1,161 @@
+import argparse
+import atexit
+import os
+import time
+import traci
+from backend import start_simulation, available_backends, TRACI_ERRORS
+from utils import check_sumo_home
+from config import CONFIG_FILE, SUMO_BINARY, SIM_BACKEND, REUSE_SUMO_SESSION
+
+# Greške nakon kojih se SUMO smatra srušenim i pokreće se iznova
+SESSION_ERRORS = TRACI_ERRORS + (traci.FatalTraCIError, ConnectionError, OSError)
+
+
+class SumoSession:
+    """Jedna SUMO instanca (ili libsumo) koja traje kroz više epizoda.
+
+    Prva epizoda pokreće simulator, a svaka naredna ga resetuje sa
+    load() i novim argumentima (rute), bez novog procesa i ponovnog
+    spajanja na socket. Ako load ne uspije (SUMO se srušio u prethodnoj
+    epizodi ili tokom učitavanja), stara konekcija se odbacuje i
+    simulator se pokreće iznova pod novom oznakom. restore() vraća
+    simulaciju na sačuvano stanje (snapshot.py) i preskače load ako su
+    argumenti isti kao u prethodnoj epizodi.
+    """
+
+    def __init__(self, backend=SIM_BACKEND, label="session"):
+        self.backend = backend
+        self.label = label
+        self.conn = None
+        self.args = None
+        self.restarts = 0
+        self.loads = 0
+
+    def acquire(self, args):
+        """Konekcija spremna za novu epizodu sa datim SUMO argumentima"""
+        if self.conn is not None:
+            try:
+                # load prima argumente bez imena programa
+                self.conn.load(args[1:])
+                self.loads += 1
+                self.args = args
+                return self.conn
+            except SESSION_ERRORS as e:
+                print(f"SUMO sesija {self.label} nije dostupna ({e}), ponovno pokretanje")
+                self.discard()
+                self.restarts += 1
+
+        # traci ne dozvoljava dvije konekcije pod istom oznakom, a srušena
+        # konekcija može ostati registrovana
+        self.conn = start_simulation(args, backend=self.backend, label=f"{self.label}-{self.restarts}")
+        self.args = args
+        return self.conn
+
+    def restore(self, args, state_path):
+        """Konekcija postavljena na stanje iz state_path (rute iz args)"""
+        if self.conn is not None and self.args == args:
+            try:
+                self.conn.simulation.loadState(state_path)
+                return self.conn
+            except SESSION_ERRORS as e:
+                print(f"SUMO sesija {self.label} nije dostupna ({e}), ponovno pokretanje")
+                self.discard()
+                self.restarts += 1
+
+        conn = self.acquire(args)
+        conn.simulation.loadState(state_path)
+        return conn
+
+    def discard(self):
+        """Zatvara konekciju ne obazirući se na greške (srušen simulator)"""
+        if self.conn is None:
+            return
+        try:
+            self.conn.close()
+        except SESSION_ERRORS:
+            pass
+        self.conn = None
+        self.args = None
+
+    def close(self):
+        self.discard()
+
+
+# Jedna sesija po procesu (workeri paralelnog treniranja i evaluacije imaju svoju)
+_sessions = {}
+_sessions_pid = os.getpid()
+
+
+def _process_sessions():
+    """Sesije ovog procesa; proces nastao forkom ne smije koristiti konekcije roditelja"""
+    global _sessions_pid
+    if _sessions_pid != os.getpid():
+        # Naslijeđene konekcije pripadaju roditelju: zaboravljaju se bez close(),
+        # jer bi close() zatvorio i roditeljev SUMO
+        _sessions.clear()
+        _sessions_pid = os.getpid()
+    return _sessions
+
+
+def acquire_simulation(args, backend=SIM_BACKEND, state=None):
+    """Konekcija za epizodu: iz trajne sesije procesa ili novi SUMO (REUSE_SUMO_SESSION = False).
+
+    Sa state (putanja snimka) simulacija počinje od sačuvanog stanja.
+    """
+    if not REUSE_SUMO_SESSION:
+        if state is not None:
+            args = args + ["--load-state", state]
+        return start_simulation(args, backend=backend)
+    sessions = _process_sessions()
+    key = (backend, args[0])
+    session = sessions.get(key)
+    if session is None:
+        session = sessions[key] = SumoSession(backend, label=f"session-{backend}-{args[0]}")
+    if state is not None:
+        return session.restore(args, state)
+    return session.acquire(args)
+
+
+def release_simulation(conn):
+    """Kraj epizode: trajna sesija ostaje otvorena za sljedeći load"""
+    if not REUSE_SUMO_SESSION:
+        conn.close()
+
+
+@atexit.register
+def close_sessions():
+    """Zatvara sesije ovog procesa (npr. prije pokretanja poola procesa)"""
+    sessions = _process_sessions()
+    for session in sessions.values():
+        session.close()
+    sessions.clear()
+
+
+def measure_startup(backend, episodes, reuse):
+    """Prosječno trajanje pokretanja epizode do prvog koraka simulacije"""
+    args = [SUMO_BINARY, "-c", CONFIG_FILE, "--no-warnings", "--no-step-log"]
+    session = SumoSession(backend, label=f"startup-{backend}")
+    timings = []
+    for _ in range(episodes):
+        start = time.perf_counter()
+        conn = session.acquire(args)
+        conn.simulationStep()
+        timings.append(time.perf_counter() - start)
+        if not reuse:
+            session.close()
+    session.close()
+    return sum(timings) / len(timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trajanje pokretanja epizode: novi SUMO vs load u trajnoj sesiji")
+    parser.add_argument("--episodes", type=int, default=10)
+    parser.add_argument("--backend", choices=available_backends(), nargs="*", default=available_backends())
+    args = parser.parse_args()
+
+    check_sumo_home()
+    for backend in args.backend:
+        cold = measure_startup(backend, args.episodes, reuse=False)
+        reused = measure_startup(backend, args.episodes, reuse=True)
+        print(f"{backend:>8}: novi proces {cold * 1000:8.1f} ms, load {reused * 1000:8.1f} ms "
+              f"({cold / reused:.2f}x)")
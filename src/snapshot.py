@@ -0,0 +1,67 @@
+import argparse
+import os
+from crop_network import CroppedDemand, episode_inputs
+from route_cache import RouteCache
+from session import acquire_simulation, release_simulation
+from utils import check_sumo_home
+from config import SUMO_BINARY, SIM_BACKEND, NUM_ROUTE_VARIATIONS, SNAPSHOT_WARMUP
+
+
+class SnapshotCache:
+    """Zagrijana stanja mreže (SUMO saveState) po varijanti ruta.
+
+    Stanje se snima jednom, nakon warmup sekundi simulacije sa fiksnim
+    vremenima semafora, u direktorij unosa keša ruta te varijante, pa važi
+    dok god važi i sam unos (ista mreža, seed i parametri generisanja).
+    Epizode treniranja i obje grane evaluacije (fiksna vremena / agent)
+    počinju od istog stanja umjesto da svaki put pune praznu mrežu.
+    Sa cropped=True snima se stanje izrezane mreže (crop_network.py).
+    """
+
+    def __init__(self, warmup=SNAPSHOT_WARMUP, backend=SIM_BACKEND, route_cache=None, cropped=False):
+        self.warmup = warmup
+        self.backend = backend
+        self.routes = route_cache or RouteCache()
+        self.cropped = cropped
+
+    def path(self, seed):
+        entry = self.routes.entry_dir(self.routes.key(self.routes.describe(seed)))
+        # Snimak izrezane mreže važi samo za tu verziju izrezane mreže
+        suffix = f"_cropped-{CroppedDemand().key}" if self.cropped else ""
+        return os.path.abspath(os.path.join(entry, f"state_{self.warmup}{suffix}.xml.gz"))
+
+    def get(self, seed):
+        """Putanja snimka za varijantu seed; snima ga ako još ne postoji"""
+        config_file, route_file, _ = episode_inputs(seed, self.cropped)
+        state_path = self.path(seed)
+        if not os.path.exists(state_path):
+            self._capture(config_file, route_file, state_path)
+        return state_path
+
+    def _capture(self, config_file, route_file, state_path):
+        print(f"Snimam stanje nakon {self.warmup}s simulacije: {state_path}")
+        conn = acquire_simulation(
+            [SUMO_BINARY, "-c", config_file, "--no-warnings", "--no-step-log", "--route-files", route_file,
+             "--save-state.rng"],
+            backend=self.backend
+        )
+        conn.simulationStep(self.warmup)
+        # Privremeno ime po procesu; više workera može snimati istu varijantu
+        tmp_path = state_path.replace(".xml.gz", f".{os.getpid()}.tmp.xml.gz")
+        conn.simulation.saveState(tmp_path)
+        release_simulation(conn)
+        os.replace(tmp_path, state_path)
+
+    def warm(self, seeds=range(NUM_ROUTE_VARIATIONS)):
+        return {seed: self.get(seed) for seed in seeds}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Snimci zagrijanog stanja mreže po varijanti ruta")
+    parser.add_argument("--warm", type=int, default=NUM_ROUTE_VARIATIONS, help="broj varijanti (seedova)")
+    parser.add_argument("--warmup", type=int, default=SNAPSHOT_WARMUP, help="sekundi simulacije prije snimanja")
+    args = parser.parse_args()
+
+    check_sumo_home()
+    for seed, path in SnapshotCache(args.warmup).warm(range(args.warm)).items():
+        print(f"seed {seed}: {path}")
@@ -0,0 +1,185 @@
+import argparse
+import os
+import pickle
+import time
+import numpy as np
+from qtable import ArrayQLearningAgent
+from topology import load_topology
+from config import (
+    TL_ID,
+    ALPHA,
+    GAMMA,
+    EPSILON,
+    MIN_PHASE_DURATION,
+    MAX_PHASE_DURATION,
+    ROUTES_PER_SEC_RANGE_MIN,
+    ROUTES_PER_SEC_RANGE_MAX,
+    SURROGATE_NUM_ENVS,
+    SURROGATE_EPISODE_STEPS,
+    SURROGATE_ARRIVAL_SHARE,
+    SURROGATE_SATURATION_FLOW
+)
+
+# Udio kapaciteta trake po znaku stanja faze: G prioritetno zeleno, g zeleno uz ustupanje
+GREEN_WEIGHTS = {"G": 1.0, "g": 0.5}
+
+
+class SurrogateIntersection:
+    """Vektorizovan model redova čekanja za semafor TL_ID.
+
+    n_envs kopija raskrsnice se simulira zajedno, sekundu po sekundu:
+    vozila dolaze na prilaze po Poissonovom procesu (intenzitet iz
+    ROUTES_PER_SEC_RANGE_*), a na zelenom odlaze saturacionim protokom po
+    traci. Prilazi, trake i faze dolaze iz topologije semafora, a stanje je
+    u istom formatu (phase, duration, *queues) kao get_state.
+    """
+
+    def __init__(self, topology, n_envs=SURROGATE_NUM_ENVS, episode_steps=SURROGATE_EPISODE_STEPS,
+                 arrival_share=SURROGATE_ARRIVAL_SHARE, saturation_flow=SURROGATE_SATURATION_FLOW, seed=None):
+        self.topology = topology
+        self.n_envs = n_envs
+        self.episode_steps = episode_steps
+        self.arrival_share = arrival_share
+        self.rng = np.random.default_rng(seed)
+
+        # Broj jedinstvenih traka po prilazu
+        lane_approach = {}
+        for lane, approach in zip(topology.links, topology.link_approach.tolist()):
+            lane_approach[lane] = approach
+        lane_ids = list(lane_approach)
+        self.lane_counts = np.bincount(list(lane_approach.values()), minlength=topology.n_approaches)
+        self.lane_share = self.lane_counts / self.lane_counts.sum()
+
+        # Kapacitet odlaska (vozila/s) po fazi i prilazu: traka propušta ako je
+        # bilo koji njen link zelen u toj fazi
+        self.capacity = np.zeros((topology.n_phases, topology.n_approaches))
+        for p, state in enumerate(topology.phase_states):
+            lane_weight = dict.fromkeys(lane_ids, 0.0)
+            for lane, signal in zip(topology.links, state):
+                lane_weight[lane] = max(lane_weight[lane], GREEN_WEIGHTS.get(signal, 0.0))
+            for lane, weight in lane_weight.items():
+                self.capacity[p, lane_approach[lane]] += saturation_flow * weight
+
+        self.reset()
+
+    def reset(self):
+        """Nova epizoda za sve kopije; intenzitet dolazaka se bira po kopiji"""
+        n = self.n_envs
+        routes_per_sec = self.rng.uniform(ROUTES_PER_SEC_RANGE_MIN, ROUTES_PER_SEC_RANGE_MAX, n)
+        self.arrival_rates = (routes_per_sec * self.arrival_share)[:, None] * self.lane_share[None, :]
+        self.vehicles = np.zeros((n, self.topology.n_approaches))
+        self.phases = np.zeros(n, dtype=np.int64)
+        self.phase_time = np.zeros(n)
+        self.since_action = np.zeros(n, dtype=np.int64)
+        self.t = 0
+        return self.states()
+
+    def states(self):
+        """Stanja kao niz oblika (n_envs, 2 + n_approaches)"""
+        return np.column_stack([
+            self.phases,
+            self.topology.phase_durations[self.phases],
+            self.vehicles / self.lane_counts,
+        ])
+
+    def state_tuples(self):
+        """Stanja kao lista tuple-ova, isto kao get_state"""
+        return [(int(row[0]), float(row[1])) + tuple(row[2:]) for row in self.states().tolist()]
+
+    @staticmethod
+    def rewards(states):
+        """utils.calculate_reward za niz stanja"""
+        durations = states[:, 1]
+        queues = states[:, 2:]
+        queue_penalty = (queues ** 2).mean(axis=1)
+        congested = (queues.max(axis=1) > 20) & (durations > 60)
+        duration_penalty = np.where(congested, (durations - 60) * 1.2, 0.0)
+        return -(queue_penalty + duration_penalty)
+
+    def step(self, actions):
+        """Primjenjuje akcije (0 = zadrži, 1 = sljedeća faza) i pomjera sve kopije jednu sekundu.
+
+        Vraća (stanja, primijenjene akcije, done); akcije poštuju
+        MIN/MAX_PHASE_DURATION kao u run_episode.
+        """
+        topology = self.topology
+        forced = self.since_action >= MAX_PHASE_DURATION
+        allowed = self.since_action >= MIN_PHASE_DURATION
+        switch = forced | (allowed & (np.asarray(actions) == 1))
+
+        self.phases[switch] = (self.phases[switch] + 1) % topology.n_phases
+        self.phase_time[switch] = 0
+        self.since_action[switch] = 0
+
+        self.t += 1
+        self.since_action += 1
+        self.phase_time += 1
+
+        # Program semafora sam prelazi u sljedeću fazu kad istekne trajanje
+        expired = self.phase_time >= topology.phase_durations[self.phases]
+        self.phases[expired] = (self.phases[expired] + 1) % topology.n_phases
+        self.phase_time[expired] = 0
+
+        arrivals = self.rng.poisson(self.arrival_rates)
+        departures = np.minimum(self.vehicles, self.rng.poisson(self.capacity[self.phases]))
+        self.vehicles += arrivals - departures
+
+        return self.states(), switch.astype(np.int64), self.t >= self.episode_steps
+
+
+def pretrain(agent, env, steps, log_every=1000):
+    """Q-učenje nad svim kopijama surogata odjednom; vraća broj prijelaza u sekundi.
+
+    Akcije se biraju i TD ažuriranja primjenjuju vektorski
+    (choose_actions / learn_batch) za sve kopije u istom koraku.
+    """
+    if not isinstance(agent, ArrayQLearningAgent) or list(agent.actions) != [0, 1]:
+        raise ValueError("Predtreniranje zahtijeva ArrayQLearningAgent sa akcijama [0, 1]")
+
+    n = env.n_envs
+    states = env.reset()
+    s = agent.encoder.encode_batch(states)
+
+    start = time.perf_counter()
+    for step in range(1, steps + 1):
+        actions = agent.choose_actions(s, env.rng)
+        rewards = env.rewards(states)
+        states, applied, done = env.step(actions)
+        s_next = agent.encoder.encode_batch(states)
+
+        # Kraj epizode surogata je vremensko ograničenje, ne završno stanje
+        agent.learn_batch(s, applied, rewards, s_next)
+
+        s = s_next
+        if done:
+            states = env.reset()
+            s = agent.encoder.encode_batch(states)
+        if log_every and step % log_every == 0:
+            print(f"Korak {step}/{steps}: prosječna nagrada {rewards.mean():.2f}")
+
+    elapsed = time.perf_counter() - start
+    return steps * n / elapsed if elapsed > 0 else 0.0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Predtreniranje Q-tabele na surogat modelu raskrsnice")
+    parser.add_argument("--envs", type=int, default=SURROGATE_NUM_ENVS)
+    parser.add_argument("--steps", type=int, default=20000, help="broj koraka (svih kopija zajedno)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--alpha", type=float, default=ALPHA)
+    parser.add_argument("--epsilon", type=float, default=EPSILON)
+    parser.add_argument("--out", default="pretrained/qtable_pretrained.pkl")
+    args = parser.parse_args()
+
+    topology = load_topology(TL_ID)
+    env = SurrogateIntersection(topology, n_envs=args.envs, seed=args.seed)
+    agent = ArrayQLearningAgent([0, 1], topology.n_phases, topology.n_approaches,
+                                alpha=args.alpha, gamma=GAMMA, epsilon=args.epsilon)
+
+    rate = pretrain(agent, env, args.steps)
+    print(f"Predtreniranje: {rate:,.0f} prijelaza/s ({args.envs} kopija × {args.steps} koraka)")
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "wb") as f:
+        pickle.dump(agent.q_table, f)
+    print(f"Sačuvana Q-tabela: {args.out} (za fino podešavanje: run_training.py --init-q-table {args.out})")
@@ -0,0 +1,219 @@
+import argparse
+import os
+import shutil
+import numpy as np
+from config import TELEMETRY_CHUNK_ROWS, TELEMETRY_FORMAT
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+FORMATS = ("parquet", "arrow", "npz")
+EXTENSIONS = {"parquet": ".parquet", "arrow": ".arrow", "npz": ".npz.d"}
+
+
+def available_format(fmt=TELEMETRY_FORMAT):
+    """Traženi format, ili npz ako pyarrow nije instaliran"""
+    if fmt not in FORMATS:
+        raise ValueError(f"Nepoznat format telemetrije: {fmt}")
+    if fmt != "npz" and pa is None:
+        return "npz"
+    return fmt
+
+
+def _remove(path):
+    """Briše fajl ili direktorij (.npz.d) ako postoji"""
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+class TelemetryWriter:
+    """Upisuje zapise po koraku simulacije u kolonske bafere i prazni ih u fajl epizode.
+
+    Baferi su unaprijed alocirani NumPy nizovi od chunk_rows redova, pa je
+    zapis jednog koraka samo upis u nekoliko nizova, a memorija je
+    ograničena bez obzira na dužinu epizode. Pun bafer se upisuje kao jedan
+    row group (Parquet), record batch (Arrow IPC) ili .npz dio (bez pyarrow).
+    Fajl dobija konačno ime tek u close(), pa čitači nikad ne vide
+    nedovršenu epizodu. Ostaci prekinutog upisa iste epizode se brišu, a
+    postojeći fajl epizode (npr. nakon nastavka treniranja) se zamjenjuje.
+    """
+
+    def __init__(self, out_dir, name, n_queues=None, chunk_rows=TELEMETRY_CHUNK_ROWS,
+                 fmt=TELEMETRY_FORMAT):
+        self.fmt = available_format(fmt)
+        self.path = os.path.join(out_dir, name + EXTENSIONS[self.fmt])
+        self.tmp_path = self.path + ".tmp"
+        self.chunk_rows = chunk_rows
+        self.n_queues = n_queues
+        os.makedirs(out_dir, exist_ok=True)
+        # Dijelovi prekinutog upisa ne smiju ući u novu epizodu
+        _remove(self.tmp_path)
+
+        self.columns = {
+            "step": np.zeros(chunk_rows, dtype=np.int32),
+            "phase": np.zeros(chunk_rows, dtype=np.int16),
+            "phase_duration": np.zeros(chunk_rows, dtype=np.float32),
+            "waiting_sum": np.zeros(chunk_rows, dtype=np.float32),
+            "vehicle_count": np.zeros(chunk_rows, dtype=np.int32),
+            "reward": np.zeros(chunk_rows, dtype=np.float32),
+            "action": np.zeros(chunk_rows, dtype=np.int8),
+        }
+        # Red po prilazu je kolona; bez n_queues broj prilaza dolazi iz prvog stanja
+        self.queues = None if n_queues is None else np.zeros((n_queues, chunk_rows), dtype=np.float32)
+        self.rows = 0
+        self.chunks = 0
+        self.writer = None
+
+    def record(self, step, state, waiting_sum, vehicle_count, reward, action):
+        """Zapis jednog koraka; state je tuple (phase, duration, *queues) iz get_state"""
+        if self.queues is None:
+            self.n_queues = len(state) - 2
+            self.queues = np.zeros((self.n_queues, self.chunk_rows), dtype=np.float32)
+        i = self.rows
+        columns = self.columns
+        columns["step"][i] = step
+        columns["phase"][i] = state[0]
+        columns["phase_duration"][i] = state[1]
+        columns["waiting_sum"][i] = waiting_sum
+        columns["vehicle_count"][i] = vehicle_count
+        columns["reward"][i] = reward
+        columns["action"][i] = action
+        self.queues[:, i] = state[2:]
+        self.rows = i + 1
+        if self.rows == self.chunk_rows:
+            self.flush()
+
+    def _chunk(self):
+        chunk = {name: column[:self.rows] for name, column in self.columns.items()}
+        for q in range(self.n_queues):
+            chunk[f"queue_{q}"] = self.queues[q, :self.rows]
+        return chunk
+
+    def flush(self):
+        if self.rows == 0:
+            return
+        chunk = self._chunk()
+
+        if self.fmt == "npz":
+            os.makedirs(self.tmp_path, exist_ok=True)
+            np.savez(os.path.join(self.tmp_path, f"{self.chunks:05d}.npz"), **chunk)
+        else:
+            batch = pa.RecordBatch.from_pydict(chunk)
+            if self.writer is None:
+                if self.fmt == "parquet":
+                    self.writer = pq.ParquetWriter(self.tmp_path, batch.schema)
+                else:
+                    self.writer = pa.ipc.new_file(self.tmp_path, batch.schema)
+            if self.fmt == "parquet":
+                self.writer.write_table(pa.Table.from_batches([batch]))
+            else:
+                self.writer.write_batch(batch)
+
+        self.chunks += 1
+        self.rows = 0
+
+    def close(self):
+        """Upisuje ostatak bafera i objavljuje fajl epizode"""
+        self.flush()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        if os.path.exists(self.tmp_path):
+            # os.replace ne može prepisati neprazan direktorij (.npz.d)
+            if os.path.isdir(self.tmp_path):
+                _remove(self.path)
+            os.replace(self.tmp_path, self.path)
+        return self.path
+
+
+def read_episode(path):
+    """Kolone jedne epizode kao dict NumPy nizova"""
+    if path.endswith(EXTENSIONS["npz"]):
+        chunks = []
+        for name in sorted(os.listdir(path)):
+            with np.load(os.path.join(path, name)) as data:
+                chunks.append({key: data[key] for key in data.files})
+        if not chunks:
+            return {}
+        return {key: np.concatenate([chunk[key] for chunk in chunks]) for key in chunks[0]}
+
+    if pa is None:
+        raise ImportError(f"Za čitanje {path} potreban je pyarrow")
+    if path.endswith(EXTENSIONS["parquet"]):
+        table = pq.read_table(path)
+    else:
+        with pa.ipc.open_file(path) as reader:
+            table = reader.read_all()
+    return {name: table.column(name).to_numpy() for name in table.column_names}
+
+
+def episode_files(telemetry_dir):
+    """Završeni fajlovi epizoda, sortirani po imenu"""
+    if not os.path.isdir(telemetry_dir):
+        return []
+    return [
+        os.path.join(telemetry_dir, name) for name in sorted(os.listdir(telemetry_dir))
+        if name.endswith(tuple(EXTENSIONS.values()))
+    ]
+
+
+def summarize(path):
+    """Sažetak epizode izračunat iz kolona (bez ponovnog pokretanja simulacije)"""
+    columns = read_episode(path)
+    queue_names = sorted((name for name in columns if name.startswith("queue_")), key=lambda n: int(n[6:]))
+    queues = np.column_stack([columns[name] for name in queue_names])
+    total_queue = queues.sum(axis=1)
+    vehicles = columns["vehicle_count"].sum()
+    return {
+        "episode": os.path.basename(path).split(".")[0],
+        "steps": int(columns["step"][-1]) if len(columns["step"]) else 0,
+        "total_reward": float(columns["reward"].sum()),
+        "avg_waiting": float(columns["waiting_sum"].sum() / vehicles) if vehicles else 0.0,
+        "avg_queue": float(total_queue.mean()) if len(total_queue) else 0.0,
+        "max_queue": float(queues.max()) if queues.size else 0.0,
+        "phase_changes": int(columns["action"].sum()),
+    }
+
+
+def plot_summaries(summaries, out_path):
+    # matplotlib se uvozi tek pri crtanju, ne pri pisanju telemetrije
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, axes = plt.subplots(3, 1, figsize=(12, 10), sharex=True)
+    x = range(len(summaries))
+    for ax, key, label in zip(axes, ("avg_queue", "avg_waiting", "total_reward"),
+                              ("Prosječan red", "Prosječno čekanje [s]", "Ukupna nagrada")):
+        ax.plot(x, [s[key] for s in summaries], "b.-")
+        ax.set_ylabel(label)
+        ax.grid(True)
+    axes[-1].set_xlabel("Epizoda (fajl telemetrije)")
+    plt.tight_layout()
+    plt.savefig(out_path)
+    plt.close(fig)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analiza telemetrije po koraku iz kolonskih fajlova")
+    parser.add_argument("telemetry_dir")
+    parser.add_argument("--plot", help="putanja grafikona sažetaka po epizodi (.png)")
+    args = parser.parse_args()
+
+    summaries = []
+    for path in episode_files(args.telemetry_dir):
+        summary = summarize(path)
+        summaries.append(summary)
+        print(f"{summary['episode']:>16}: koraci={summary['steps']:6d} nagrada={summary['total_reward']:12.1f} "
+              f"čekanje={summary['avg_waiting']:7.2f}s red={summary['avg_queue']:6.2f} "
+              f"max red={summary['max_queue']:6.1f} promjene faze={summary['phase_changes']}")
+
+    if args.plot and summaries:
+        plot_summaries(summaries, args.plot)
+        print(f"Grafikon sačuvan: {args.plot}")
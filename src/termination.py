@@ -0,0 +1,70 @@
+from collections import deque
+from config import (
+    GRIDLOCK_DETECTION,
+    GRIDLOCK_QUEUE_LIMIT,
+    GRIDLOCK_QUEUE_WINDOW,
+    GRIDLOCK_STAGNATION,
+    GRIDLOCK_MAX_TELEPORTS,
+    GRIDLOCK_MAX_WAITING
+)
+
+
+class TerminationMonitor:
+    """Prepoznaje zastoj iz toka opažanja epizode (trening i evaluacija).
+
+    Epizoda se prekida kada:
+    - ukupan red na prilazima pređe queue_limit i još raste u odnosu na
+      vrijednost od prije queue_window sekundi,
+    - nijedno vozilo ne stigne na cilj stagnation sekundi dok ih ima u mreži,
+    - SUMO teleportuje više od max_teleports zaglavljenih vozila sa
+      prilaza semafora,
+    - neko vozilo na prilazu čeka duže od max_waiting sekundi.
+    Razlog prekida ostaje u reason do sljedećeg reset().
+    """
+
+    def __init__(self, enabled=GRIDLOCK_DETECTION, queue_limit=GRIDLOCK_QUEUE_LIMIT,
+                 queue_window=GRIDLOCK_QUEUE_WINDOW, stagnation=GRIDLOCK_STAGNATION,
+                 max_teleports=GRIDLOCK_MAX_TELEPORTS, max_waiting=GRIDLOCK_MAX_WAITING):
+        self.enabled = enabled
+        self.queue_limit = queue_limit
+        self.queue_window = queue_window
+        self.stagnation = stagnation
+        self.max_teleports = max_teleports
+        self.max_waiting = max_waiting
+        self.reset()
+
+    def reset(self, step=0):
+        self.queues = deque()  # (korak, ukupan red) unutar queue_window
+        self.last_arrival = step
+        self.teleports = 0
+        self.reason = None
+
+    def check(self, step, state, observer):
+        """Razlog prekida nakon opažanja u koraku step, ili None"""
+        return self.check_queue(step, sum(state[2:]), observer)
+
+    def check_queue(self, step, total_queue, observer):
+        """Kao check, sa već izračunatim ukupnim redom (npr. najveći po raskrsnici u multi_agent.py)"""
+        if not self.enabled:
+            return None
+
+        if observer.arrived or not observer.vehicle_count:
+            self.last_arrival = step
+        self.teleports += observer.teleports
+
+        self.queues.append((step, total_queue))
+        # Čuva se posljednji uzorak stariji od prozora kao referenca
+        while len(self.queues) > 1 and self.queues[1][0] <= step - self.queue_window:
+            self.queues.popleft()
+        window_start, window_queue = self.queues[0]
+
+        if (total_queue > self.queue_limit and window_start <= step - self.queue_window
+                and total_queue > window_queue):
+            self.reason = f"rast reda ({window_queue:.1f} -> {total_queue:.1f})"
+        elif step - self.last_arrival >= self.stagnation:
+            self.reason = f"bez dolazaka {step - self.last_arrival}s"
+        elif self.teleports > self.max_teleports:
+            self.reason = f"teleportovano {self.teleports} vozila"
+        elif observer.approach_waiting_max > self.max_waiting:
+            self.reason = f"čekanje {observer.approach_waiting_max:.0f}s"
+        return self.reason
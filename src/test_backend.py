@@ -0,0 +1,31 @@
+from backend import CallCounter
+
+
+class _FakeVehicle:
+    """Domen kao u libsumo-u: klasa sa statičkim metodama"""
+
+    @staticmethod
+    def getIDList():
+        return ("v0", "v1")
+
+    @staticmethod
+    def getAllSubscriptionResults():
+        return {}
+
+
+class _FakeConnection:
+    vehicle = _FakeVehicle
+
+    @staticmethod
+    def simulationStep(step=0):
+        return None
+
+
+def test_class_domain_is_counted():
+    counter = CallCounter(_FakeConnection())
+    assert counter.vehicle.getIDList() == ("v0", "v1")
+    counter.vehicle.getAllSubscriptionResults()
+    counter.simulationStep()
+    assert counter.calls == {"vehicle.getIDList": 1, "simulationStep": 1}
+    assert counter.local_calls == 1
+    assert counter.total == 2
@@ -0,0 +1,115 @@
+import os
+import numpy as np
+import sumolib
+from trip_generator import resolve_net_file
+from config import TL_ID
+
+
+class TLSTopology:
+    """Statička topologija semafora: trake, prilazi i program faza.
+
+    Sve što get_state i promjena faze ranije računaju iz TraCI upita u
+    svakom koraku (kontrolisane trake, prilazi, broj traka po prilazu,
+    faze) ne mijenja se za datu mrežu, pa se računa jednom.
+    """
+
+    def __init__(self, tls_id, links, phases):
+        """links: kontrolisane trake po indeksu linka (kao getControlledLanes);
+        phases: lista (duration, state) iz programa semafora"""
+        self.tls_id = tls_id
+        self.links = list(links)
+
+        # Jedinstvene trake (za pretplate) i indeks trake za svaki link
+        self.lanes = list(dict.fromkeys(self.links))
+        lane_position = {lane: i for i, lane in enumerate(self.lanes)}
+        self.link_lane = np.array([lane_position[lane] for lane in self.links], dtype=np.int64)
+
+        # Prilaz = ivica trake; prilazi sortirani kao u get_state
+        edges = [lane.split('_')[0] for lane in self.links]
+        self.approaches = sorted(set(edges))
+        approach_position = {edge: i for i, edge in enumerate(self.approaches)}
+        self.link_approach = np.array([approach_position[edge] for edge in edges], dtype=np.int64)
+        self.approach_lane_counts = np.bincount(self.link_approach, minlength=len(self.approaches))
+
+        self.phase_states = [state for _, state in phases]
+        self.phase_durations = np.array([duration for duration, _ in phases], dtype=float)
+        self.n_phases = len(phases)
+        self.yellow = np.array(['y' in state.lower() for state in self.phase_states], dtype=bool)
+        self.green = ~self.yellow
+
+    @property
+    def n_approaches(self):
+        return len(self.approaches)
+
+    def queue_lengths(self, lane_vehicles):
+        """Prosječan broj vozila po traci za svaki prilaz.
+
+        lane_vehicles je niz brojeva vozila poredan kao self.lanes; trake
+        koje kontrolišu više linkova broje se jednom po linku, kao u get_state.
+        """
+        per_link = np.asarray(lane_vehicles, dtype=float)[self.link_lane]
+        totals = np.bincount(self.link_approach, weights=per_link, minlength=self.n_approaches)
+        return totals / self.approach_lane_counts
+
+    def next_phase(self, phase):
+        return (phase + 1) % self.n_phases
+
+    def phase_duration(self, phase):
+        return float(self.phase_durations[phase])
+
+    @classmethod
+    def from_net(cls, net_file=None, tls_id=TL_ID):
+        """Čita topologiju offline iz mreže preko sumolib"""
+        net = sumolib.net.readNet(resolve_net_file(net_file), withPrograms=True)
+        return cls.from_tls(net.getTLS(tls_id))
+
+    @classmethod
+    def from_tls(cls, tls):
+        """Topologija iz sumolib objekta semafora"""
+        connections = sorted(tls.getConnections(), key=lambda c: c[2])
+        links = [in_lane.getID() for in_lane, _, _ in connections]
+        program = next(iter(tls.getPrograms().values()))
+        phases = [(phase.duration, phase.state) for phase in program.getPhases()]
+        return cls(tls.getID(), links, phases)
+
+    @classmethod
+    def from_connection(cls, conn, tls_id=TL_ID):
+        """Topologija preko TraCI, jednom po konekciji"""
+        links = conn.trafficlight.getControlledLanes(tls_id)
+        program = conn.trafficlight.getAllProgramLogics(tls_id)[0]
+        phases = [(phase.duration, phase.state) for phase in program.getPhases()]
+        return cls(tls_id, links, phases)
+
+
+# Topologije po (mreža, semafor) u ovom procesu
+_topologies = {}
+
+
+def load_topology(tls_id=TL_ID, conn=None, net_file=None):
+    """Topologija iz keša; prvi put se čita iz mreže, a ako to ne uspije, preko konekcije"""
+    key = (os.path.abspath(resolve_net_file(net_file)), tls_id)
+    if key not in _topologies:
+        try:
+            _topologies[key] = TLSTopology.from_net(net_file, tls_id)
+        except Exception as e:
+            if conn is None:
+                raise
+            print(f"Topologija nije pročitana iz mreže ({e}), koristim TraCI")
+            _topologies[key] = TLSTopology.from_connection(conn, tls_id)
+    return _topologies[key]
+
+
+def load_all_topologies(net_file=None, tls_ids=None):
+    """Topologije svih semafora mreže (ili datih tls_ids), uz jedno čitanje mreže"""
+    path = os.path.abspath(resolve_net_file(net_file))
+    net = sumolib.net.readNet(path, withPrograms=True)
+    if tls_ids is None:
+        tls_ids = sorted(tls.getID() for tls in net.getTrafficLights())
+
+    topologies = []
+    for tls_id in tls_ids:
+        key = (path, tls_id)
+        if key not in _topologies:
+            _topologies[key] = TLSTopology.from_tls(net.getTLS(tls_id))
+        topologies.append(_topologies[key])
+    return topologies
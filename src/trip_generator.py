@@ -0,0 +1,173 @@
+import os
+import numpy as np
+import sumolib
+from config import SIMULATION_FOLDER, NET_FILE
+
+# Profili potražnje: relativni intenzitet u funkciji normalizovanog vremena x ∈ [0, 1]
+DEMAND_PROFILES = {
+    "constant": lambda x: np.ones_like(x),
+    # Jedan vrh u sredini intervala (špica)
+    "rush_hour": lambda x: 0.5 + 1.5 * np.exp(-((x - 0.5) / 0.15) ** 2),
+    # Jutarnja i popodnevna špica
+    "double_peak": lambda x: 0.5 + np.exp(-((x - 0.25) / 0.1) ** 2) + np.exp(-((x - 0.75) / 0.1) ** 2),
+}
+
+
+def resolve_net_file(net_file=None):
+    """Putanja do mreže; ako nekomprimovani fajl ne postoji koristi se .gz"""
+    path = net_file or os.path.join(SIMULATION_FOLDER, NET_FILE)
+    if not os.path.exists(path) and os.path.exists(path + ".gz"):
+        path += ".gz"
+    return path
+
+
+def strongly_connected_components(successors):
+    """Iterativni Tarjan; vraća niz sa indeksom komponente za svaki čvor"""
+    n = len(successors)
+    index = [-1] * n
+    low = [0] * n
+    on_stack = [False] * n
+    comp = np.full(n, -1, dtype=np.int32)
+    stack = []
+    counter = 0
+    n_comp = 0
+
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, child = work.pop()
+            if child == 0:
+                index[node] = low[node] = counter
+                counter += 1
+                stack.append(node)
+                on_stack[node] = True
+            if child < len(successors[node]):
+                work.append((node, child + 1))
+                nxt = successors[node][child]
+                if index[nxt] == -1:
+                    work.append((nxt, 0))
+                elif on_stack[nxt]:
+                    low[node] = min(low[node], index[nxt])
+                continue
+            if low[node] == index[node]:
+                while True:
+                    member = stack.pop()
+                    on_stack[member] = False
+                    comp[member] = n_comp
+                    if member == node:
+                        break
+                n_comp += 1
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+    return comp, n_comp
+
+
+class TripGenerator:
+    """Generator slučajnih putovanja direktno nad sumolib mrežom, bez randomTrips.py.
+
+    Mreža se čita jednom; ivice, težine izvora/odredišta i indeks
+    dostupnosti (matrica dostupnosti između jako povezanih komponenti) se
+    računaju unaprijed, pa se hiljade putovanja uzorkuju jednim NumPy pozivom.
+    """
+
+    def __init__(self, net_file=None, vclass="passenger", fringe_factor=1.0):
+        net = sumolib.net.readNet(resolve_net_file(net_file))
+        edges = [e for e in net.getEdges() if e.allows(vclass)]
+        position = {e.getID(): i for i, e in enumerate(edges)}
+
+        self.edge_ids = np.array([e.getID() for e in edges])
+        successors = [
+            [position[to.getID()] for to in e.getOutgoing() if to.getID() in position]
+            for e in edges
+        ]
+        has_incoming = np.zeros(len(edges), dtype=bool)
+        for targets in successors:
+            has_incoming[targets] = True
+        has_outgoing = np.array([len(targets) > 0 for targets in successors])
+
+        # Izvori moraju imati izlaz, odredišta ulaz; rubne ivice dobijaju fringe_factor
+        fringe = ~has_incoming | ~has_outgoing
+        weights = np.where(fringe, fringe_factor, 1.0)
+        self.source_p = np.where(has_outgoing, weights, 0.0)
+        self.source_p /= self.source_p.sum()
+        self.sink_p = np.where(has_incoming, weights, 0.0)
+        self.sink_p /= self.sink_p.sum()
+
+        # Dostupnost: komponenta odredišta mora biti dostižna iz komponente izvora
+        self.component, n_comp = strongly_connected_components(successors)
+        comp_successors = [set() for _ in range(n_comp)]
+        for node, targets in enumerate(successors):
+            for target in targets:
+                if self.component[target] != self.component[node]:
+                    comp_successors[self.component[node]].add(self.component[target])
+
+        # Tarjan numeriše komponente u obrnutom topološkom redu
+        self.reachable = np.eye(n_comp, dtype=bool)
+        for c in range(n_comp):
+            for succ in comp_successors[c]:
+                self.reachable[c] |= self.reachable[succ]
+
+    def departure_times(self, begin, end, period, profile="constant"):
+        """Vremena polaska: ravnomjerno raspoređeni kvantili kumulativnog intenziteta.
+
+        Za konstantan profil daje isti raspored kao randomTrips.py -p period;
+        za ostale profile intenzitet prati krivu, a srednji period ostaje isti.
+        """
+        if profile == "constant":
+            return np.arange(begin, end, period, dtype=float)
+
+        shape = DEMAND_PROFILES[profile] if isinstance(profile, str) else profile
+        grid = np.linspace(begin, end, 1024)
+        rate = shape((grid - begin) / max(end - begin, 1e-9))
+        rate = rate / rate.mean() / period
+        cumulative = np.concatenate(([0.0], np.cumsum((rate[1:] + rate[:-1]) / 2 * np.diff(grid))))
+        count = int(round(cumulative[-1]))
+        quantiles = (np.arange(count) + 0.5) / max(count, 1) * cumulative[-1]
+        return np.interp(quantiles, cumulative, grid)
+
+    def sample_pairs(self, rng, count):
+        """Uzorkuje count parova (izvor, odredište) koji su međusobno dostupni"""
+        sources = np.empty(count, dtype=np.int64)
+        sinks = np.empty(count, dtype=np.int64)
+        filled = 0
+        while filled < count:
+            need = count - filled
+            src = rng.choice(len(self.edge_ids), size=need, p=self.source_p)
+            dst = rng.choice(len(self.edge_ids), size=need, p=self.sink_p)
+            valid = (src != dst) & self.reachable[self.component[src], self.component[dst]]
+            accepted = int(valid.sum())
+            sources[filled:filled + accepted] = src[valid]
+            sinks[filled:filled + accepted] = dst[valid]
+            filled += accepted
+        return sources, sinks
+
+    def generate(self, out_path, begin, end, period, seed=None, profile="constant"):
+        """Upisuje trips XML i vraća broj generisanih putovanja"""
+        rng = np.random.default_rng(seed)
+        times = self.departure_times(begin, end, period, profile)
+        sources, sinks = self.sample_pairs(rng, len(times))
+        from_ids = self.edge_ids[sources]
+        to_ids = self.edge_ids[sinks]
+
+        with open(out_path, "w") as f:
+            f.write('<?xml version="1.0" encoding="UTF-8"?>\n<routes>\n')
+            f.writelines(
+                f'    <trip id="{i}" depart="{t:.2f}" from="{a}" to="{b}"/>\n'
+                for i, (t, a, b) in enumerate(zip(times, from_ids, to_ids))
+            )
+            f.write('</routes>\n')
+        return len(times)
+
+
+# Jedan generator po mreži u procesu (čitanje mreže je najskuplji dio)
+_generators = {}
+
+
+def generate_trips(out_path, begin, end, period, seed=None, profile="constant", net_file=None):
+    net_path = os.path.abspath(resolve_net_file(net_file))
+    if net_path not in _generators:
+        _generators[net_path] = TripGenerator(net_path)
+    return _generators[net_path].generate(out_path, begin, end, period, seed, profile)
@@ -4,6 +4,7 @@ import sys
 import traci
 import subprocess
 import numpy as np
+from backend import TRACI_ERRORS
 from config import (
     TL_ID,
     SIM_START_OF_GENERATING,
@@ -13,8 +14,20 @@ from config import (
     ROUTES_PER_SEC_RANGE_MAX,
     ROUTES_PER_SEC_RANGE_RANDOMIZE,
     NET_FILE,
-    ROU_FILE
+    ROU_FILE,
+    TRIPS_FILE,
+    SIMULATION_FOLDER,
+    ROUTE_GENERATOR,
+    DEMAND_PROFILE
 )
+from trip_generator import generate_trips
+from topology import load_topology
+
+# Diskretizacija stanja (zajednička za dict i array Q-tabelu)
+MAX_QUEUE = 60
+QUEUE_STEP = 5
+DURATION_STEP = 10
+MAX_DURATION_BIN = 10
 
 class QLearningAgent:
     def __init__(self, actions, alpha=0.1, gamma=0.95, epsilon=0.5):
@@ -28,11 +41,8 @@ class QLearningAgent:
         """Optimizovana diskretizacija za velike protoke"""
         phase, duration, *queues = state
         
-        MAX_QUEUE = 60 
-        QUEUE_STEP = 5  
-        
         queue_bins = [min(q, MAX_QUEUE) // QUEUE_STEP for q in queues]
-        duration_bin = min(int(duration / 10), 10)
+        duration_bin = min(int(duration / DURATION_STEP), MAX_DURATION_BIN)
     
         return (phase, duration_bin) + tuple(queue_bins)
 
@@ -40,23 +50,24 @@ class QLearningAgent:
         key = (self.get_state_key(state), action)
         return self.q_table.get(key, 0.0)
 
-    def choose_action(self, state):
-        if random.random() < self.epsilon:
-            return random.choice(self.actions)
+    def choose_action(self, state, rng=random):
+        """Epsilon-greedy akcija; rng (npr. random.Random(seed)) umjesto globalnog generatora"""
+        if rng.random() < self.epsilon:
+            return rng.choice(self.actions)
         
         q_values = [self.get_Q(state, a) for a in self.actions]
         max_q = max(q_values)
         
         # Ako ima više akcija sa istom Q vrednošću
         max_indices = [i for i, q in enumerate(q_values) if q == max_q]
-        return self.actions[random.choice(max_indices)]
+        return self.actions[rng.choice(max_indices)]
 
-    def learn(self, state, action, reward, next_state):
+    def learn(self, state, action, reward, next_state, done=False):
         current_key = (self.get_state_key(state), action)
         current_q = self.get_Q(state, action)
         
-        # Max Q za sledeće stanje
-        next_max_q = max([self.get_Q(next_state, a) for a in self.actions])
+        # Max Q za sledeće stanje (terminalno stanje nema buduću vrijednost)
+        next_max_q = 0.0 if done else max([self.get_Q(next_state, a) for a in self.actions])
         
         # Q-learning update
         new_q = current_q + self.alpha * (reward + self.gamma * next_max_q - current_q)
@@ -70,33 +81,26 @@ def check_sumo_home():
     else:
         raise EnvironmentError("SUMO_HOME nije postavljen!")
 
-def get_state(tls_id=TL_ID, conn=None):
+def get_state(tls_id=TL_ID, conn=None, observer=None, topology=None):
+    # Ako postoji keš pretplata, stanje se čita bez TraCI upita
+    if observer is not None:
+        return observer.get_state()
+
     if conn is None:
         conn = traci
         
     try:
+        if topology is None:
+            topology = load_topology(tls_id, conn)
+
         current_phase = conn.trafficlight.getPhase(tls_id)
         phase_duration = conn.trafficlight.getPhaseDuration(tls_id)
         
-        approaches = {}
-        lane_counts = {}  # broj traka po prilazu
-        
-        for lane in conn.trafficlight.getControlledLanes(tls_id):
-            edge_id = lane.split('_')[0]
-            if edge_id not in approaches:
-                approaches[edge_id] = 0
-                lane_counts[edge_id] = 0
-            approaches[edge_id] += conn.lane.getLastStepVehicleNumber(lane)
-            lane_counts[edge_id] += 1
+        # Prosjek vozila po traci za svaki prilaz (prilazi sortirani u topologiji)
+        lane_vehicles = [conn.lane.getLastStepVehicleNumber(lane) for lane in topology.lanes]
+        queue_lengths = topology.queue_lengths(lane_vehicles)
         
-        # Pretvori u prosjek po traci u tom smjeru
-        for edge_id in approaches:
-            approaches[edge_id] /= lane_counts[edge_id]
-        
-        sorted_approaches = sorted(approaches.items())
-        queue_lengths = [q for _, q in sorted_approaches]
-        
-        return (current_phase, phase_duration) + tuple(queue_lengths)
+        return (current_phase, phase_duration) + tuple(queue_lengths.tolist())
         
     except Exception as e:
         print(f"Greška u get_state: {e}")
@@ -117,22 +121,49 @@ def calculate_reward(state):
         
     return -(queue_penalty + duration_penalty)
 
-def generate_random_routes(seed=None):
-    # Generisanje parametara
-    sim_end = random.randint(SIM_GENERATING_RANGE_MIN, SIM_GENERATING_RANGE_MAX)
-    routes_per_sec = random.uniform(ROUTES_PER_SEC_RANGE_MIN, ROUTES_PER_SEC_RANGE_MAX)
+def route_parameters(seed=None):
+    """Kraj generisanja i period između vozila; uz seed su ponovljivi"""
+    rng = random.Random(seed) if seed is not None else random
+    sim_end = rng.randint(SIM_GENERATING_RANGE_MIN, SIM_GENERATING_RANGE_MAX)
+    routes_per_sec = rng.uniform(ROUTES_PER_SEC_RANGE_MIN, ROUTES_PER_SEC_RANGE_MAX)
     
     if ROUTES_PER_SEC_RANGE_RANDOMIZE:
-        routes_per_sec = round(routes_per_sec * random.uniform(0.8, 1.2), 2)
+        routes_per_sec = round(routes_per_sec * rng.uniform(0.8, 1.2), 2)
+
+    return sim_end, 1/routes_per_sec
+
+def generate_random_routes(seed=None, out_dir=None):
+    """Generiše rute randomTrips.py skriptom.
+
+    Bez out_dir radi u trenutnom direktoriju (simulation-config), inače
+    piše trips/rute u out_dir, pa više procesa može generisati paralelno.
+    """
+    sim_end, period = route_parameters(seed)
+
+    if out_dir is not None:
+        os.makedirs(out_dir, exist_ok=True)
+
+    # Generisanje u istom procesu, bez randomTrips.py i duarouter validacije
+    if ROUTE_GENERATOR == "native":
+        trips_path = os.path.join(out_dir or ".", TRIPS_FILE)
+        net_file = NET_FILE if out_dir is None else os.path.join(SIMULATION_FOLDER, NET_FILE)
+        generate_trips(trips_path, SIM_START_OF_GENERATING, sim_end, period,
+                       seed=seed, profile=DEMAND_PROFILE, net_file=net_file)
+        return sim_end
         
     # Komanda za generisanje ruta
+    net_file = NET_FILE
+    if out_dir is not None:
+        net_file = os.path.abspath(os.path.join(SIMULATION_FOLDER, NET_FILE))
+
     command = [
         "python", f"{os.environ['SUMO_HOME']}/tools/randomTrips.py",
-        "-n", NET_FILE,
+        "-n", net_file,
+        "-o", TRIPS_FILE,
         "-r", ROU_FILE,
         "-b", str(SIM_START_OF_GENERATING),
         "-e", str(sim_end),
-        "-p", str(1/routes_per_sec),
+        "-p", str(period),
         "--validate",
     ]
     
@@ -141,34 +172,17 @@ def generate_random_routes(seed=None):
     
     # Pokretanje procesa
     try:
-        subprocess.run(command, check=True)
+        subprocess.run(command, check=True, cwd=out_dir)
         return sim_end
     except subprocess.CalledProcessError as e:
         print(f"Greška pri generisanju ruta: {e}")
         return SIM_GENERATING_RANGE_MAX
 
-def get_phase_count(tls_id=TL_ID):
+def get_phase_count(tls_id=TL_ID, conn=None):
+    if conn is None:
+        conn = traci
+
     try:
-        program = traci.trafficlight.getAllProgramLogics(tls_id)[0]
-        return len(program.getPhases())
-    except (traci.TraCIException, IndexError):
+        return load_topology(tls_id, conn).n_phases
+    except TRACI_ERRORS + (IndexError,):
         return 4  # Podrazumevana vrednost
-
-def update_config(**kwargs):
-    config_lines = []
-    with open("./config.py", "r") as config_file:
-        for line in config_file:
-            if any(line.startswith(f"{key} =") for key in kwargs):
-                continue
-            config_lines.append(line)
-    
-    with open("./config.py", "w") as config_file:
-        config_file.writelines(config_lines)
-        for key, value in kwargs.items():
-            # Formatiranje floating-point vrijednosti na 6 decimala
-            if isinstance(value, float):
-                config_file.write(f'{key} = {value:.6f}\n')
-            elif isinstance(value, str):
-                config_file.write(f'{key} = "{value}"\n')
-            else:
-                config_file.write(f'{key} = {value}\n')
\ No newline at end of file